@@ -0,0 +1,138 @@
+"""
+Substituto em memória do pyodbc para os benchmarks: aceita os comandos que o csv_ship
+envia ao SQL Server, conta as linhas recebidas e descarta os dados. Deve ser instalado em
+sys.modules["pyodbc"] antes de importar o csv_ship (veja run_bench.py).
+"""
+import re
+import time
+
+SQL_WVARCHAR = -9
+SQL_WLONGVARCHAR = -10
+SQL_VARCHAR = 12
+
+# Custo simulado do servidor por lote enviado (executemany), em segundos por 1000 linhas.
+INSERT_SECONDS_PER_1K_ROWS = 0.0
+
+
+class Error(Exception):
+    pass
+
+
+class DataError(Error):
+    pass
+
+
+class ProgrammingError(Error):
+    pass
+
+
+class OperationalError(Error):
+    pass
+
+
+class IntegrityError(Error):
+    pass
+
+
+_TABLE_RE = re.compile(r"\[([^\]]+)\]\.\[([^\]]+)\]")
+_OBJECT_ID_RE = re.compile(r"OBJECT_ID\(N'([^']+)'")
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.fast_executemany = False
+        self.rowcount = -1
+        self._result = []
+
+    def _check_open(self):
+        if self.conn.closed:
+            raise OperationalError("08003", "Connection is closed")
+
+    def execute(self, sql, *params):
+        self._check_open()
+        self.conn.statements += 1
+        self._result = []
+        if sql == "SELECT 1":
+            self._result = [(1,)]
+        elif "sp_getapplock" in sql:
+            self._result = [(0,)]
+        elif sql.startswith("IF OBJECT_ID"):
+            name = _OBJECT_ID_RE.search(sql).group(1)
+            self._result = [(1 if name in self.conn.tables else 0,)]
+        elif sql.startswith(("CREATE TABLE", "SELECT TOP 0")):
+            # SELECT TOP 0 * INTO [staging] FROM [atual]: a tabela criada é a do INTO.
+            match = _TABLE_RE.search(sql.split(" INTO ", 1)[-1] if sql.startswith("SELECT") else sql)
+            self.conn.tables.setdefault(f"{match.group(1)}.{match.group(2)}", 0)
+        elif sql.startswith(("DROP TABLE", "TRUNCATE TABLE")):
+            match = _TABLE_RE.search(sql)
+            if match:
+                name = f"{match.group(1)}.{match.group(2)}"
+                if sql.startswith("DROP"):
+                    self.conn.tables.pop(name, None)
+                elif name in self.conn.tables:
+                    self.conn.tables[name] = 0
+        elif "FROM sys.partitions" in sql:
+            name = params[0].replace("[", "").replace("]", "") if params else ""
+            self._result = [(self.conn.tables.get(name, 0),)]
+        elif sql.startswith("INSERT INTO") and params:
+            self._count_rows(sql, 1)
+        return self
+
+    def executemany(self, sql, rows):
+        self._check_open()
+        self.conn.statements += 1
+        count = len(rows)
+        if INSERT_SECONDS_PER_1K_ROWS:
+            time.sleep(INSERT_SECONDS_PER_1K_ROWS * count / 1000)
+        self._count_rows(sql, count)
+
+    def _count_rows(self, sql, count):
+        match = _TABLE_RE.search(sql)
+        if match:
+            name = f"{match.group(1)}.{match.group(2)}"
+            self.conn.tables[name] = self.conn.tables.get(name, 0) + count
+        self.conn.rows_received += count
+
+    def setinputsizes(self, sizes):
+        pass
+
+    def fetchone(self):
+        return self._result.pop(0) if self._result else None
+
+    def fetchall(self):
+        result, self._result = self._result, []
+        return result
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class Connection:
+    def __init__(self):
+        self.closed = False
+        self.tables = {}  # "schema.tabela" -> linhas recebidas
+        self.rows_received = 0
+        self.statements = 0
+        self.commits = 0
+
+    def cursor(self):
+        if self.closed:
+            raise OperationalError("08003", "Connection is closed")
+        return Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def connect(conn_str, **kwargs):
+    return Connection()
@@ -0,0 +1,119 @@
+import argparse
+import codecs
+import datetime
+import random
+
+# Letras usadas nos campos de texto; as acentuadas existem em latin1 e cp1252.
+ASCII_LETTERS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ACCENTED_LETTERS = "áéíóúâêôãõçÁÉÍÓÚÇ"
+ENCODINGS = ("utf-8", "latin1", "cp1252")
+
+
+def _text_value(rng, width, accented_ratio):
+    length = rng.randint(max(1, width // 2), max(1, width))
+    letters = [
+        rng.choice(ACCENTED_LETTERS) if rng.random() < accented_ratio else rng.choice(ASCII_LETTERS)
+        for _ in range(length)
+    ]
+    return "".join(letters)
+
+
+def _column_value(rng, kind, width, accented_ratio):
+    if kind == "int":
+        return str(rng.randint(0, 10**9))
+    if kind == "decimal":
+        return f"{rng.uniform(-10**6, 10**6):.2f}"
+    if kind == "date":
+        return (datetime.date(2000, 1, 1) + datetime.timedelta(days=rng.randint(0, 9000))).isoformat()
+    return _text_value(rng, width, accented_ratio)
+
+
+def _quote(value, separator):
+    if separator in value or '"' in value or "\n" in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def generate_csv(
+    path,
+    rows=100000,
+    columns=10,
+    width=16,
+    encoding="utf-8",
+    bom=False,
+    separator=",",
+    quoted_newline_ratio=0.0,
+    malformed_ratio=0.0,
+    accented_ratio=0.05,
+    seed=42,
+):
+    """
+    Gera um CSV sintético determinístico (mesma `seed` = mesmo arquivo).
+    As colunas alternam entre texto (até `width` caracteres), inteiro, decimal e data.
+    `quoted_newline_ratio` é a fração de linhas com um campo entre aspas contendo quebra de
+    linha e `malformed_ratio` a fração de linhas com campos a mais ou a menos.
+    `bom` grava o BOM do UTF-8. Retorna o número de bytes gravados.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Encoding não suportado pelo gerador: '{encoding}'")
+    if bom and encoding != "utf-8":
+        raise ValueError("BOM só é suportado com utf-8.")
+    rng = random.Random(seed)
+    kinds = [("text", "int", "decimal", "date", "text")[index % 5] for index in range(columns)]
+    header = separator.join(f"col_{index}" for index in range(columns))
+
+    with open(path, "w", encoding=encoding, newline="") as fh:
+        if bom:
+            fh.write(codecs.BOM_UTF8.decode("utf-8"))
+        fh.write(header + "\n")
+        for _ in range(rows):
+            values = [_column_value(rng, kind, width, accented_ratio) for kind in kinds]
+            if quoted_newline_ratio and rng.random() < quoted_newline_ratio:
+                text_index = kinds.index("text") if "text" in kinds else 0
+                values[text_index] = values[text_index] + "\n" + _text_value(rng, width, accented_ratio)
+            if malformed_ratio and rng.random() < malformed_ratio:
+                if len(values) > 1 and rng.random() < 0.5:
+                    values.pop()
+                else:
+                    values.append(_text_value(rng, width, accented_ratio))
+            fh.write(separator.join(_quote(value, separator) for value in values) + "\n")
+        return fh.tell()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético determinístico para benchmarks.")
+    parser.add_argument("path", help="Arquivo CSV de saída.")
+    parser.add_argument("--rows", type=int, default=100000, help="Número de linhas de dados. Padrão: 100000.")
+    parser.add_argument("--columns", type=int, default=10, help="Número de colunas. Padrão: 10.")
+    parser.add_argument("--width", type=int, default=16, help="Tamanho máximo dos campos de texto. Padrão: 16.")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8", help="Encoding do arquivo. Padrão: utf-8.")
+    parser.add_argument("--bom", action="store_true", help="Grava o BOM do UTF-8.")
+    parser.add_argument("--separator", default=",", help="Separador de campos (use '\\t' para tab). Padrão: ','.")
+    parser.add_argument(
+        "--quoted-newline-ratio",
+        type=float,
+        default=0.0,
+        help="Fração de linhas com um campo entre aspas contendo quebra de linha. Padrão: 0.",
+    )
+    parser.add_argument(
+        "--malformed-ratio",
+        type=float,
+        default=0.0,
+        help="Fração de linhas com número de campos diferente do cabeçalho. Padrão: 0.",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador. Padrão: 42.")
+    args = parser.parse_args()
+
+    size = generate_csv(
+        args.path,
+        rows=args.rows,
+        columns=args.columns,
+        width=args.width,
+        encoding=args.encoding,
+        bom=args.bom,
+        separator="\t" if args.separator == "\\t" else args.separator,
+        quoted_newline_ratio=args.quoted_newline_ratio,
+        malformed_ratio=args.malformed_ratio,
+        seed=args.seed,
+    )
+    print(f"{args.path}: {args.rows} linhas, {size} caracteres.")
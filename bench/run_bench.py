@@ -0,0 +1,335 @@
+"""
+Benchmark do pipeline de carga do csv_ship contra um pyodbc falso em memória.
+
+Gera CSVs sintéticos determinísticos (generate_csv.py), carrega cada um com
+process_csv_file em um processo próprio (para medir o pico de memória de cada cenário) e
+informa linhas/s, pico de RSS e o tempo de cada etapa (detecção, parse, insert, commit).
+Com mais de um --engine, cada cenário é medido com cada motor de leitura e o relatório
+compara os motores. Os resultados podem ser gravados como linha de base (--save-baseline)
+e comparados com ela nas execuções seguintes; uma piora acima da tolerância termina com
+código 1.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.dirname(BENCH_DIR))
+
+from generate_csv import generate_csv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_TOLERANCE = 0.10
+
+# Cenários: argumentos de generate_csv. O número de linhas é multiplicado por --scale.
+SCENARIOS = {
+    "narrow_utf8": {"rows": 200000, "columns": 5, "width": 12},
+    "wide_latin1": {"rows": 20000, "columns": 100, "width": 24, "encoding": "latin1", "separator": ";"},
+    "long_text_utf8_bom": {"rows": 20000, "columns": 4, "width": 1000, "bom": True},
+    "quoted_newlines_cp1252": {
+        "rows": 100000,
+        "columns": 10,
+        "encoding": "cp1252",
+        "separator": ";",
+        "quoted_newline_ratio": 0.05,
+    },
+    "malformed_tab": {"rows": 100000, "columns": 10, "separator": "\t", "malformed_ratio": 0.02},
+}
+
+STAGES = ("probe", "parse", "insert", "commit", "parse_wait", "insert_wait")
+ENGINES = ("stream", "arrow", "pandas")
+
+
+def result_key(result):
+    """Chave do resultado na linha de base: o cenário, com o motor se não for o padrão."""
+    engine = result.get("engine", "stream")
+    return result["scenario"] if engine == "stream" else f"{result['scenario']}@{engine}"
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo atual em MB (None sem o módulo resource)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em bytes no macOS e em KB no Linux.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(name, csv_path, load_options, insert_ms_per_1k_rows=0.0):
+    """
+    Carrega `csv_path` com o pipeline real do csv_ship sobre o pyodbc falso e retorna as
+    medições. Deve rodar em um processo próprio: instala o pyodbc falso em sys.modules.
+    """
+    import fake_pyodbc
+
+    sys.modules["pyodbc"] = fake_pyodbc
+    fake_pyodbc.INSERT_SECONDS_PER_1K_ROWS = insert_ms_per_1k_rows / 1000
+    import logging
+
+    import csv_ship
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    csv_ship.probe_csv_file(csv_path)  # fica em cache para o process_csv_file
+    probe_seconds = time.perf_counter() - started
+
+    conn = fake_pyodbc.connect("")
+    sink = csv_ship.SqlServerSink(conn)
+    result = csv_ship.process_csv_file(sink, csv_path, "dbo", True, load_options)
+    seconds = time.perf_counter() - started
+
+    stages = {"probe": probe_seconds, **result.get("stage_seconds", {})}
+    metrics = result.get("metrics", {})
+    rows = result.get("rows_inserted", 0)
+    size = os.path.getsize(csv_path)
+    return {
+        "scenario": name,
+        "engine": load_options.get("engine", "stream"),
+        "status": result["status"],
+        "rows_inserted": rows,
+        "rows_received": conn.rows_received,
+        "rows_rejected": metrics.get("rows_rejected", 0),
+        "rows_adjusted": metrics.get("rows_adjusted", 0),
+        "batches": metrics.get("batches", 0),
+        "bytes": size,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 1) if seconds else 0.0,
+        "mb_per_second": round(size / (1024 * 1024) / seconds, 2) if seconds else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1) if resource is not None else None,
+        "stage_seconds": {stage: round(stages.get(stage, 0.0), 3) for stage in STAGES},
+    }
+
+
+def run_scenario_subprocess(name, csv_path, load_options, insert_ms_per_1k_rows):
+    """Executa run_scenario em um interpretador novo e retorna o resultado (ou None)."""
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--run-one",
+        json.dumps(
+            {
+                "name": name,
+                "csv_path": csv_path,
+                "load_options": load_options,
+                "insert_ms_per_1k_rows": insert_ms_per_1k_rows,
+            }
+        ),
+    ]
+    completed = subprocess.run(command, stdout=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        print(f"Cenário '{name}' falhou (código {completed.returncode}).", file=sys.stderr)
+        return None
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compara linhas/s e pico de RSS de cada cenário com a linha de base. Retorna as linhas
+    do relatório e a lista de regressões (cenário, métrica, atual, base).
+    """
+    lines = []
+    regressions = []
+    for result in results:
+        key = result_key(result)
+        base = baseline.get("scenarios", {}).get(key)
+        if not base:
+            lines.append(f"  {key}: sem linha de base.")
+            continue
+        for metric, higher_is_better in (("rows_per_second", True), ("peak_rss_mb", False)):
+            current, previous = result.get(metric), base.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            lines.append(
+                f"  {key}: {metric} {current} (base {previous}, {change:+.1%})"
+                + (" REGRESSÃO" if worse else "")
+            )
+            if worse:
+                regressions.append((key, metric, current, previous))
+    return lines, regressions
+
+
+def compare_engines(results):
+    """Linhas do relatório comparando cada motor com o motor 'stream' no mesmo cenário."""
+    by_scenario = {}
+    for result in results:
+        by_scenario.setdefault(result["scenario"], {})[result["engine"]] = result
+    lines = []
+    for scenario, engines in by_scenario.items():
+        reference = engines.get("stream")
+        for engine, result in engines.items():
+            if engine == "stream" or reference is None or not reference["rows_per_second"]:
+                continue
+            change = result["rows_per_second"] / reference["rows_per_second"] - 1
+            parse_stream = reference["stage_seconds"]["parse"]
+            parse_engine = result["stage_seconds"]["parse"]
+            lines.append(
+                f"  {scenario}: {engine} {result['rows_per_second']:.0f} linhas/s contra "
+                + f"{reference['rows_per_second']:.0f} do stream ({change:+.1%}); parse {parse_engine:.2f}s "
+                + f"contra {parse_stream:.2f}s; pico de RSS {result['peak_rss_mb']} contra {reference['peak_rss_mb']} MB."
+            )
+    return lines
+
+
+def format_result(result):
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["stage_seconds"].items())
+    rss = f"{result['peak_rss_mb']} MB" if result["peak_rss_mb"] is not None else "n/d"
+    return (
+        f"{result_key(result)}: {result['rows_inserted']} linhas em {result['seconds']:.2f} s "
+        + f"({result['rows_per_second']:.0f} linhas/s, {result['mb_per_second']} MB/s), pico de RSS {rss}, "
+        + f"{result['batches']} lote(s), {result['rows_rejected']} rejeitada(s), {result['rows_adjusted']} ajustada(s). "
+        + f"Etapas: {stages}."
+    )
+
+
+def run_scenarios(args, load_options, work_dir):
+    """Gera os CSVs (se ainda não existirem) e mede cada cenário, ficando com a execução mais rápida."""
+    results = []
+    for name in args.scenario or list(SCENARIOS):
+        spec = dict(SCENARIOS[name])
+        spec["rows"] = max(1, int(spec["rows"] * args.scale))
+        csv_path = os.path.join(work_dir, f"{name}_{spec['rows']}_{args.seed}.csv")
+        if not os.path.exists(csv_path):
+            generate_csv(csv_path, seed=args.seed, **spec)
+        for engine in args.engine or ["stream"]:
+            engine_options = dict(load_options, engine=engine)
+            runs = [
+                run_scenario_subprocess(name, csv_path, engine_options, args.insert_ms_per_1k_rows)
+                for _ in range(max(1, args.repeat))
+            ]
+            runs = [run for run in runs if run is not None]
+            if not runs:
+                continue
+            result = max(runs, key=lambda run: run["rows_per_second"])
+            result["params"] = spec
+            result["runs"] = len(runs)
+            results.append(result)
+            print(format_result(result))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark do csv_ship com CSVs sintéticos e um pyodbc falso em memória."
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Cenário a executar (pode ser repetido). Padrão: todos.",
+    )
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplica o número de linhas dos cenários.")
+    parser.add_argument("--seed", type=int, default=42, help="Semente dos CSVs gerados. Padrão: 42.")
+    parser.add_argument(
+        "--work-dir",
+        help="Diretório dos CSVs gerados (reaproveitados entre execuções). Padrão: diretório temporário.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Execuções por cenário; vale a mais rápida (reduz o ruído). Padrão: 3.",
+    )
+    parser.add_argument(
+        "--engine",
+        action="append",
+        choices=ENGINES,
+        help="Motor de leitura do csv_ship (pode ser repetido para comparar os motores). Padrão: stream.",
+    )
+    parser.add_argument("--pipeline-depth", type=int, default=0, help="Repassado ao csv_ship. Padrão: 0.")
+    parser.add_argument("--batch-rows", type=int, help="Linhas por lote fixas (padrão: lote adaptativo).")
+    parser.add_argument(
+        "--insert-ms-per-1k-rows",
+        type=float,
+        default=0.0,
+        help="Latência simulada do servidor em ms por 1000 linhas enviadas. Padrão: 0.",
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Arquivo JSON da linha de base.")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como linha de base.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f"Variação aceita em relação à linha de base. Padrão: {DEFAULT_TOLERANCE}.",
+    )
+    parser.add_argument("--output", help="Grava os resultados desta execução neste arquivo JSON.")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        spec = json.loads(args.run_one)
+        result = run_scenario(
+            spec["name"], spec["csv_path"], spec["load_options"], spec["insert_ms_per_1k_rows"]
+        )
+        print(json.dumps(result))
+        return 0
+
+    load_options = {
+        "checkpoint_dir": None,
+        "reject_dir": None,
+        "pipeline_depth": args.pipeline_depth,
+        "batch_rows": args.batch_rows,
+    }
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="csv_ship_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        results = run_scenarios(args, load_options, work_dir)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+    expected = len(args.scenario or SCENARIOS) * len(args.engine or ["stream"])
+    exit_code = 0 if len(results) == expected else 1
+    engine_lines = compare_engines(results)
+    if engine_lines:
+        print("Comparação entre motores:")
+        print("\n".join(engine_lines))
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("scale") != args.scale:
+            print(f"Atenção: a linha de base foi gravada com --scale {baseline.get('scale')}; esta execução usa {args.scale}.")
+        lines, regressions = compare_with_baseline(results, baseline, args.tolerance)
+        print(f"Comparação com a linha de base '{args.baseline}' (tolerância {args.tolerance:.0%}):")
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} regressão(ões) acima da tolerância.")
+            exit_code = 1
+    elif not args.save_baseline:
+        print(f"Linha de base '{args.baseline}' não encontrada. Use --save-baseline para criá-la.")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": sys.version.split()[0],
+                    "scale": args.scale,
+                    "scenarios": {result_key(result): result for result in results},
+                },
+                fh,
+                indent=2,
+            )
+        print(f"Linha de base gravada em '{args.baseline}'.")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
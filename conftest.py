@@ -0,0 +1,15 @@
+import importlib.util
+import os
+import sys
+
+# Sem o pyodbc (ou sem o driver ODBC do sistema), os testes usam o pyodbc falso dos
+# benchmarks: nenhum teste conversa com um SQL Server de verdade.
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    _spec = importlib.util.spec_from_file_location(
+        "pyodbc", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "fake_pyodbc.py")
+    )
+    _fake_pyodbc = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_fake_pyodbc)
+    sys.modules["pyodbc"] = _fake_pyodbc
@@ -1,13 +1,73 @@
 import os
 import glob
-import pyodbc
-import pandas as pd
 import logging
 import csv
 from logging.handlers import RotatingFileHandler
 import datetime
 import chardet
 import argparse
+import collections
+import concurrent.futures
+import io
+import codecs
+import multiprocessing.util
+import zlib
+import re
+import random
+import itertools
+import hashlib
+import json
+import math
+import time
+import queue
+import threading
+import functools
+import sys
+import bisect
+import importlib.metadata
+import warnings
+import gzip
+import bz2
+import lzma
+import zipfile
+import mmap
+import ctypes
+import select
+import shutil
+import signal
+
+try:
+    import zstandard
+except ImportError:  # Opcional: só é necessário para entradas .zst
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # Opcional: só é necessário para --engine arrow
+    pa = None
+
+import db_pool
+from csv_sinks import (
+    MERGE_COUNT_KEYS,
+    CsvSink,
+    FileSink,
+    NullSink,
+    SQLiteSink,
+    SqlServerSink,
+    log_merge_counts,
+)
+from sql_types import (
+    DECIMAL_RE,
+    NVARCHAR_MAX_LENGTH,
+    TYPE_INFERENCE_LENGTH_MARGIN,
+    build_type_validator,
+    infer_sql_type,
+    is_valid_datetime,
+    merge_sql_types,
+    parse_sql_type,
+)
 
 LOG_DIR = "logs"
 if not os.path.exists(LOG_DIR):
@@ -33,6 +93,82 @@ DB_SCHEMA = "dbo"
 
 CSV_DIRECTORY = "csv"
 
+# Arquivos maiores que este limite são divididos em faixas de bytes carregadas em paralelo.
+PARTITION_THRESHOLD_BYTES = 1024 * 1024 * 1024
+PARTITION_WORKERS = 4
+
+LOAD_MODES = ("executemany", "bulk", "tvp")
+
+SINK_KINDS = ("sqlserver", "sqlite", "file", "null")
+
+# Manifesto dos arquivos já carregados, usado para pular arquivos inalterados.
+MANIFEST_PATH = "csv_ship_manifest.json"
+
+# Diários de checkpoint (offset confirmado por arquivo/tabela), usados por --resume.
+CHECKPOINT_DIR = "checkpoints"
+
+# Linhas malformadas: gravadas em um CSV compactado por carga; só uma amostra vai para o log.
+REJECT_DIR = "rejects"
+REJECT_LOG_FIRST = 10
+REJECT_LOG_INTERVAL_SECONDS = 30
+
+# Arquivos de métricas gravados em --metrics-dir: um JSON por linha e um textfile do Prometheus.
+METRICS_JSONL_FILENAME = "csv_ship_metrics.jsonl"
+METRICS_PROM_FILENAME = "csv_ship.prom"
+
+# Modo contínuo (--watch): um arquivo só é carregado depois de passar este tempo sem mudar de
+# tamanho nem de data de modificação, e o diretório é reexaminado pelo menos a cada WATCH_POLL_SECONDS.
+WATCH_SETTLE_SECONDS = 10.0
+WATCH_POLL_SECONDS = 5.0
+
+# Lotes lidos antecipadamente por uma thread de leitura enquanto o anterior é gravado (0 = sem pipeline).
+PIPELINE_DEPTH = 0
+
+# Motores de leitura: 'stream' (csv.reader, embutido), 'arrow' (pyarrow.csv, multithread, opcional)
+# ou 'pandas' (parser C do read_csv, importado só por esse motor).
+LOAD_ENGINES = ("stream", "arrow", "pandas")
+DEFAULT_ENGINE = "stream"
+# Bytes de CSV que o pyarrow entrega a cada thread de parse.
+ARROW_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Tamanho adaptativo dos lotes: memória máxima das tuplas em trânsito e tempo alvo por lote.
+BATCH_MEMORY_BUDGET_BYTES = 64 * 1024 * 1024
+TARGET_FLUSH_SECONDS = 1.0
+MIN_BATCH_ROWS = 100
+MAX_BATCH_ROWS = 200000
+
+DEFAULT_LOAD_OPTIONS = {
+    # Argumentos de open_sink, usados pelos processos que abrem o próprio destino.
+    "sink_options": None,
+    "partition_threshold_bytes": PARTITION_THRESHOLD_BYTES,
+    "partition_workers": PARTITION_WORKERS,
+    # Infere tipos por amostragem em vez de criar todas as colunas como NVARCHAR(MAX).
+    "infer_types": False,
+    # Perfila o arquivo inteiro antes da carga (tamanho das colunas e dos parâmetros).
+    "profile": False,
+    # Diretório dos diários de checkpoint (None desabilita) e retomada a partir deles.
+    "checkpoint_dir": CHECKPOINT_DIR,
+    "resume": False,
+    # Profundidade da fila entre a thread de leitura e a gravação (0 = leitura e gravação alternadas).
+    "pipeline_depth": PIPELINE_DEPTH,
+    # Linhas por lote fixas; None ajusta o lote pela memória e pelo tempo de gravação.
+    "batch_rows": None,
+    "batch_memory_bytes": BATCH_MEMORY_BUDGET_BYTES,
+    "target_flush_seconds": TARGET_FLUSH_SECONDS,
+    # Carrega em uma tabela de staging e a troca pela tabela atual só ao final (sem checkpoints).
+    "swap": False,
+    # Colunas-chave da carga incremental: a staging é aplicada na tabela atual com merge
+    # (None = carga normal). `merge_delete` remove as chaves ausentes do arquivo.
+    "merge_keys": None,
+    "merge_delete": False,
+    # Diretório dos arquivos de linhas malformadas (None grava apenas a amostra no log).
+    "reject_dir": REJECT_DIR,
+    # Motor de leitura (veja LOAD_ENGINES).
+    "engine": DEFAULT_ENGINE,
+    # Carga incremental de arquivos que crescem: só os bytes acrescentados desde a última carga.
+    "tail": False,
+}
+
 
 def get_sql_server_connection(
     server=None, database=None, user=None, password=None, trusted_connection=False
@@ -41,622 +177,3827 @@ def get_sql_server_connection(
     Estabelece e retorna uma conexão com o SQL Server.
     Usa os parâmetros fornecidos ou recorre às constantes globais se os parâmetros não forem fornecidos.
     """
-    db_server_to_use = server if server else DB_SERVER
-    db_name_to_use = database if database else DB_NAME
-    db_user_to_use = user if user else DB_USER
-    db_password_to_use = password if password else DB_PASSWORD
+    return db_pool.connect(
+        server if server else DB_SERVER,
+        database if database else DB_NAME,
+        user=user if user else DB_USER,
+        password=password if password else DB_PASSWORD,
+        trusted_connection=trusted_connection,
+    )
+
+
+# --- Entradas compactadas ---
+
+# Extensões lidas com descompactação em streaming. Membros .csv de um .zip são endereçados
+# como "<arquivo>.zip::<membro>" (veja discover_csv_files).
+COMPRESSED_EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+ZIP_MEMBER_SEPARATOR = "::"
+DECOMPRESSED_BUFFER_SIZE = 1024 * 1024
+
+# Blocos lidos e decodificados de uma vez pelo motor de streaming (cortados em quebras de linha).
+READ_BLOCK_SIZE = 1024 * 1024
+
+_DECOMPRESSION_ERRORS = (EOFError, zlib.error, lzma.LZMAError) + (
+    (zstandard.ZstdError,) if zstandard is not None else ()
+)
+
+
+def split_zip_member(path):
+    """Separa "<arquivo>.zip::<membro>" em (arquivo, membro); outros caminhos voltam com membro None."""
+    archive, separator, member = path.partition(ZIP_MEMBER_SEPARATOR)
+    if separator and archive.lower().endswith(".zip"):
+        return archive, member
+    return path, None
+
+
+def source_file_path(path):
+    """Arquivo em disco de uma entrada (o próprio .zip, para um membro)."""
+    return split_zip_member(path)[0]
+
+
+def input_compression(path):
+    """Compactação de uma entrada: 'gzip', 'bz2', 'xz', 'zstd', 'zip' ou None."""
+    if split_zip_member(path)[1] is not None:
+        return "zip"
+    return COMPRESSED_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+class EmptyCsvError(ValueError):
+    """O CSV não tem cabeçalho: o arquivo é pulado sem criar tabela."""
+
+
+class _CountingFile(io.RawIOBase):
+    """Arquivo binário que conta os bytes lidos do disco (os compactados, sob um descompactador)."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._file.readinto(buffer)
+        self.bytes_read += count or 0
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class _DecompressingReader(io.RawIOBase):
+    """
+    Leitor bruto que descompacta uma entrada em streaming (veja open_csv_binary). `seek` é
+    emulado pelo descompactador, que lê e descarta até o offset pedido; `compressed_bytes`
+    é o total de bytes compactados lidos do disco.
+    """
+
+    def __init__(self, path):
+        archive, member = split_zip_member(path)
+        kind = input_compression(path)
+        self._source = _CountingFile(archive)
+        self._archive = None
+        try:
+            if kind == "gzip":
+                self._stream = gzip.GzipFile(fileobj=self._source, mode="rb")
+            elif kind == "bz2":
+                self._stream = bz2.BZ2File(self._source)
+            elif kind == "xz":
+                self._stream = lzma.LZMAFile(self._source)
+            elif kind == "zstd":
+                if zstandard is None:
+                    raise OSError(f"O pacote 'zstandard' é necessário para ler '{path}' (pip install zstandard).")
+                self._stream = zstandard.ZstdDecompressor().stream_reader(
+                    self._source, read_across_frames=True, closefd=False
+                )
+            else:
+                try:
+                    self._archive = zipfile.ZipFile(self._source)
+                    self._stream = self._archive.open(member)
+                except (zipfile.BadZipFile, KeyError) as e:
+                    raise OSError(f"Não foi possível abrir '{member}' em '{archive}': {e}") from e
+        except BaseException:
+            self._source.close()
+            raise
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        try:
+            return self._stream.readinto(buffer)
+        except _DECOMPRESSION_ERRORS as e:
+            raise OSError(f"Erro ao descompactar a entrada: {e}") from e
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        try:
+            return self._stream.seek(offset, whence)
+        except _DECOMPRESSION_ERRORS as e:
+            raise OSError(f"Erro ao descompactar a entrada: {e}") from e
+
+    def tell(self):
+        return self._stream.tell()
+
+    @property
+    def compressed_bytes(self):
+        return self._source.bytes_read
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+            if self._archive is not None:
+                self._archive.close()
+            self._source.close()
+        super().close()
+
+
+def open_csv_binary(path):
+    """
+    Abre uma entrada para leitura binária: arquivos comuns diretamente; .gz, .bz2, .xz, .zst
+    e membros de .zip com descompactação em streaming, sem arquivo temporário.
+    """
+    if input_compression(path) is None:
+        return open(path, "rb")
+    return io.BufferedReader(_DecompressingReader(path), buffer_size=DECOMPRESSED_BUFFER_SIZE)
+
+
+def open_csv_text(path, encoding, errors=None):
+    """Abre uma entrada (compactada ou não) como texto, sem tradução de quebras de linha."""
+    return io.TextIOWrapper(open_csv_binary(path), encoding=encoding, errors=errors, newline="")
+
+
+def compressed_input_bytes(binary_file):
+    """Bytes compactados lidos por um arquivo de open_csv_binary (None se a entrada não for compactada)."""
+    raw = getattr(binary_file, "raw", None)
+    return raw.compressed_bytes if isinstance(raw, _DecompressingReader) else None
+
 
+def list_csv_sources(directory):
+    """Arquivos de entrada de `directory` (.csv, CSVs compactados e .zip), sem abrir os .zip."""
+    sources = glob.glob(os.path.join(directory, "*.csv"))
+    for extension in COMPRESSED_EXTENSIONS:
+        sources += glob.glob(os.path.join(directory, f"*.csv{extension}"))
+    return sources + glob.glob(os.path.join(directory, "*.zip"))
+
+
+def expand_csv_source(source):
+    """
+    Entradas de um arquivo de list_csv_sources: o próprio arquivo ou, para um .zip, seus
+    membros .csv como "<arquivo>.zip::<membro>" (nenhuma, se o .zip não puder ser lido).
+    """
+    if not source.lower().endswith(".zip"):
+        return [source]
     try:
-        if trusted_connection or (
-            not db_user_to_use and not db_password_to_use and not user and not password
-        ):
-            conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={db_server_to_use};DATABASE={db_name_to_use};Trusted_Connection=yes;"
-            logging.info(
-                f"Tentando conectar ao SQL Server: {db_server_to_use}, Banco de Dados: {db_name_to_use} usando Autenticação do Windows."
-            )
-        elif db_user_to_use and db_password_to_use:
-            conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={db_server_to_use};DATABASE={db_name_to_use};UID={db_user_to_use};PWD={db_password_to_use}"
-            logging.info(
-                f"Tentando conectar ao SQL Server: {db_server_to_use}, Banco de Dados: {db_name_to_use} com usuário: {db_user_to_use}."
-            )
-        else:
-            conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={db_server_to_use};DATABASE={db_name_to_use};Trusted_Connection=yes;"
-            logging.info(
-                f"Tentando conectar ao SQL Server: {db_server_to_use}, Banco de Dados: {db_name_to_use} usando Autenticação do Windows (fallback)."
-            )
+        with zipfile.ZipFile(source) as zf:
+            members = [
+                info.filename
+                for info in zf.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(".csv")
+            ]
+    except (OSError, zipfile.BadZipFile) as e:
+        logging.error(f"Não foi possível ler o arquivo zip '{source}': {e}. Pulando.")
+        return []
+    return [f"{source}{ZIP_MEMBER_SEPARATOR}{member}" for member in members]
 
-        conn = pyodbc.connect(conn_str)
-        logging.info("Conexão com SQL Server estabelecida com sucesso.")
-        return conn
-    except pyodbc.Error as ex:
-        sqlstate = ex.args[0]
-        logging.error(f"Erro ao conectar ao SQL Server: {sqlstate} - {ex}")
-        if "08001" in sqlstate:
-            logging.error(
-                "Verifique se o nome do servidor SQL está correto e se o servidor está acessível."
-            )
-        elif "28000" in sqlstate:
-            logging.error(
-                "Falha na autenticação. Verifique suas credenciais (usuário/senha) ou configuração de Trusted_Connection."
-            )
-        elif "42000" in sqlstate:
-            logging.error(
-                f"Não foi possível abrir o banco de dados solicitado pelo login. O login falhou ou verifique se o banco de dados existe e você tem permissão."
-            )
+
+def discover_csv_files(directory):
+    """
+    Lista as entradas de `directory`: arquivos .csv, CSVs compactados (.csv.gz, .csv.bz2,
+    .csv.xz, .csv.zst) e os membros .csv de cada .zip, como "<arquivo>.zip::<membro>".
+    """
+    return [csv_file for source in list_csv_sources(directory) for csv_file in expand_csv_source(source)]
+
+
+def map_csv_file(file_path):
+    """
+    Mapeia um CSV não compactado em memória, somente leitura: as leituras vêm direto do
+    cache de páginas, sem cópia para buffers de arquivo. Retorna None para entradas
+    compactadas, arquivos vazios ou se o mapeamento não for possível.
+    """
+    if input_compression(file_path) is not None:
+        return None
+    try:
+        with open(file_path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
         return None
 
 
-def create_table_from_csv(
-    conn, table_name, df_chunk, schema_name=None, truncate_existing=False
-):
+# Separadores considerados na detecção do dialeto, em ordem de preferência nos empates.
+DELIMITER_CANDIDATES = (",", ";", "\t", "|")
+PROBE_SAMPLE_SIZE = 64 * 1024
+
+# Probes já feitos, por (caminho, tamanho, mtime, encoding forçado).
+_probe_cache = {}
+
+
+class CsvProbe:
     """
-    Cria uma tabela no SQL Server com base no DataFrame (primeiro chunk).
-    Todas as colunas são criadas como NVARCHAR(MAX) para simplicidade e para evitar erros de tipo.
+    Resultado de probe_csv_file: encoding, dialeto (separador, aspas, quebra de linha),
+    cabeçalho e offset em bytes do início dos dados (None se o encoding não for
+    compatível com ASCII). Reaproveitado por todas as etapas da carga de um arquivo.
     """
-    cursor = conn.cursor()
-    sanitized_table_name = "".join(c if c.isalnum() else "_" for c in table_name)
-    current_schema = schema_name if schema_name else DB_SCHEMA
-    full_table_name_for_query = f"[{current_schema}].[{sanitized_table_name}]"
-    full_table_name_for_log = f"{current_schema}.{sanitized_table_name}"
 
-    check_table_sql = f"IF OBJECT_ID(N'{current_schema}.{sanitized_table_name}', N'U') IS NOT NULL SELECT 1 ELSE SELECT 0"
-    logging.debug(f"Verificando existência da tabela com SQL: {check_table_sql}")
-    cursor.execute(check_table_sql)
-    if cursor.fetchone()[0] == 1:
-        logging.info(f"Tabela '{full_table_name_for_log}' já existe.")
-        if truncate_existing:
-            try:
-                logging.info(
-                    f"Opção TRUNCATE habilitada. Truncando tabela '{full_table_name_for_log}'..."
-                )
-                cursor.execute(f"TRUNCATE TABLE {full_table_name_for_query}")
-                conn.commit()
-                logging.info(
-                    f"Tabela '{full_table_name_for_log}' truncada com sucesso."
-                )
-            except pyodbc.Error as e_truncate:
-                logging.error(
-                    f"Erro ao truncar a tabela '{full_table_name_for_log}': {e_truncate}"
-                )
-                conn.rollback()
-                return sanitized_table_name, current_schema, False
-        return sanitized_table_name, current_schema, True
+    def __init__(
+        self,
+        file_path,
+        encoding,
+        delimiter,
+        quotechar,
+        lineterminator,
+        header,
+        has_data,
+        data_start,
+    ):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.lineterminator = lineterminator
+        self.header = header
+        self.has_data = has_data
+        self.data_start = data_start
 
-    column_definitions = []
-    for col_name in df_chunk.columns:
-        sanitized_col_name = "".join(c if c.isalnum() else "_" for c in col_name)
-        column_definitions.append(f"[{sanitized_col_name}] NVARCHAR(MAX)")
 
-    create_table_sql = (
-        f"CREATE TABLE {full_table_name_for_query} ({', '.join(column_definitions)})"
+def _detect_buffer_encoding(file_path, head, complete):
+    """
+    Detecta o encoding a partir do buffer inicial: BOM, depois validação UTF-8 incremental
+    (um caractere multibyte cortado no fim do buffer não conta como erro) e, só se o
+    buffer não for UTF-8 válido, chardet.
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig", "BOM"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16", "BOM"
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=complete)
+        return "utf-8", "validação UTF-8"
+    except UnicodeDecodeError:
+        pass
+    result = chardet.detect(head)
+    encoding, confidence = result["encoding"], result["confidence"] or 0
+    if encoding and confidence > 0.7 and encoding.lower() not in ("ascii", "utf-8"):
+        return encoding.lower(), f"chardet, confiança {confidence:.2f}"
+    logging.warning(
+        f"Confiança baixa ({confidence:.2f}) para encoding detectado ('{encoding}') em {file_path}. Usando cp1252 como fallback."
     )
+    return "cp1252", "fallback"
 
+
+def _detect_tail_encoding(file_path, tail, encoding, source):
+    """
+    Confere o encoding detectado pelo início (só ASCII, portanto aceito como UTF-8) contra
+    o fim do arquivo: exportações com acentos só nas últimas linhas são comuns e só
+    falhariam no meio da carga. Se o fim não for UTF-8 válido, detecta o encoding por ele,
+    mantendo-o compatível com ASCII para o início continuar legível.
+    """
+    tail = tail[tail.find(b"\n") + 1 :]  # Descarta o registro (e o caractere) cortado
     try:
-        logging.info(
-            f"Criando tabela '{full_table_name_for_log}' com as colunas: {', '.join(df_chunk.columns)}"
-        )
-        cursor.execute(create_table_sql)
-        conn.commit()
-        logging.info(f"Tabela '{full_table_name_for_log}' criada com sucesso.")
-        return sanitized_table_name, current_schema, False
-    except pyodbc.Error as e:
-        if (
-            "2760" in str(e)
-            or "schema" in str(e).lower()
-            and ("does not exist" in str(e).lower() or "cannot find" in str(e).lower())
-        ):
-            logging.warning(
-                f"O esquema '{current_schema}' parece não existir ou não há permissão para usá-lo. Tentando criar o esquema '{current_schema}'..."
-            )
-            try:
-                cursor.execute(
-                    f"IF NOT EXISTS (SELECT * FROM sys.schemas WHERE name = '{current_schema}') EXEC('CREATE SCHEMA [{current_schema}]')"
-                )
-                conn.commit()
-                logging.info(
-                    f"Esquema '{current_schema}' verificado/criado. Tentando criar a tabela '{full_table_name_for_log}' novamente."
-                )
-                cursor.execute(create_table_sql)
-                conn.commit()
-                logging.info(
-                    f"Tabela '{full_table_name_for_log}' criada com sucesso após criação do esquema."
-                )
-                return sanitized_table_name, current_schema, False
-            except pyodbc.Error as e_schema:
-                logging.error(
-                    f"Erro ao tentar criar o esquema '{current_schema}' ou a tabela '{full_table_name_for_log}' após tentativa de criação do esquema: {e_schema}"
-                )
-                conn.rollback()
-                return sanitized_table_name, current_schema, False
-        else:
-            logging.error(f"Erro ao criar tabela '{full_table_name_for_log}': {e}")
-            conn.rollback()
-            return sanitized_table_name, current_schema, False
+        tail.decode("utf-8")
+        return encoding, source
+    except UnicodeDecodeError:
+        pass
+    tail_encoding, tail_source = _detect_buffer_encoding(file_path, tail, True)
+    if tail_encoding.startswith("utf") or not is_ascii_compatible_encoding(tail_encoding):
+        tail_encoding, tail_source = "cp1252", "fallback"
+    return tail_encoding, f"{tail_source}, pelo fim do arquivo"
+
+
+def _detect_dialect(text):
+    """
+    Detecta separador, aspas e quebra de linha a partir de vários registros do texto: o
+    separador escolhido é o que produz o número de campos mais consistente (e maior).
+    """
+    if "\r\n" in text:
+        lineterminator = "\r\n"
+    elif "\r" in text and "\n" not in text:
+        lineterminator = "\r"
+    else:
+        lineterminator = "\n"
+
+    quotechar = '"'
+    if '"' not in text and re.search(r"(?:^|[,;\t|])'", text, re.MULTILINE):
+        quotechar = "'"
+
+    best_delimiter, best_score = ",", None
+    for delimiter in DELIMITER_CANDIDATES:
+        reader = csv.reader(io.StringIO(text, newline=""), delimiter=delimiter, quotechar=quotechar)
+        try:
+            counts = [len(row) for row in itertools.islice(reader, 50) if row]
+        except csv.Error:
+            continue
+        if not counts:
+            continue
+        fields, frequency = collections.Counter(counts).most_common(1)[0]
+        if fields < 2:
+            continue
+        score = (frequency / len(counts), fields)
+        if best_score is None or score > best_score:
+            best_delimiter, best_score = delimiter, score
+    return best_delimiter, quotechar, lineterminator
+
+
+def _header_end_in_buffer(head, quote):
+    """Offset logo após o primeiro registro de `head` (bytes), respeitando aspas."""
+    in_quotes = False
+    scan = 0
+    while True:
+        newline = head.find(b"\n", scan)
+        if newline == -1:
+            return len(head)
+        in_quotes ^= bool(head.count(quote, scan, newline) & 1)
+        scan = newline + 1
+        if not in_quotes:
+            return scan
+
+
+def probe_csv_file(file_path, encoding=None, sample_size=PROBE_SAMPLE_SIZE):
+    """
+    Lê uma única vez o início do arquivo e determina encoding (se não for informado),
+    dialeto e cabeçalho. Retorna um CsvProbe, guardado em cache enquanto o arquivo não
+    mudar. O buffer cresce até conter o cabeçalho completo. Em arquivos não compactados,
+    quando o início é só ASCII, o fim do arquivo também é conferido (veja
+    _detect_tail_encoding).
+    """
+    file_stat = os.stat(source_file_path(file_path))
+    base_key = (os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime_ns)
+    cached = _probe_cache.get(base_key + (None,))
+    if cached is not None and encoding in (None, cached.encoding):
+        return cached
+    if base_key + (encoding,) in _probe_cache:
+        return _probe_cache[base_key + (encoding,)]
 
+    tail = b""
+    mapping = map_csv_file(file_path)
+    if mapping is not None:
+        with mapping:
+            newline = mapping.find(b"\n")
+            head_size = len(mapping) if newline == -1 else (newline // sample_size + 1) * sample_size
+            head = mapping[:head_size]
+            complete = len(head) == len(mapping)
+            if not complete:
+                tail = mapping[max(len(head), len(mapping) - sample_size) :]
+    else:
+        with open_csv_binary(file_path) as f:
+            head = f.read(sample_size)
+            while b"\n" not in head:
+                more = f.read(sample_size)
+                if not more:
+                    break
+                head += more
+            # O tamanho em disco não vale para entradas compactadas: testa o fim do stream.
+            complete = not f.read(1)
 
-def detect_encoding(file_path, sample_size=1024 * 10):
-    """Detecta o encoding de um arquivo usando chardet lendo uma amostra."""
+    source = "informado"
+    probe_encoding = encoding
+    if probe_encoding is None:
+        probe_encoding, source = _detect_buffer_encoding(file_path, head, complete)
+        if source == "validação UTF-8" and tail and head.isascii():
+            probe_encoding, source = _detect_tail_encoding(file_path, tail, probe_encoding, source)
     try:
-        with open(file_path, "rb") as f_raw:
-            raw_data = f_raw.read(sample_size)
-        result = chardet.detect(raw_data)
-        encoding = result["encoding"]
-        confidence = result["confidence"]
-        logging.info(
-            f"Detecção de encoding para {file_path}: {encoding} com confiança {confidence:.2f}"
+        text = codecs.getincrementaldecoder(probe_encoding)().decode(head, final=complete)
+    except (UnicodeDecodeError, LookupError) as e:
+        logging.warning(
+            f"Falha ao decodificar o início de {file_path} com '{probe_encoding}': {e}. Usando latin1 como último recurso."
         )
-        
-        # Se detectar ASCII, verificar se realmente não há caracteres especiais
-        # no arquivo inteiro, pois pode haver caracteres especiais após a amostra
-        if encoding and encoding.lower() == 'ascii' and confidence > 0.9:
-            # Verifica se o arquivo realmente é ASCII completo ou possui caracteres UTF-8
-            try:
-                # Abre uma pequena parte do final do arquivo para verificar
-                with open(file_path, 'rb') as f_check:
-                    # Move para uma posição mais avançada do arquivo
-                    f_check.seek(max(0, os.path.getsize(file_path) - 50000))
-                    check_data = f_check.read(50000)
-                    
-                try:
-                    # Tenta decodificar como ASCII
-                    check_data.decode('ascii')
-                except UnicodeDecodeError:
-                    # Se falhar como ASCII, provavelmente tem caracteres especiais
-                    logging.warning(
-                        f"Arquivo {file_path} foi detectado como ASCII mas contém caracteres não-ASCII. "
-                        f"Usando UTF-8 como encoding."
-                    )
-                    return "utf-8"
-            except Exception as e:
-                logging.warning(
-                    f"Erro ao verificar caracteres especiais em {file_path}: {e}. "
-                    f"Por precaução, usando UTF-8 como encoding."
-                )
-                return "utf-8"
-        
-        # Ajuste para lidar com arquivos CSV em português
-        if encoding and encoding.lower() == 'ascii' and os.path.splitext(file_path)[1].lower() in ['.csv', '.txt']:
-            logging.info(f"Arquivo CSV/TXT detectado como ASCII, usando UTF-8 como prevenção para caracteres especiais.")
-            return "utf-8"
-            
-        if encoding and confidence > 0.7:
-            return encoding
-        else:
-            logging.warning(
-                f"Confiança baixa ({confidence:.2f}) para encoding detectado ('{encoding}') em {file_path}. Usando utf-8 como fallback."
-            )
-            return "utf-8"
-    except Exception as e:
+        probe_encoding, source = "latin1", "último recurso"
+        text = head.decode(probe_encoding)
+    if not complete and "\n" in text:
+        text = text[: text.rindex("\n") + 1]  # Descarta o registro parcial do fim do buffer
+
+    delimiter, quotechar, lineterminator = _detect_dialect(text)
+    records = []
+    try:
+        reader = csv.reader(io.StringIO(text, newline=""), delimiter=delimiter, quotechar=quotechar)
+        records = list(itertools.islice(reader, 2))
+    except csv.Error as e:
+        logging.warning(f"Erro ao ler o cabeçalho de {file_path}: {e}")
+    header = records[0] if records else []
+    has_data = any(records[1:]) or (not complete and len(records) == 1)
+
+    data_start = None
+    if is_ascii_compatible_encoding(probe_encoding):
+        data_start = _header_end_in_buffer(head, quotechar.encode("ascii"))
+
+    probe = CsvProbe(
+        file_path,
+        probe_encoding,
+        delimiter,
+        quotechar,
+        lineterminator,
+        header,
+        has_data,
+        data_start,
+    )
+    logging.info(
+        f"Probe de {file_path}: encoding '{probe_encoding}' ({source}), separador {delimiter!r}, "
+        f"aspas {quotechar!r}, quebra de linha {lineterminator!r}, {len(header)} colunas."
+    )
+    _probe_cache[base_key + (encoding,)] = probe
+    return probe
+
+
+def detect_encoding(file_path, sample_size=PROBE_SAMPLE_SIZE):
+    """Detecta o encoding de um arquivo (veja probe_csv_file)."""
+    try:
+        return probe_csv_file(file_path, sample_size=sample_size).encoding
+    except OSError as e:
         logging.error(
             f"Erro ao detectar encoding para {file_path}: {e}. Usando utf-8 como fallback."
         )
         return "utf-8"
 
 
-def detect_separator(file_path, encoding="utf-8", sample_size=1024 * 10):
-    """
-    Detecta o separador usado no arquivo CSV analisando uma amostra do arquivo.
-    Retorna ',' ou ';' baseado na análise da primeira linha não vazia.
-    """
+def detect_separator(file_path, encoding="utf-8", sample_size=PROBE_SAMPLE_SIZE):
+    """Detecta o separador usado no arquivo CSV (veja probe_csv_file)."""
     try:
-        with open(file_path, "r", encoding=encoding) as f:
-            for line in f:
-                line = line.strip()
-                if line:  # Primeira linha não vazia
-                    comma_count = line.count(",")
-                    semicolon_count = line.count(";")
-
-                    if semicolon_count > comma_count:
-                        logging.info(f"Detectado separador ';' para {file_path}") 
-                        return ";"
-                    else:
-                        logging.info(f"Detectado separador ',' para {file_path}")
-                        return ","
-
-        logging.warning(
-            f"Não foi possível detectar o separador em {file_path}. Usando ',' como padrão."
-        )
-        return ","
-    except Exception as e:
+        return probe_csv_file(file_path, encoding, sample_size=sample_size).delimiter
+    except OSError as e:
         logging.error(
             f"Erro ao detectar separador para {file_path}: {e}. Usando ',' como padrão."
         )
         return ","
 
 
-def insert_data_from_csv(
-    conn,
-    table_name,
+def is_ascii_compatible_encoding(encoding):
+    """Indica se quebras de linha e aspas têm o mesmo byte que em ASCII (utf-8, latin1, cp1252...)."""
+    try:
+        # utf-8-sig só difere do utf-8 pelo BOM, que fica antes do cabeçalho.
+        return codecs.lookup(encoding).name == "utf-8-sig" or "\n\"".encode(encoding) == b"\n\""
+    except (LookupError, UnicodeError):
+        return False
+
+
+def find_header_end_offset(file_path, quotechar='"', sample_size=1024 * 1024):
+    """Retorna o offset em bytes logo após o registro de cabeçalho (respeitando aspas)."""
+    with open_csv_binary(file_path) as f:
+        head = f.read(sample_size)
+    return _header_end_in_buffer(head, quotechar.encode("ascii"))
+
+
+def compute_csv_partitions(
+    file_path, num_partitions, data_start=0, quotechar='"', block_size=8 * 1024 * 1024
+):
+    """
+    Divide o arquivo em até `num_partitions` faixas de bytes [início, fim) alinhadas a
+    fronteiras de registro. A paridade das aspas é acompanhada desde `data_start`, de modo
+    que quebras de linha dentro de campos entre aspas nunca são usadas como fronteira.
+    O arquivo é lido pelo mesmo mapeamento em memória do motor de streaming (map_csv_file).
+    """
+    file_size = os.path.getsize(file_path)
+    if num_partitions <= 1 or file_size <= data_start:
+        return [(data_start, file_size)]
+    mapping = map_csv_file(file_path)
+    if mapping is None:
+        return [(data_start, file_size)]
+
+    step = (file_size - data_start) // num_partitions
+    targets = [data_start + step * i for i in range(1, num_partitions)]
+    boundaries = [data_start]
+    quote = quotechar.encode("ascii")
+
+    in_quotes = False
+    searching = False
+    target_index = 0
+    position = data_start
+    with mapping:
+        while target_index < len(targets):
+            block = mapping[position : position + block_size]
+            if not block:
+                break
+            scan = 0
+            while scan < len(block) and target_index < len(targets):
+                if not searching:
+                    relative_target = targets[target_index] - position
+                    if relative_target >= len(block):
+                        break
+                    if relative_target > scan:
+                        in_quotes ^= bool(block.count(quote, scan, relative_target) & 1)
+                        scan = relative_target
+                    searching = True
+                newline = block.find(b"\n", scan)
+                if newline == -1:
+                    break
+                in_quotes ^= bool(block.count(quote, scan, newline) & 1)
+                scan = newline + 1
+                if not in_quotes:
+                    boundary = position + scan
+                    boundaries.append(boundary)
+                    searching = False
+                    target_index += 1
+                    while (
+                        target_index < len(targets)
+                        and targets[target_index] < boundary
+                    ):
+                        target_index += 1
+            in_quotes ^= bool(block.count(quote, scan) & 1)
+            position += len(block)
+
+    boundaries.append(file_size)
+    return [
+        (start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start
+    ]
+
+
+def _iter_line_blocks(data, start, end, block_size):
+    """
+    Gera (offset, bytes) de blocos de cerca de `block_size` bytes de `data` (mmap ou bytes)
+    a partir de `start`, cada um terminado em uma quebra de linha (exceto o último do
+    arquivo). Linhas que começam antes de `end` (None = fim do arquivo) saem inteiras.
+    """
+    size = len(data)
+    stop = size if end is None else min(end, size)
+    position = start
+    while position < stop:
+        target = position + block_size
+        if target >= stop:
+            newline = stop - 1 if data[stop - 1 : stop] == b"\n" else data.find(b"\n", stop)
+        else:
+            newline = data.rfind(b"\n", position, target)
+            if newline == -1:  # Linha maior que o bloco
+                newline = data.find(b"\n", target)
+        cut = size if newline == -1 else newline + 1
+        yield position, data[position:cut]
+        position = cut
+
+
+def _iter_stream_line_blocks(stream, start, end, block_size):
+    """Como _iter_line_blocks, mas lendo de um stream já posicionado em `start`."""
+    position = start
+    carry = b""
+    while end is None or position < end:
+        chunk = stream.read(block_size)
+        if not chunk:
+            if carry:
+                yield position, carry
+            return
+        data = carry + chunk
+        if end is not None and position + len(data) > end:
+            newline = data.find(b"\n", max(end - position - 1, 0))
+            if newline != -1:
+                yield position, data[: newline + 1]
+                return
+        newline = data.rfind(b"\n")
+        if newline == -1:
+            carry = data
+            continue
+        yield position, data[: newline + 1]
+        position += newline + 1
+        carry = data[newline + 1 :]
+
+
+class _LineSource:
+    """
+    Iterador de linhas decodificadas de um arquivo binário a partir do offset `start` (e até
+    `end`, se informado). O arquivo é lido em blocos de `block_size` bytes cortados na
+    última quebra de linha, de um mmap (veja map_csv_file) ou, em entradas compactadas, do
+    stream descompactado: cada bloco é decodificado de uma vez e dividido em linhas em C,
+    sem trabalho em Python por linha.
+    `position` é o offset em bytes logo após a última linha entregue: como o csv.reader só
+    pede linhas quando precisa, após cada registro ele aponta para o início do próximo, o
+    que permite checkpoints e retomadas. Requer um encoding compatível com ASCII (veja
+    is_ascii_compatible_encoding). Em entradas compactadas os offsets são do conteúdo
+    descompactado.
+    """
+
+    def __init__(self, file_path, encoding, start=0, end=None, block_size=READ_BLOCK_SIZE):
+        self._map = map_csv_file(file_path)
+        self._file = None
+        if self._map is None:
+            self._file = open_csv_binary(file_path)
+            self._file.seek(start)
+        # O BOM fica antes do cabeçalho: os blocos de dados são UTF-8 puro.
+        self._encoding = "utf-8" if codecs.lookup(encoding).name == "utf-8-sig" else encoding
+        self._start = start
+        self._end = end
+        self._block_size = block_size
+        self._block_start = start
+        self._block_lines = io.StringIO()
+        self._block_text = None  # Só guardado se caracteres e bytes não coincidirem
+        self._counted_chars = 0
+        self._counted_bytes = 0
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self._blocks())
+
+    def _blocks(self):
+        if self._map is not None:
+            blocks = _iter_line_blocks(self._map, self._start, self._end, self._block_size)
+        else:
+            blocks = _iter_stream_line_blocks(self._file, self._start, self._end, self._block_size)
+        for block_start, raw in blocks:
+            text = raw.decode(self._encoding)
+            self._block_text = text if len(text) != len(raw) else None
+            self._counted_chars = self._counted_bytes = 0
+            self._block_lines = io.StringIO(text, newline="\n")
+            self._block_start = block_start
+            yield self._block_lines
+
+    @property
+    def position(self):
+        consumed = self._block_lines.tell()
+        if self._block_text is None:
+            return self._block_start + consumed
+        # Bloco com caracteres multibyte: reencoda só o trecho lido desde a última consulta.
+        if consumed != self._counted_chars:
+            self._counted_bytes += len(
+                self._block_text[self._counted_chars : consumed].encode(self._encoding)
+            )
+            self._counted_chars = consumed
+        return self._block_start + self._counted_bytes
+
+    @property
+    def compressed_bytes(self):
+        """Bytes compactados lidos do disco até agora (None se a entrada não for compactada)."""
+        return compressed_input_bytes(self._file) if self._file is not None else None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+
+# --- Inferência de tipos por amostragem ---
+
+
+def sample_csv_rows(
+    probe,
+    num_columns,
+    head_rows=1000,
+    random_samples=20,
+    rows_per_sample=50,
+):
+    """
+    Amostra linhas do CSV descrito por `probe` (CsvProbe) para inferência de tipos: as
+    primeiras `head_rows` linhas e, em arquivos maiores, `random_samples` trechos a partir
+    de offsets aleatórios (sementes fixas por tamanho do arquivo). Linhas com número de
+    campos divergente são descartadas.
+    """
+    file_path = probe.file_path
+    encoding = probe.encoding
+    separator = probe.delimiter
+    rows = []
+    with open_csv_text(file_path, encoding, errors="replace") as f:
+        reader = csv.reader(f, delimiter=separator, quotechar=probe.quotechar)
+        next(reader, None)
+        for row in itertools.islice(reader, head_rows):
+            if len(row) == num_columns:
+                rows.append(row)
+
+    if random_samples <= 0 or probe.data_start is None or input_compression(file_path) is not None:
+        # Sem offsets em bytes (encoding não compatível com ASCII) ou sem acesso aleatório
+        # barato (entrada compactada): fica só o início do arquivo.
+        return rows
+    file_size = _file_size(file_path)
+    data_start = probe.data_start
+    if file_size - data_start < 1024 * 1024:
+        return rows
+
+    rng = random.Random(file_size)
+    with open(file_path, "rb") as f_raw:
+        for _ in range(random_samples):
+            f_raw.seek(rng.randrange(data_start, file_size))
+            f_raw.readline()  # Descarta o registro parcial
+            chunk = f_raw.read(64 * 1024)
+            lines = chunk.decode(encoding, errors="replace").split("\n")[:-1]
+            reader = csv.reader(lines, delimiter=separator, quotechar=probe.quotechar)
+            for row in itertools.islice(reader, rows_per_sample):
+                if len(row) == num_columns:
+                    rows.append(row)
+    return rows
+
+
+def infer_column_types(probe):
+    """Infere um tipo SQL Server por coluna do cabeçalho de `probe` a partir de uma amostra do arquivo."""
+    columns = probe.header
+    rows = sample_csv_rows(probe, len(columns))
+    column_types = [infer_sql_type(values) for values in zip(*rows)] if rows else []
+    if len(column_types) != len(columns):
+        column_types = ["NVARCHAR(MAX)"] * len(columns)
+    logging.info(
+        f"Tipos inferidos para {probe.file_path} a partir de {len(rows)} linhas de amostra: "
+        + ", ".join(f"{col} {sql_type}" for col, sql_type in zip(columns, column_types))
+    )
+    return column_types
+
+
+def new_stream_stats():
+    """Cria o dicionário de estatísticas preenchido por `stream_csv_batches`."""
+    return {
+        "rows_read": 0,
+        "last_line": 0,
+        # Offset em bytes após o último registro do lote (só com um _LineSource).
+        "last_offset": None,
+        "line_errors": 0,
+        "divergent_rows": 0,
+        "divergent_original_columns": 0,
+        "divergent_inserted_columns": 0,
+        "rows_by_column_count": {},
+    }
+
+
+def build_row_normalizer(num_columns):
+    """
+    Retorna uma função que ajusta uma linha ao número de colunas do cabeçalho e converte
+    cada campo para o valor de bind: texto sem espaços nas pontas, ou None se vazio.
+    """
+
+    def normalize(row):
+        return tuple([value.strip() or None for value in row])
+
+    def normalize_divergent(row):
+        if len(row) > num_columns:
+            row = row[:num_columns]
+        else:
+            row = row + [""] * (num_columns - len(row))
+        return normalize(row)
+
+    return normalize, normalize_divergent
+
+
+def stream_csv_batches(
+    text_stream,
+    separator,
+    num_columns,
+    batch_size,
+    stats,
+    line_offset=0,
+    quotechar='"',
+    tuner=None,
+    rejects=None,
+):
+    """
+    Motor de leitura em streaming: um único csv.reader percorre todo o stream (campos entre
+    aspas podem conter quebras de linha) e produz lotes de tuplas prontos para o bind.
+    Linhas com número de campos diferente de `num_columns` são ajustadas e contabilizadas
+    em `stats` (veja `new_stream_stats`); elas e as linhas descartadas por erro de parsing
+    são registradas em `rejects` (RejectLog, que amostra os avisos do log).
+    `line_offset` é somado aos números de linha registrados.
+    Se o stream for um `_LineSource`, `stats["last_offset"]` acompanha o fim de cada lote.
+    Com um `tuner` (BatchSizeTuner), o tamanho de cada lote é relido de `tuner.rows`.
+    """
+    reader = csv.reader(text_stream, delimiter=separator, quotechar=quotechar)
+    line_source = text_stream if isinstance(text_stream, _LineSource) else None
+    normalize, normalize_divergent = build_row_normalizer(num_columns)
+    rows_by_column_count = stats["rows_by_column_count"]
+    if rejects is None:
+        rejects = RejectLog()
+    if tuner is not None:
+        batch_size = tuner.rows
+    batch = []
+
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as line_error:
+            stats["line_errors"] += 1
+            rejects.reject(reader.line_num + line_offset, "erro_de_parsing", str(line_error))
+            continue
+
+        if len(row) == num_columns:
+            batch.append(normalize(row))
+        else:
+            colunas_originais = len(row)
+            stats["divergent_rows"] += 1
+            stats["divergent_original_columns"] += colunas_originais
+            stats["divergent_inserted_columns"] += min(colunas_originais, num_columns)
+            rows_by_column_count[colunas_originais] = (
+                rows_by_column_count.get(colunas_originais, 0) + 1
+            )
+            rejects.reject(
+                reader.line_num + line_offset,
+                "campos_divergentes",
+                f"{colunas_originais} campos, esperado {num_columns}",
+                row,
+            )
+            batch.append(normalize_divergent(row))
+
+        if len(batch) >= batch_size:
+            stats["rows_read"] += len(batch)
+            stats["last_line"] = reader.line_num + line_offset
+            if line_source is not None:
+                stats["last_offset"] = line_source.position
+            yield batch
+            batch = []
+            if tuner is not None:
+                batch_size = tuner.rows
+
+    if batch:
+        stats["rows_read"] += len(batch)
+        stats["last_line"] = reader.line_num + line_offset
+        if line_source is not None:
+            stats["last_offset"] = line_source.position
+        yield batch
+
+
+def log_divergent_column_stats(csv_file_path, stats, num_columns):
+    """Registra as estatísticas de linhas com número de colunas divergente do cabeçalho."""
+    if stats["divergent_rows"] == 0:
+        return
+    logging.info(f"Estatísticas do arquivo {csv_file_path}:")
+    logging.info(
+        f"- Total de linhas com colunas divergentes: {stats['divergent_rows']}"
+    )
+    logging.info(
+        f"- Relação colunas inseridas/originais: {stats['divergent_inserted_columns']}/{stats['divergent_original_columns']}"
+    )
+    logging.info(
+        f"- Total de colunas processadas: {num_columns}, colunas inseridas: {num_columns}"
+    )
+    logging.info(f"- Distribuição de linhas por quantidade de colunas:")
+    for num_cols, count in sorted(stats["rows_by_column_count"].items()):
+        logging.info(f"  * {num_cols} colunas: {count} linhas")
+
+
+class RejectLog:
+    """
+    Registro das linhas malformadas de uma carga. Cada linha vai para um CSV compactado
+    (gzip) em `path` com as colunas linha, motivo, acao ("ajustada" quando a linha foi
+    carregada com as colunas completadas/cortadas, "descartada" quando não pôde ser lida),
+    detalhe e, em seguida, os campos lidos. O arquivo só é criado na primeira rejeição; sem
+    `append` (carga do zero), um arquivo anterior em `path` é removido.
+    No log entram apenas as `log_first` primeiras linhas e, depois, no máximo uma a cada
+    `log_interval` segundos; `close` informa o total e quantos avisos foram omitidos.
+    """
+
+    HEADER = ["linha", "motivo", "acao", "detalhe", "campos"]
+
+    def __init__(
+        self,
+        path=None,
+        label="",
+        append=False,
+        log_first=REJECT_LOG_FIRST,
+        log_interval=REJECT_LOG_INTERVAL_SECONDS,
+    ):
+        self.path = path
+        self.label = label
+        self.append = append
+        self.log_first = log_first
+        self.log_interval = log_interval
+        self.count = 0
+        self.suppressed = 0
+        self._last_logged = 0.0
+        self._file = None
+        self._writer = None
+        if path and not append and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"Não foi possível remover o arquivo de rejeições anterior '{path}': {e}")
+
+    def _open(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            new_file = not os.path.exists(self.path)
+            # Nível 6: quase a compressão máxima por bem menos CPU na thread de leitura.
+            self._file = gzip.open(self.path, "at", encoding="utf-8", newline="", compresslevel=6)
+            self._writer = csv.writer(self._file)
+            if new_file:
+                self._writer.writerow(self.HEADER)
+        except OSError as e:
+            logging.error(
+                f"Não foi possível criar o arquivo de rejeições '{self.path}': {e}. As linhas malformadas serão apenas contadas."
+            )
+            self.path = None
+
+    def reject(self, line_number, reason, detail, fields=None):
+        """
+        Registra uma linha malformada; `fields` (campos lidos) indica que ela foi ajustada e
+        carregada. `line_number` é None quando o motor não conhece a linha física (arrow).
+        """
+        self.count += 1
+        action = "descartada" if fields is None else "ajustada"
+        if self.path and self._writer is None:
+            self._open()
+        if self._writer is not None:
+            self._writer.writerow(
+                ["" if line_number is None else line_number, reason, action, detail] + list(fields or [])
+            )
+
+        now = time.monotonic()
+        if self.count > self.log_first and now - self._last_logged < self.log_interval:
+            self.suppressed += 1
+            return
+        self._last_logged = now
+        where = f" de {self.label}" if self.label else ""
+        omitted = f" ({self.suppressed} aviso(s) omitido(s) até aqui)" if self.suppressed else ""
+        line = f"Linha {line_number}" if line_number is not None else "Linha"
+        logging.warning(f"{line}{where}: {detail} (linha {action}).{omitted}")
+        if self.count == self.log_first:
+            logging.warning(
+                f"Demais linhas malformadas{where} serão registradas no log no máximo a cada {self.log_interval} s"
+                + (f"; todas estão em '{self.path}'." if self.path else ".")
+            )
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError as e:
+                logging.error(f"Erro ao fechar o arquivo de rejeições '{self.path}': {e}")
+            self._file = None
+            self._writer = None
+        if self.count:
+            where = f" em {self.label}" if self.label else ""
+            logging.info(
+                f"{self.count} linha(s) malformada(s){where}; {self.suppressed} aviso(s) omitido(s) do log."
+                + (f" Detalhes em '{self.path}'." if self.path else "")
+            )
+
+
+def reject_file_path(table_name, schema_name=None, byte_range=None, reject_dir=REJECT_DIR):
+    """Caminho do arquivo de rejeições de uma tabela (e faixa de bytes, na carga particionada)."""
+    current_schema = schema_name if schema_name else DB_SCHEMA
+    range_suffix = f".{byte_range[0]}-{byte_range[1]}" if byte_range else ""
+    return os.path.join(reject_dir, f"{current_schema}.{table_name}{range_suffix}.rejects.csv.gz")
+
+
+# --- Perfil de colunas ---
+
+PROFILE_DIR = "profiles"
+
+
+class HyperLogLog:
+    """Estimativa aproximada de valores distintos em memória fixa (2**precision registradores)."""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+        self._rank_bits = 64 - precision
+
+    def add(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> self._rank_bits
+        rank = self._rank_bits - (hashed & ((1 << self._rank_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # Correção para cardinalidades pequenas
+        return int(round(estimate))
+
+
+class ColumnProfile:
+    """
+    Estatísticas de uma coluna acumuladas em uma única passada e em memória limitada:
+    comprimentos máximos, nulos, valores numéricos/datas, distintos (HyperLogLog) e o
+    menor tipo SQL Server que comporta todos os valores vistos.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.nulls = 0
+        self.max_chars = 0
+        self.max_bytes = 0
+        self.numeric = 0
+        self.dates = 0
+        self.sql_type = None
+        self._validator = None
+        self._distinct = HyperLogLog()
+
+    def update(self, values):
+        for value in values:
+            self.rows += 1
+            if value is None:
+                self.nulls += 1
+                continue
+            length = len(value)
+            if length > self.max_chars:
+                self.max_chars = length
+            if length * 4 > self.max_bytes:
+                self.max_bytes = max(self.max_bytes, len(value.encode("utf-8", "surrogatepass")))
+            if DECIMAL_RE.fullmatch(value):
+                self.numeric += 1
+            elif is_valid_datetime(value):
+                self.dates += 1
+            self._distinct.add(value)
+            if self.sql_type is None:
+                self.sql_type = infer_sql_type([value])
+                self._validator = build_type_validator(self.sql_type)
+            elif self._validator is not None and not self._validator(value):
+                self.sql_type = merge_sql_types(self.sql_type, infer_sql_type([value]))
+                self._validator = build_type_validator(self.sql_type)
+
+    @property
+    def null_ratio(self):
+        return self.nulls / self.rows if self.rows else 0.0
+
+    def text_type(self):
+        """NVARCHAR dimensionado pelo maior valor visto, com a mesma folga da inferência."""
+        length = int(self.max_chars * TYPE_INFERENCE_LENGTH_MARGIN)
+        if not length or length > NVARCHAR_MAX_LENGTH:
+            return "NVARCHAR(MAX)"
+        return f"NVARCHAR({length})"
+
+    def inferred_type(self):
+        if self.sql_type is None or parse_sql_type(self.sql_type)[0] == "NVARCHAR":
+            return self.text_type()
+        return self.sql_type
+
+    def to_dict(self):
+        non_null = self.rows - self.nulls
+        return {
+            "column": self.name,
+            "rows": self.rows,
+            "max_chars": self.max_chars,
+            "max_bytes": self.max_bytes,
+            "null_ratio": round(self.null_ratio, 4),
+            "numeric_ratio": round(self.numeric / non_null, 4) if non_null else 0.0,
+            "date_ratio": round(self.dates / non_null, 4) if non_null else 0.0,
+            "approx_distinct": self._distinct.count(),
+            "inferred_type": self.inferred_type(),
+        }
+
+
+def profile_csv_file(probe, chunk_size=10000):
+    """
+    Lê o CSV descrito por `probe` (CsvProbe) uma vez com o motor de streaming e retorna a
+    lista de ColumnProfile (uma por coluna do cabeçalho), ou None se o arquivo não tiver
+    cabeçalho. As linhas malformadas só são contadas: os avisos ficam para a carga.
+    """
+    csv_file_path = probe.file_path
+    separator = probe.delimiter
+    with open_csv_text(csv_file_path, probe.encoding) as file:
+        header = next(csv.reader(file, delimiter=separator, quotechar=probe.quotechar), None)
+        if not header:
+            return None
+        profiles = [
+            ColumnProfile("".join(c if c.isalnum() else "_" for c in col)) for col in header
+        ]
+        stream_stats = new_stream_stats()
+        silent_rejects = RejectLog(log_first=0, log_interval=math.inf)
+        for batch in stream_csv_batches(
+            file,
+            separator,
+            len(header),
+            chunk_size,
+            stream_stats,
+            line_offset=1,
+            quotechar=probe.quotechar,
+            rejects=silent_rejects,
+        ):
+            for profile, values in zip(profiles, zip(*batch)):
+                profile.update(values)
+    logging.info(
+        f"Perfil de {csv_file_path}: {stream_stats['rows_read']} linhas, {len(header)} colunas, "
+        f"{stream_stats['divergent_rows'] + stream_stats['line_errors']} linha(s) malformada(s)."
+    )
+    return profiles
+
+
+def log_column_profile(csv_file_path, profiles):
+    """Registra o perfil de cada coluna no log."""
+    for profile in profiles:
+        summary = profile.to_dict()
+        logging.info(
+            f"- {csv_file_path} [{summary['column']}]: {summary['inferred_type']}, "
+            f"máx. {summary['max_chars']} caracteres / {summary['max_bytes']} bytes, "
+            f"nulos {summary['null_ratio']:.1%}, numéricos {summary['numeric_ratio']:.1%}, "
+            f"datas {summary['date_ratio']:.1%}, ~{summary['approx_distinct']} distintos"
+        )
+
+
+def write_profile_report(csv_file_path, profiles, output_dir=PROFILE_DIR):
+    """Grava o perfil em `<output_dir>/<arquivo>.profile.json` e retorna o caminho."""
+    os.makedirs(output_dir, exist_ok=True)
+    report_path = os.path.join(
+        output_dir, f"{os.path.basename(csv_file_path)}.profile.json"
+    )
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"file": csv_file_path, "columns": [p.to_dict() for p in profiles]},
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    return report_path
+
+
+def profile_csv_files(csv_files, output_dir=PROFILE_DIR):
+    """Somente perfil (sem carga): detecta encoding e dialeto (probe_csv_file) e perfila cada arquivo."""
+    for csv_file in csv_files:
+        try:
+            profiles = profile_csv_file(probe_csv_file(csv_file))
+        except (UnicodeDecodeError, OSError) as e:
+            logging.error(f"Erro ao perfilar o arquivo '{csv_file}': {e}")
+            continue
+        if not profiles:
+            logging.warning(f"O arquivo CSV '{csv_file}' está vazio. Pulando.")
+            continue
+        log_column_profile(csv_file, profiles)
+        report_path = write_profile_report(csv_file, profiles, output_dir)
+        logging.info(f"Perfil de '{csv_file}' gravado em '{report_path}'.")
+
+
+def open_sink(
+    kind="sqlserver",
+    path=None,
+    conn_kwargs=None,
+    load_mode="executemany",
+    bulk_staging_dir=None,
+    bulk_server_dir=None,
+    infer_types=False,
+):
+    """
+    Abre o destino da carga. Para 'sqlserver' obtém uma conexão de um db_pool.ConnectionPool
+    próprio (com `conn_kwargs`), que a reabre se cair durante a execução, e retorna None se
+    não conseguir conectar; 'sqlite' e 'file' usam `path` (arquivo .db / diretório de saída).
+    """
+    if kind == "sqlserver":
+        pool = db_pool.ConnectionPool(
+            functools.partial(get_sql_server_connection, **(conn_kwargs or {}))
+        )
+        conn = pool.acquire()
+        if not conn:
+            return None
+        return SqlServerSink(
+            conn,
+            load_mode=load_mode,
+            bulk_staging_dir=bulk_staging_dir,
+            bulk_server_dir=bulk_server_dir,
+            infer_types=infer_types,
+            pool=pool,
+        )
+    if kind == "sqlite":
+        return SQLiteSink(path or "csv_ship.db")
+    if kind == "file":
+        return FileSink(path or "csv_ship_output")
+    if kind == "null":
+        return NullSink()
+    raise ValueError(f"Destino desconhecido: '{kind}'")
+
+
+def as_sink(target, **sink_kwargs):
+    """Aceita um CsvSink ou uma conexão pyodbc (que é embrulhada em um SqlServerSink)."""
+    if isinstance(target, CsvSink):
+        return target
+    return SqlServerSink(target, **sink_kwargs)
+
+
+# Bytes antes do último offset carregado conferidos pela carga incremental (veja CheckpointJournal.tail_point).
+TAIL_CHECK_BYTES = 4096
+
+
+def header_fingerprint(file_path, data_start):
+    """Hash BLAKE2 dos bytes do cabeçalho (do início do arquivo até `data_start`)."""
+    with open(file_path, "rb") as f:
+        return hashlib.blake2b(f.read(data_start), digest_size=16).hexdigest()
+
+
+def complete_lines_end(file_path, block_size=READ_BLOCK_SIZE):
+    """Offset logo após a última quebra de linha do arquivo (0 se não houver nenhuma)."""
+    with open(file_path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            index = f.read(end - start).rfind(b"\n")
+            if index >= 0:
+                return start + index + 1
+            end = start
+    return 0
+
+
+class CheckpointJournal:
+    """
+    Diário append-only (JSON lines) dos lotes confirmados de um arquivo em uma tabela (e
+    faixa de bytes, na carga particionada). Cada lote confirmado acrescenta o offset em
+    bytes logo após seu último registro, a linha e o total de linhas confirmadas; a entrada
+    "complete" marca a carga concluída. Tamanho e mtime do arquivo, gravados na entrada
+    "start", invalidam o diário se o arquivo mudar.
+    Com `header_hash` (veja header_fingerprint) o diário é o de uma carga incremental de um
+    arquivo que cresce: cada lote confirmado grava também o hash dos bytes antes do seu
+    offset, e o diário vale enquanto o cabeçalho e esses bytes não mudarem (veja
+    tail_point). Ao fim de cada carga o diário é compactado em "start" + "complete".
+    """
+
+    def __init__(
+        self,
+        csv_file_path,
+        table_name,
+        schema_name=None,
+        byte_range=None,
+        checkpoint_dir=CHECKPOINT_DIR,
+        header_hash=None,
+    ):
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        self.csv_file_path = csv_file_path
+        self.target = f"{current_schema}.{table_name}"
+        self.byte_range = list(byte_range) if byte_range else None
+        self.header_hash = header_hash
+        key = f"{os.path.abspath(csv_file_path)}|{self.target}|{self.byte_range}"
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, f"{self.target}.{digest}.jsonl")
+
+    def _fingerprint(self):
+        file_stat = os.stat(source_file_path(self.csv_file_path))
+        return {"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns}
+
+    def _tail_hash(self, offset):
+        with open(self.csv_file_path, "rb") as f:
+            f.seek(max(0, offset - TAIL_CHECK_BYTES))
+            return hashlib.blake2b(f.read(min(offset, TAIL_CHECK_BYTES)), digest_size=16).hexdigest()
+
+    def _append(self, entry, mode="a"):
+        with open(self.path, mode, encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite(self, entries):
+        """Substitui o diário por `entries` de forma atômica (arquivo temporário + os.replace)."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def start(self):
+        """Inicia um diário novo (carga do zero), descartando checkpoints anteriores."""
+        self._append(
+            {
+                "event": "start",
+                "file": os.path.abspath(self.csv_file_path),
+                "table": self.target,
+                "byte_range": self.byte_range,
+                **self._fingerprint(),
+                **({"header_hash": self.header_hash} if self.header_hash else {}),
+                "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            },
+            mode="w",
+        )
+
+    def record_partitions(self, count):
+        """
+        Registra que a carga foi dividida em `count` faixas, cada uma com seu próprio diário:
+        os lotes confirmados ficam nos diários das faixas, não neste.
+        """
+        self._append({"event": "partitions", "count": count})
+
+    def record(self, progress):
+        """Registra o lote confirmado descrito por `progress` (offset, line, rows)."""
+        entry = {
+            "event": "commit",
+            "offset": progress["offset"],
+            "line": progress["line"],
+            "rows": progress["rows"],
+        }
+        if self.header_hash:
+            # Permite à próxima carga incremental conferir se os bytes já carregados mudaram.
+            entry["tail_hash"] = self._tail_hash(progress["offset"])
+        self._append(entry)
+
+    def complete(self, progress):
+        entry = {
+            "event": "complete",
+            "rows": progress.get("rows", 0),
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        if not self.header_hash:
+            self._append(entry)
+            return
+        # Carga incremental: o diário só precisa do início e do último ponto confirmado.
+        entries = self._entries()
+        last = next((e for e in reversed(entries or []) if "tail_hash" in e), None)
+        if last is not None:
+            entry.update({key: last[key] for key in ("offset", "line", "tail_hash")})
+        self._rewrite(([entries[0]] if entries else []) + [entry])
+
+    def _entries(self):
+        if not os.path.exists(self.path):
+            return None
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break  # Última linha incompleta (queda durante a gravação)
+        if not entries or entries[0].get("event") != "start":
+            return None
+        return entries
+
+    def resume_point(self):
+        """
+        Retorna None se não houver diário válido para o arquivo atual; senão um dict com
+        "complete" e, se algum lote foi confirmado, "offset", "line" e "rows" do último
+        (ou "partitions", se a carga foi dividida em faixas com diários próprios).
+        """
+        entries = self._entries()
+        if entries is None:
+            return None
+        recorded = {key: entries[0].get(key) for key in ("size", "mtime_ns")}
+        if recorded != self._fingerprint():
+            logging.warning(
+                f"O arquivo '{self.csv_file_path}' mudou desde o checkpoint '{self.path}'. Checkpoint ignorado."
+            )
+            return None
+        point = {"complete": False}
+        for entry in entries[1:]:
+            if entry.get("event") == "commit":
+                point.update(offset=entry["offset"], line=entry["line"], rows=entry["rows"])
+            elif entry.get("event") == "partitions":
+                point["partitions"] = entry["count"]
+            elif entry.get("event") == "complete":
+                point["complete"] = True
+        return point
+
+    def tail_point(self):
+        """
+        Ponto de continuação da carga incremental: como resume_point, mas o arquivo pode ter
+        crescido desde o diário. Retorna None (recarga completa) se não houver diário, se o
+        cabeçalho mudou, se o arquivo encolheu ou se os bytes antes do último offset
+        concluído mudaram (arquivo truncado ou rotacionado). "complete" indica que não há
+        bytes novos depois do último lote confirmado.
+        """
+        entries = self._entries()
+        if entries is None:
+            return None
+        if entries[0].get("header_hash") != self.header_hash:
+            logging.warning(
+                f"O cabeçalho de '{self.csv_file_path}' mudou desde o checkpoint '{self.path}' (ou o checkpoint não é de uma carga incremental). Recarregando o arquivo inteiro."
+            )
+            return None
+        point = {"complete": False}
+        last = None
+        for entry in entries[1:]:
+            # Lotes confirmados e a entrada "complete" compactada trazem offset e tail_hash.
+            if "tail_hash" in entry:
+                last = entry
+                point.update(offset=entry["offset"], line=entry["line"], rows=entry["rows"])
+        size = self._fingerprint()["size"]
+        if size < point.get("offset", 0):
+            logging.warning(
+                f"'{self.csv_file_path}' tem {size} bytes, menos que os {point['offset']} já carregados (arquivo truncado ou rotacionado). Recarregando o arquivo inteiro."
+            )
+            return None
+        if last is not None and self._tail_hash(last["offset"]) != last["tail_hash"]:
+            logging.warning(
+                f"Os bytes já carregados de '{self.csv_file_path}' mudaram (arquivo substituído ou rotacionado). Recarregando o arquivo inteiro."
+            )
+            return None
+        point["complete"] = "offset" in point and size == point["offset"]
+        return point
+
+
+# --- Tamanho adaptativo dos lotes ---
+
+# Estimativa inicial de bytes por campo (objeto str + texto curto), antes de medir os lotes.
+ESTIMATED_FIELD_BYTES = 64
+
+
+def estimate_row_bytes(row):
+    """Memória ocupada por uma linha normalizada (tupla de str/None)."""
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row if value is not None)
+
+
+class BatchSizeTuner:
+    """
+    Escolhe o número de linhas do próximo lote. O teto vem de `memory_budget_bytes`
+    dividido pelos bytes por linha medidos em uma amostra de cada lote; dentro dele, o
+    tamanho segue o tempo de gravação do lote anterior para que cada lote leve
+    aproximadamente `target_seconds`, variando no máximo 2x por lote.
+    `rows` é lido pelo motor de streaming a cada lote (também pela thread de leitura).
+    """
+
+    def __init__(
+        self,
+        rows,
+        memory_budget_bytes=BATCH_MEMORY_BUDGET_BYTES,
+        target_seconds=TARGET_FLUSH_SECONDS,
+        num_columns=None,
+        min_rows=MIN_BATCH_ROWS,
+        max_rows=MAX_BATCH_ROWS,
+        label="",
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.target_seconds = target_seconds
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.label = label
+        self.bytes_per_row = (
+            sys.getsizeof(()) + (num_columns * ESTIMATED_FIELD_BYTES) if num_columns else None
+        )
+        self.rows = self._clamp(rows)
+        logging.info(
+            f"Lote inicial de {self.label}: {self.rows} linhas (orçamento de {memory_budget_bytes / (1024 * 1024):.0f} MB, alvo de {target_seconds:.2f} s por lote)."
+        )
+
+    def memory_cap(self):
+        if not self.bytes_per_row:
+            return self.max_rows
+        return int(self.memory_budget_bytes // self.bytes_per_row)
+
+    def _clamp(self, rows):
+        return max(self.min_rows, min(int(rows), self.max_rows, self.memory_cap()))
+
+    def record(self, batch, seconds):
+        """Ajusta `rows` a partir do lote gravado e do tempo que a gravação levou."""
+        if not batch:
+            return
+        step = max(1, len(batch) // 32)
+        sample = batch[::step]
+        measured = sum(estimate_row_bytes(row) for row in sample) / len(sample)
+        self.bytes_per_row = (
+            measured if self.bytes_per_row is None else 0.5 * self.bytes_per_row + 0.5 * measured
+        )
+
+        previous = self.rows
+        if seconds > 0:
+            proposed = len(batch) * self.target_seconds / seconds
+        else:
+            proposed = previous * 2
+        proposed = max(previous / 2, min(previous * 2, proposed))
+        self.rows = self._clamp(proposed)
+        rows_per_second = len(batch) / seconds if seconds > 0 else float("inf")
+        logging.info(
+            f"Lote de {len(batch)} linhas (~{len(batch) * self.bytes_per_row / (1024 * 1024):.1f} MB, {self.bytes_per_row:.0f} B/linha) "
+            + f"gravado em {seconds:.3f} s ({rows_per_second:.0f} linhas/s) em {self.label}. Próximo lote: {self.rows} linhas."
+        )
+
+
+# --- Pipeline de leitura/gravação ---
+
+STAGE_NAMES = ("parse", "insert", "commit", "insert_wait", "parse_wait")
+
+
+def new_stage_timings():
+    """
+    Segundos gastos por etapa da carga: "parse" (leitura e normalização dos lotes),
+    "insert" (envio dos lotes), "commit" (confirmação dos lotes e conclusão da carga),
+    "insert_wait" (gravação parada esperando um lote) e "parse_wait" (leitura parada com
+    a fila cheia).
+    """
+    return dict.fromkeys(STAGE_NAMES, 0.0)
+
+
+def add_stage_timings(total, timings):
+    """Soma `timings` (veja new_stage_timings) em `total`."""
+    for stage in STAGE_NAMES:
+        total[stage] = total.get(stage, 0.0) + timings.get(stage, 0.0)
+    return total
+
+
+def stage_bottleneck(timings):
+    """Retorna 'leitura' ou 'gravação', a etapa que mais tempo ocupou."""
+    return "leitura" if timings["parse"] > timings["insert"] + timings["commit"] else "gravação"
+
+
+def log_stage_timings(label, timings):
+    """Registra o tempo de cada etapa de uma carga e qual delas foi o gargalo."""
+    logging.info(
+        f"Etapas de {label}: leitura {timings['parse']:.2f} s, gravação {timings['insert']:.2f} s, commit {timings['commit']:.2f} s, "
+        + f"gravação esperando lotes {timings['insert_wait']:.2f} s, leitura esperando a fila {timings['parse_wait']:.2f} s "
+        + f"(gargalo: {stage_bottleneck(timings)})."
+    )
+
+
+# Limites (segundos) dos buckets do histograma de latência de gravação por lote.
+BATCH_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def new_load_metrics():
+    """
+    Métricas de uma carga preenchidas pelo motor de streaming: bytes lidos (descompactados)
+    e bytes compactados lidos do disco (só em entradas compactadas), linhas
+    rejeitadas (erro de parsing) e ajustadas (colunas divergentes) e o histograma da
+    latência de gravação (envio + commit) de cada lote, com um bucket por limite de
+    BATCH_LATENCY_BUCKETS e um último para valores acima deles.
+    """
+    return {
+        "bytes_read": 0,
+        "compressed_bytes_read": 0,
+        "rows_rejected": 0,
+        "rows_adjusted": 0,
+        "batches": 0,
+        "batch_seconds_sum": 0.0,
+        "batch_seconds_buckets": [0] * (len(BATCH_LATENCY_BUCKETS) + 1),
+    }
+
+
+def observe_batch_latency(metrics, seconds):
+    metrics["batches"] += 1
+    metrics["batch_seconds_sum"] += seconds
+    metrics["batch_seconds_buckets"][bisect.bisect_left(BATCH_LATENCY_BUCKETS, seconds)] += 1
+
+
+def add_load_metrics(total, metrics):
+    """Soma `metrics` (veja new_load_metrics) em `total`."""
+    for key in (
+        "bytes_read",
+        "compressed_bytes_read",
+        "rows_rejected",
+        "rows_adjusted",
+        "batches",
+        "batch_seconds_sum",
+    ):
+        total[key] += metrics.get(key, 0)
+    for index, count in enumerate(metrics.get("batch_seconds_buckets", ())):
+        total["batch_seconds_buckets"][index] += count
+    return total
+
+
+def _timed_batches(batches, timings):
+    """Percorre `batches` na thread atual, somando em timings["parse"] o tempo de cada lote."""
+    batches = iter(batches)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(batches)
+        except StopIteration:
+            return
+        timings["parse"] += time.perf_counter() - started
+        yield item
+
+
+class _PipelineError:
+    """Exceção da thread de leitura, entregue à thread de gravação pela fila."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _pipelined_batches(batches, depth, timings):
+    """
+    Percorre `batches` em uma thread de leitura que mantém até `depth` lotes prontos em uma
+    fila limitada, enquanto a thread que consome grava o lote anterior. Exceções da leitura
+    (ex.: UnicodeDecodeError) são relançadas no consumidor. Ao fechar o gerador, a thread
+    de leitura é interrompida e aguardada, então o stream lido por ela pode ser fechado.
+    """
+    pending = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    finished = object()
+
+    def put(item):
+        started = time.perf_counter()
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        timings["parse_wait"] += time.perf_counter() - started
+
+    def read():
+        try:
+            for item in _timed_batches(batches, timings):
+                put(item)
+                if stop.is_set():
+                    break
+            else:
+                put(finished)
+        except BaseException as e:
+            put(_PipelineError(e))
+        finally:
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+
+    reader = threading.Thread(target=read, name="csv-ship-reader", daemon=True)
+    reader.start()
+    try:
+        while True:
+            started = time.perf_counter()
+            item = pending.get()
+            timings["insert_wait"] += time.perf_counter() - started
+            if item is finished:
+                return
+            if isinstance(item, _PipelineError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+
+
+def iter_pipelined(batches, depth, timings):
+    """
+    Percorre os lotes de `batches` medindo as etapas em `timings` (veja new_stage_timings).
+    Com `depth` > 0 a leitura roda em outra thread, até `depth` lotes à frente da gravação.
+    """
+    if depth and depth > 0:
+        return _pipelined_batches(batches, depth, timings)
+    return _timed_batches(batches, timings)
+
+
+def _write_batches(sink, batches, progress, journal, committed_before, timings, metrics, tuner=None):
+    """
+    Grava e confirma no destino cada (lote, última linha, offset, linhas lidas) de `batches`
+    e encerra a carga; em caso de erro ela é abortada. Com commits duráveis e um offset, o
+    lote confirmado é registrado em `progress` e em `journal`. Retorna o total de linhas
+    inseridas informado pelo destino.
+    """
+    try:
+        for batch, last_line, last_offset, rows_read in batches:
+            started = time.perf_counter()
+            sink.write_batch(batch, last_line=last_line)
+            written = time.perf_counter()
+            sink.commit()
+            if sink.durable_commits and last_offset is not None:
+                progress.update(
+                    offset=last_offset,
+                    line=last_line,
+                    rows=committed_before + rows_read,
+                )
+                if journal is not None:
+                    journal.record(progress)
+            finished = time.perf_counter()
+            timings["insert"] += written - started
+            timings["commit"] += finished - written
+            observe_batch_latency(metrics, finished - started)
+            if tuner is not None:
+                tuner.record(batch, finished - started)
+        started = time.perf_counter()
+        total = sink.end_load()
+        timings["commit"] += time.perf_counter() - started
+        return total
+    except BaseException:
+        sink.abort_load()
+        raise
+
+
+def _insert_with_streaming_engine(
+    sink,
+    table_name,
+    schema_name,
+    csv_file_path,
+    encoding,
+    separator,
+    chunk_size,
+    byte_range=None,
+    max_lengths=None,
+    progress=None,
+    journal=None,
+    probe=None,
+    pipeline_depth=0,
+    timings=None,
+    tuner=None,
+    metrics=None,
+    rejects=None,
+    data_end=None,
+):
+    """
+    Lê o CSV com o motor de streaming e grava os lotes no destino (`CsvSink`).
+    Retorna (cabeçalho, linhas processadas, linhas inseridas).
+    Em encodings compatíveis com ASCII os registros vêm de um `_LineSource`: se `progress`
+    (dict) tiver um "offset", a leitura começa nele; a cada lote gravado em definitivo,
+    `progress` recebe "offset", "line" e "rows" (total confirmado), também registrados em
+    `journal` (CheckpointJournal), se informado.
+    Um `probe` (CsvProbe) do mesmo encoding fornece cabeçalho, aspas e início dos dados
+    sem reabrir o arquivo como texto.
+    Com `pipeline_depth` > 0 os lotes são lidos por outra thread enquanto o anterior é
+    gravado (veja iter_pipelined); o tempo de cada etapa é somado em `timings`.
+    Com um `tuner` (BatchSizeTuner) o tamanho dos lotes se ajusta ao tempo de gravação
+    medido; `chunk_size` só vale sem ele.
+    Bytes lidos, linhas rejeitadas/ajustadas e a latência de cada lote são somados em
+    `metrics` (veja new_load_metrics); as linhas malformadas vão para `rejects` (RejectLog).
+    Sem `byte_range`, `data_end` limita a leitura aos bytes antes desse offset.
+    """
+    progress = progress if progress is not None else {}
+    timings = timings if timings is not None else new_stage_timings()
+    metrics = metrics if metrics is not None else new_load_metrics()
+    if probe is not None and probe.encoding != encoding:
+        probe = None
+    quotechar = probe.quotechar if probe is not None else '"'
+    ascii_compatible = is_ascii_compatible_encoding(encoding)
+    if byte_range and not ascii_compatible:
+        raise ValueError(
+            f"A leitura por faixa de bytes requer um encoding compatível com ASCII (recebido '{encoding}')."
+        )
+
+    text_file = None
+    if probe is not None and ascii_compatible:
+        header = probe.header
+    else:
+        text_file = open_csv_text(csv_file_path, encoding)
+        header = next(csv.reader(text_file, delimiter=separator, quotechar=quotechar), None)
+    try:
+        if not header:
+            raise EmptyCsvError(f"Cabeçalho não encontrado em {csv_file_path}")
+
+        sanitized_columns = [
+            "".join(c if c.isalnum() else "_" for c in col) for col in header
+        ]
+
+        data_stream = text_file
+        line_offset = 1  # O cabeçalho é a linha 1
+        if byte_range:
+            logging.info(
+                f"Lendo apenas a faixa de bytes {byte_range[0]}-{byte_range[1]} de {csv_file_path} (números de linha relativos à faixa)"
+            )
+            line_offset = 0
+        if ascii_compatible:
+            start = progress.get("offset")
+            if start is not None:
+                line_offset = progress["line"]
+                logging.info(
+                    f"Retomando {csv_file_path} a partir do byte {start} (linha {line_offset}; {progress['rows']} linhas já confirmadas)."
+                )
+            elif byte_range:
+                start = byte_range[0]
+            elif probe is not None:
+                start = probe.data_start
+            else:
+                start = find_header_end_offset(csv_file_path, quotechar)
+            data_stream = _LineSource(
+                csv_file_path, encoding, start, byte_range[1] if byte_range else data_end
+            )
+
+        sink.begin_load(
+            table_name,
+            schema_name,
+            sanitized_columns,
+            chunk_size=chunk_size,
+            max_lengths=max_lengths,
+        )
+        stream_stats = new_stream_stats()
+        committed_before = progress.get("rows", 0)
+
+        def batches_with_position():
+            # A posição é copiada junto com o lote: com pipeline, stream_stats já avançou.
+            for batch in stream_csv_batches(
+                data_stream,
+                separator,
+                len(header),
+                chunk_size,
+                stream_stats,
+                line_offset=line_offset,
+                quotechar=quotechar,
+                tuner=tuner,
+                rejects=rejects,
+            ):
+                yield batch, stream_stats["last_line"], stream_stats["last_offset"], stream_stats["rows_read"]
+
+        batches = iter_pipelined(batches_with_position(), pipeline_depth, timings)
+        try:
+            total_linhas_inseridas = _write_batches(
+                sink, batches, progress, journal, committed_before, timings, metrics, tuner
+            )
+            if stream_stats["last_offset"] is not None:
+                progress.update(
+                    offset=stream_stats["last_offset"],
+                    line=stream_stats["last_line"],
+                    rows=committed_before + stream_stats["rows_read"],
+                )
+        finally:
+            # Encerra a thread de leitura (se houver) antes de fechar o stream lido por ela.
+            batches.close()
+            if isinstance(data_stream, _LineSource):
+                metrics["bytes_read"] += data_stream.position - start
+                metrics["compressed_bytes_read"] += data_stream.compressed_bytes or 0
+            elif compressed_input_bytes(text_file.buffer) is not None:
+                metrics["bytes_read"] += text_file.buffer.raw.tell()
+                metrics["compressed_bytes_read"] += compressed_input_bytes(text_file.buffer)
+            else:
+                metrics["bytes_read"] += os.path.getsize(csv_file_path)
+            metrics["rows_rejected"] += stream_stats["line_errors"]
+            metrics["rows_adjusted"] += stream_stats["divergent_rows"]
+            if data_stream is not text_file:
+                data_stream.close()
+    finally:
+        if text_file is not None:
+            text_file.close()
+
+    log_divergent_column_stats(csv_file_path, stream_stats, len(header))
+    return header, stream_stats["rows_read"], total_linhas_inseridas
+
+
+def _normalize_arrow_column(column):
+    """Versão vetorizada de build_row_normalizer: remove espaços das pontas e troca vazios por nulo."""
+    trimmed = pc.utf8_trim_whitespace(column)
+    return pc.if_else(pc.equal(trimmed, ""), pa.scalar(None, pa.string()), trimmed)
+
+
+def _arrow_batch_rows(record_batches):
+    """Converte record batches (colunas já normalizadas) nas tuplas usadas no bind."""
+    rows = []
+    for record_batch in record_batches:
+        rows.extend(zip(*[column.to_pylist() for column in record_batch.columns]))
+    return rows
+
+
+def stream_arrow_batches(
+    binary_stream,
+    encoding,
+    separator,
+    num_columns,
+    batch_size,
+    stats,
+    quotechar='"',
+    skip_rows=0,
+    tuner=None,
+    rejects=None,
+):
+    """
+    Equivalente de stream_csv_batches com o pyarrow.csv: o parse roda em várias threads e
+    produz record batches colunares, normalizados com kernels vetorizados (veja
+    _normalize_arrow_column); as tuplas para o bind só são montadas quando um lote de
+    `batch_size` linhas (ou `tuner.rows`) está completo.
+    Linhas com número de campos diferente de `num_columns` são relidas com o csv, ajustadas
+    e entram no lote seguinte, com os mesmos registros em `stats` e `rejects` do motor de
+    streaming, mas sem número de linha: o pyarrow só informa o número do registro (e nem
+    isso com várias threads), que difere da linha física quando há quebras de linha entre
+    aspas. Por isso stats["last_line"] fica None.
+    """
+    column_names = [f"c{index}" for index in range(num_columns)]
+    normalize, normalize_divergent = build_row_normalizer(num_columns)
+    rows_by_column_count = stats["rows_by_column_count"]
+    if rejects is None:
+        rejects = RejectLog()
+    invalid_rows = collections.deque()
+
+    def on_invalid_row(row):
+        # Pode ser chamado pelas threads de parse: a linha é tratada na thread do consumidor.
+        invalid_rows.append(row.text)
+        return "skip"
+
+    def adjusted_rows():
+        rows = []
+        while invalid_rows:
+            text = invalid_rows.popleft()
+            try:
+                parsed = next(csv.reader(io.StringIO(text), delimiter=separator, quotechar=quotechar), [])
+            except csv.Error as line_error:
+                stats["line_errors"] += 1
+                rejects.reject(None, "erro_de_parsing", str(line_error))
+                continue
+            stats["divergent_rows"] += 1
+            stats["divergent_original_columns"] += len(parsed)
+            stats["divergent_inserted_columns"] += min(len(parsed), num_columns)
+            rows_by_column_count[len(parsed)] = rows_by_column_count.get(len(parsed), 0) + 1
+            rejects.reject(
+                None,
+                "campos_divergentes",
+                f"{len(parsed)} campos, esperado {num_columns}",
+                parsed,
+            )
+            rows.append(normalize_divergent(parsed) if len(parsed) != num_columns else normalize(parsed))
+        return rows
+
+    reader = pa_csv.open_csv(
+        binary_stream,
+        read_options=pa_csv.ReadOptions(
+            use_threads=True,
+            block_size=ARROW_BLOCK_SIZE,
+            column_names=column_names,
+            skip_rows=skip_rows,
+            # O BOM do UTF-8 é descartado pelo próprio pyarrow.
+            encoding="utf8" if codecs.lookup(encoding).name in ("utf-8", "utf-8-sig") else encoding,
+        ),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=separator,
+            quote_char=quotechar,
+            newlines_in_values=True,
+            invalid_row_handler=on_invalid_row,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in column_names},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    pending = []
+    pending_rows = 0
+    stats["last_line"] = None
+
+    def finish(batch):
+        batch.extend(adjusted_rows())
+        stats["rows_read"] += len(batch)
+        return batch
+
+    for record_batch in reader:
+        pending.append(
+            pa.RecordBatch.from_arrays(
+                [_normalize_arrow_column(column) for column in record_batch.columns],
+                names=column_names,
+            )
+        )
+        pending_rows += record_batch.num_rows
+        if tuner is not None:
+            batch_size = tuner.rows
+        while pending_rows >= batch_size:
+            table = pa.Table.from_batches(pending)
+            batch = _arrow_batch_rows(table.slice(0, batch_size).to_batches())
+            pending = table.slice(batch_size).to_batches()
+            pending_rows -= batch_size
+            yield finish(batch)
+            if tuner is not None:
+                batch_size = tuner.rows
+
+    batch = finish(_arrow_batch_rows(pending))
+    if batch:
+        yield batch
+
+
+def _insert_with_arrow_engine(
+    sink,
+    table_name,
+    schema_name,
+    csv_file_path,
+    encoding,
+    separator,
+    chunk_size,
+    max_lengths=None,
+    probe=None,
+    pipeline_depth=0,
+    timings=None,
+    tuner=None,
+    metrics=None,
+    rejects=None,
+):
+    """
+    Lê o CSV com o pyarrow.csv (veja stream_arrow_batches) e grava os lotes no destino.
+    Retorna (cabeçalho, linhas processadas, linhas inseridas), como
+    _insert_with_streaming_engine. O pyarrow não informa offsets em bytes: os lotes não
+    geram checkpoints, e faixas de bytes e retomadas ficam com o motor de streaming.
+    Um erro de decodificação antes do primeiro lote confirmado vira UnicodeDecodeError,
+    para que o chamador tente o próximo encoding; depois dele, a carga falha sem reenviar
+    as linhas já gravadas.
+    """
+    timings = timings if timings is not None else new_stage_timings()
+    metrics = metrics if metrics is not None else new_load_metrics()
+    if probe is not None and probe.encoding != encoding:
+        probe = None
+    quotechar = probe.quotechar if probe is not None else '"'
+
+    if probe is not None:
+        header = probe.header
+    else:
+        with open_csv_text(csv_file_path, encoding) as text_file:
+            header = next(csv.reader(text_file, delimiter=separator, quotechar=quotechar), None)
+    if not header:
+        raise EmptyCsvError(f"Cabeçalho não encontrado em {csv_file_path}")
+    sanitized_columns = [
+        "".join(c if c.isalnum() else "_" for c in col) for col in header
+    ]
+
+    binary_file = open_csv_binary(csv_file_path)
+    try:
+        skip_rows = 0
+        data_start = 0
+        if is_ascii_compatible_encoding(encoding):
+            # Começa nos dados: o cabeçalho (inclusive com quebras entre aspas) já foi lido.
+            data_start = probe.data_start if probe is not None else None
+            if data_start is None:
+                data_start = find_header_end_offset(csv_file_path, quotechar)
+            binary_file.seek(data_start)
+        else:
+            skip_rows = 1
+        sink.begin_load(
+            table_name,
+            schema_name,
+            sanitized_columns,
+            chunk_size=chunk_size,
+            max_lengths=max_lengths,
+        )
+        stream_stats = new_stream_stats()
+
+        def batches_with_line():
+            for batch in stream_arrow_batches(
+                binary_file,
+                encoding,
+                separator,
+                len(header),
+                chunk_size,
+                stream_stats,
+                quotechar=quotechar,
+                skip_rows=skip_rows,
+                tuner=tuner,
+                rejects=rejects,
+            ):
+                yield batch, stream_stats["last_line"], None, stream_stats["rows_read"]
+
+        batches = iter_pipelined(batches_with_line(), pipeline_depth, timings)
+        try:
+            total_linhas_inseridas = _write_batches(sink, batches, {}, None, 0, timings, metrics, tuner)
+        except pa.ArrowInvalid as e:
+            if "UTF8" in str(e) and metrics["batches"] == 0:
+                raise UnicodeDecodeError(encoding, b"", 0, 1, f"dados inválidos segundo o pyarrow ({e})") from e
+            raise ValueError(f"Erro do pyarrow ao ler {csv_file_path}: {e}") from e
+        finally:
+            batches.close()
+            if compressed_input_bytes(binary_file) is not None:
+                metrics["bytes_read"] += binary_file.raw.tell() - data_start
+                metrics["compressed_bytes_read"] += compressed_input_bytes(binary_file)
+            else:
+                metrics["bytes_read"] += binary_file.tell() - data_start
+            metrics["rows_rejected"] += stream_stats["line_errors"]
+            metrics["rows_adjusted"] += stream_stats["divergent_rows"]
+    finally:
+        binary_file.close()
+
+    log_divergent_column_stats(csv_file_path, stream_stats, len(header))
+    return header, stream_stats["rows_read"], total_linhas_inseridas
+
+class _EngineFallback(Exception):
+    """O motor não consegue ler o arquivo como o motor de streaming; o arquivo recai para ele."""
+
+
+def _installed_version(package):
+    """(major, minor) de um pacote instalado, sem importá-lo; None se não estiver instalado."""
+    try:
+        return tuple(int(part) for part in re.findall(r"\d+", importlib.metadata.version(package))[:2])
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+# Verificada uma vez na importação, sem importar o pandas: só o motor 'pandas' o importa.
+PANDAS_VERSION = _installed_version("pandas")
+# Opções do read_csv que avisam (ParserWarning) e pulam linhas que o parser não consegue ler.
+PANDAS_BAD_LINES_OPTIONS = (
+    {"error_bad_lines": False, "warn_bad_lines": True}
+    if PANDAS_VERSION is not None and PANDAS_VERSION < (1, 3)
+    else {"on_bad_lines": "warn"}
+)
+# Coluna lida após as do cabeçalho: preenchida, revela uma linha com campos a mais.
+PANDAS_EXTRA_COLUMN = "extra"
+
+
+def _normalize_pandas_chunk(chunk):
+    """
+    Versão vetorizada de build_row_normalizer para um chunk do read_csv: cada coluna tem os
+    espaços das pontas removidos e os vazios trocados por None com operações de string do
+    pandas; as tuplas para o bind são montadas a partir das listas de cada coluna.
+    """
+    columns = []
+    for _, column in chunk.items():
+        stripped = column.fillna("").str.strip()
+        columns.append(stripped.astype(object).where(stripped != "", None).tolist())
+    return list(zip(*columns))
+
+
+def stream_pandas_batches(
+    binary_stream,
+    encoding,
+    separator,
+    num_columns,
+    batch_size,
+    stats,
+    quotechar='"',
+    header_row=False,
+    tuner=None,
+    rejects=None,
+):
+    """
+    Equivalente de stream_csv_batches com o parser C do pandas.read_csv, lido em chunks de
+    `batch_size` linhas (ou `tuner.rows`) e normalizado por coluna (veja
+    _normalize_pandas_chunk). Com `header_row` a primeira linha do stream é o cabeçalho.
+    Só campos vazios viram nulos: textos como "NA" ou "NULL" são mantidos, como nos outros
+    motores. Campos ausentes também viram nulos, mas a linha não é contada como ajustada,
+    pois o parser não os distingue de campos vazios.
+    A coluna PANDAS_EXTRA_COLUMN revela linhas com campos a mais: o parser corta os campos
+    seguintes ou, depois de ver uma linha com um campo a mais, pula as que têm ainda mais
+    campos, com um aviso. Se o primeiro chunk tiver qualquer uma delas, é lançado
+    _EngineFallback. Depois dele, a linha cortada é registrada em `stats` e `rejects`, sem
+    número de linha e só com o primeiro campo a mais, e uma linha pulada faz a leitura
+    falhar (ValueError), pois seus campos já foram perdidos.
+    """
+    import pandas as pd
+
+    column_names = [f"c{index}" for index in range(num_columns)]
+    if rejects is None:
+        rejects = RejectLog()
+    reader = pd.read_csv(
+        binary_stream,
+        sep=separator,
+        quotechar=quotechar,
+        names=column_names + [PANDAS_EXTRA_COLUMN],
+        header=None,
+        # O cabeçalho é pulado como registro: tem uma coluna a menos que `names`.
+        skiprows=1 if header_row else None,
+        index_col=False,
+        dtype=str,
+        keep_default_na=False,
+        na_values=[""],
+        encoding=encoding,
+        engine="c",
+        chunksize=batch_size,
+        **PANDAS_BAD_LINES_OPTIONS,
+    )
+    stats["last_line"] = None
+    first_chunk = True
+    with reader:
+        while True:
+            if tuner is not None:
+                batch_size = tuner.rows
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always", pd.errors.ParserWarning)
+                try:
+                    chunk = reader.get_chunk(batch_size)
+                except StopIteration:
+                    break
+            skipped = []
+            for warning in caught:
+                if not issubclass(warning.category, pd.errors.ParserWarning):
+                    warnings.warn_explicit(warning.message, warning.category, warning.filename, warning.lineno)
+                    continue
+                skipped.extend(line.strip() for line in str(warning.message).splitlines() if line.strip())
+            extra = chunk.pop(PANDAS_EXTRA_COLUMN)
+            divergent = extra.notna()
+            if first_chunk and (skipped or divergent.any()):
+                raise _EngineFallback("O parser do pandas encontrou linhas com campos a mais.")
+            first_chunk = False
+            if skipped:
+                raise ValueError(
+                    f"O parser do pandas pulou linhas com campos a mais depois do primeiro lote "
+                    f"({skipped[0]}). Carregue o arquivo com o motor 'stream'."
+                )
+
+            divergent_count = int(divergent.sum())
+            if divergent_count:
+                stats["divergent_rows"] += divergent_count
+                stats["divergent_original_columns"] += divergent_count * (num_columns + 1)
+                stats["divergent_inserted_columns"] += divergent_count * num_columns
+                rows_by_column_count = stats["rows_by_column_count"]
+                rows_by_column_count[num_columns + 1] = rows_by_column_count.get(num_columns + 1, 0) + divergent_count
+                for fields in chunk[divergent].assign(**{PANDAS_EXTRA_COLUMN: extra[divergent]}).itertuples(
+                    index=False, name=None
+                ):
+                    rejects.reject(
+                        None,
+                        "campos_divergentes",
+                        f"mais de {num_columns} campos, esperado {num_columns}",
+                        ["" if pd.isna(value) else value for value in fields],
+                    )
+
+            batch = _normalize_pandas_chunk(chunk)
+            stats["rows_read"] += len(batch)
+            yield batch
+
+
+def _insert_with_pandas_engine(
+    sink,
+    table_name,
+    schema_name,
+    csv_file_path,
+    encoding,
+    separator,
+    chunk_size,
+    max_lengths=None,
+    probe=None,
+    pipeline_depth=0,
+    timings=None,
+    tuner=None,
+    metrics=None,
+    rejects=None,
+):
+    """
+    Lê o CSV com o parser C do pandas (veja stream_pandas_batches) e grava os lotes no
+    destino. Retorna (cabeçalho, linhas processadas, linhas inseridas), como
+    _insert_with_streaming_engine. Como no motor arrow, não há offsets em bytes nem números
+    de linha. Se o primeiro chunk tiver linhas com campos a mais, ou se o parser falhar
+    antes do primeiro lote confirmado, o arquivo inteiro é lido pelo motor de streaming.
+    Um erro de decodificação antes do primeiro lote confirmado é relançado para que o
+    chamador tente o próximo encoding; depois dele, a carga falha sem reenviar as linhas
+    já gravadas.
+    """
+    import pandas as pd
+
+    timings = timings if timings is not None else new_stage_timings()
+    metrics = metrics if metrics is not None else new_load_metrics()
+    if probe is not None and probe.encoding != encoding:
+        probe = None
+    quotechar = probe.quotechar if probe is not None else '"'
+
+    if probe is not None:
+        header = probe.header
+    else:
+        with open_csv_text(csv_file_path, encoding) as text_file:
+            header = next(csv.reader(text_file, delimiter=separator, quotechar=quotechar), None)
+    if not header:
+        raise EmptyCsvError(f"Cabeçalho não encontrado em {csv_file_path}")
+    sanitized_columns = [
+        "".join(c if c.isalnum() else "_" for c in col) for col in header
+    ]
+
+    batches_before = metrics["batches"]
+    fallback = None
+    binary_file = open_csv_binary(csv_file_path)
+    try:
+        data_start = 0
+        header_row = True
+        if is_ascii_compatible_encoding(encoding):
+            # Começa nos dados: o cabeçalho (inclusive com quebras entre aspas) já foi lido.
+            data_start = probe.data_start if probe is not None else None
+            if data_start is None:
+                data_start = find_header_end_offset(csv_file_path, quotechar)
+            binary_file.seek(data_start)
+            header_row = False
+        sink.begin_load(
+            table_name,
+            schema_name,
+            sanitized_columns,
+            chunk_size=chunk_size,
+            max_lengths=max_lengths,
+        )
+        stream_stats = new_stream_stats()
+
+        def batches_with_rows():
+            for batch in stream_pandas_batches(
+                binary_file,
+                encoding,
+                separator,
+                len(header),
+                chunk_size,
+                stream_stats,
+                quotechar=quotechar,
+                header_row=header_row,
+                tuner=tuner,
+                rejects=rejects,
+            ):
+                yield batch, None, None, stream_stats["rows_read"]
+
+        batches = iter_pipelined(batches_with_rows(), pipeline_depth, timings)
+        try:
+            total_linhas_inseridas = _write_batches(sink, batches, {}, None, 0, timings, metrics, tuner)
+        except _EngineFallback as e:
+            fallback = e
+        except pd.errors.ParserError as e:
+            if metrics["batches"] != batches_before:
+                raise ValueError(f"Erro do pandas ao ler {csv_file_path} depois de lotes já gravados: {e}") from e
+            fallback = e
+        except UnicodeDecodeError as e:
+            if metrics["batches"] == batches_before:
+                raise
+            raise ValueError(
+                f"Leitura de {csv_file_path} interrompida após {stream_stats['rows_read']} linhas: {e}"
+            ) from e
+        finally:
+            batches.close()
+            if fallback is None:
+                if compressed_input_bytes(binary_file) is not None:
+                    metrics["bytes_read"] += binary_file.raw.tell() - data_start
+                    metrics["compressed_bytes_read"] += compressed_input_bytes(binary_file)
+                else:
+                    metrics["bytes_read"] += binary_file.tell() - data_start
+                metrics["rows_rejected"] += stream_stats["line_errors"]
+                metrics["rows_adjusted"] += stream_stats["divergent_rows"]
+    finally:
+        binary_file.close()
+
+    if fallback is not None:
+        logging.warning(f"{fallback} Lendo '{csv_file_path}' com o motor 'stream'.")
+        return _insert_with_streaming_engine(
+            sink,
+            table_name,
+            schema_name,
+            csv_file_path,
+            encoding,
+            separator,
+            chunk_size,
+            max_lengths=max_lengths,
+            probe=probe,
+            pipeline_depth=pipeline_depth,
+            timings=timings,
+            tuner=tuner,
+            metrics=metrics,
+            rejects=rejects,
+        )
+    log_divergent_column_stats(csv_file_path, stream_stats, len(header))
+    return header, stream_stats["rows_read"], total_linhas_inseridas
+
+
+def insert_data_from_csv(
+    conn,
+    table_name,
+    schema_name,
+    csv_file_path,
+    file_encoding="utf-8",
+    chunk_size=10000,
+    stats=None,
+    byte_range=None,
+    load_mode="executemany",
+    bulk_staging_dir=None,
+    bulk_server_dir=None,
+    max_lengths=None,
+    checkpoint_dir=None,
+    resume=False,
+    probe=None,
+    pipeline_depth=PIPELINE_DEPTH,
+    batch_memory_bytes=None,
+    target_flush_seconds=TARGET_FLUSH_SECONDS,
+    reject_dir=None,
+    engine=DEFAULT_ENGINE,
+    tail_journal=None,
+    tail_point=None,
+):
+    """
+    Insere dados de um arquivo CSV em uma tabela do SQL Server usando chunks.
+    A tabela já deve existir. `conn` pode ser uma conexão pyodbc ou qualquer `CsvSink`.
+    Se `stats` (dict) for informado, recebe as contagens de linhas.
+    Com `byte_range` (início, fim) apenas os registros dessa faixa são inseridos; o
+    cabeçalho continua sendo lido do início do arquivo.
+    Com uma conexão pyodbc, `load_mode` escolhe como os lotes chegam ao servidor:
+    'executemany' (padrão), 'tvp' (um table-valued parameter por lote) ou 'bulk' (arquivo de
+    staging em `bulk_staging_dir` + BULK INSERT; `bulk_server_dir` é o mesmo diretório visto
+    pelo SQL Server, se diferente).
+    `max_lengths` (maior comprimento por coluna, do perfil lido com `file_encoding`) dimensiona
+    os parâmetros do insert; é ignorado se a leitura recair para outro encoding.
+    Com `checkpoint_dir`, cada lote confirmado é registrado em um CheckpointJournal e, com
+    `resume`, a carga continua do último lote confirmado (ou não faz nada, se já concluída).
+    Se a leitura recair para outro encoding, a nova tentativa também continua do último
+    lote confirmado em vez de reenviar as linhas anteriores.
+    `probe` (CsvProbe, veja probe_csv_file) evita reler o início do arquivo.
+    Com `pipeline_depth` > 0 a leitura dos lotes roda em uma thread própria, até
+    `pipeline_depth` lotes à frente da gravação. O tempo de leitura e de gravação é
+    registrado no log e em stats["stage_seconds"]; as demais métricas da carga (veja
+    new_load_metrics) ficam em stats["metrics"].
+    Com `batch_memory_bytes`, `chunk_size` é só o tamanho inicial: cada lote é ajustado
+    (BatchSizeTuner) para levar cerca de `target_flush_seconds` para gravar, sem que os
+    lotes em trânsito (incluindo os da fila do pipeline) passem desse orçamento de memória.
+    Linhas malformadas são gravadas em um CSV compactado em `reject_dir` (veja RejectLog e
+    reject_file_path; None grava apenas uma amostra no log).
+    `engine` escolhe o motor de leitura (veja LOAD_ENGINES). Com 'arrow' o parse roda em
+    várias threads do pyarrow (veja _insert_with_arrow_engine) e com 'pandas' no parser C
+    do pandas (veja _insert_with_pandas_engine); faixas de bytes e checkpoints usam sempre
+    o motor de streaming.
+    Com `tail_journal` a carga é incremental: o chamador já decidiu o ponto de continuação
+    (`tail_point`, de CheckpointJournal.tail_point; o diário já foi iniciado se for uma
+    recarga completa), e a leitura vai apenas até a última quebra de linha, deixando uma
+    linha ainda incompleta para a próxima carga.
+    """
+    if engine == "arrow" and pa is None:
+        logging.error(f"O pacote 'pyarrow' é necessário para o motor 'arrow' (pip install pyarrow). '{csv_file_path}' não foi carregado.")
+        return False
+    if engine == "pandas" and PANDAS_VERSION is None:
+        logging.error(f"O pacote 'pandas' é necessário para o motor 'pandas' (pip install pandas). '{csv_file_path}' não foi carregado.")
+        return False
+    sink = as_sink(
+        conn,
+        load_mode=load_mode,
+        bulk_staging_dir=bulk_staging_dir,
+        bulk_server_dir=bulk_server_dir,
+    )
+    sanitized_table_name = "".join(c if c.isalnum() else "_" for c in table_name)
+    current_schema = schema_name if schema_name else DB_SCHEMA
+    full_table_name_for_query = f"[{current_schema}].[{sanitized_table_name}]"
+    full_table_name_for_log = f"{current_schema}.{sanitized_table_name}"
+    rejects = None
+
+    try:
+        if probe is None:
+            probe = probe_csv_file(csv_file_path, file_encoding)
+        separator = probe.delimiter
+        logging.info(
+            f"Iniciando leitura do arquivo CSV: {csv_file_path} para a tabela {full_table_name_for_log} com encoding {file_encoding} e separador '{separator}'"
+        )
+        
+        journal = None
+        progress = {}
+        if tail_journal is not None:
+            journal = tail_journal
+            if tail_point and "offset" in tail_point:
+                progress = {key: tail_point[key] for key in ("offset", "line", "rows")}
+        elif checkpoint_dir:
+            journal = CheckpointJournal(
+                csv_file_path,
+                sanitized_table_name,
+                current_schema,
+                byte_range=byte_range,
+                checkpoint_dir=checkpoint_dir,
+            )
+            resume_point = journal.resume_point() if resume else None
+            if resume_point and resume_point["complete"]:
+                logging.info(
+                    f"Checkpoint indica que '{csv_file_path}' já foi carregado em '{full_table_name_for_log}'. Nada a retomar."
+                )
+                if stats is not None:
+                    stats["rows_processed"] = 0
+                    stats["rows_inserted"] = 0
+                return True
+            if resume_point is None or "offset" not in resume_point:
+                # Sem lote confirmado não há de onde retomar: o diário recomeça.
+                journal.start()
+            else:
+                progress = {key: resume_point[key] for key in ("offset", "line", "rows")}
+        rows_committed_before = progress.get("rows", 0)
+        timings = new_stage_timings()
+        metrics = new_load_metrics()
+        tuner = None
+        if batch_memory_bytes:
+            # Com pipeline, até depth + 2 lotes existem ao mesmo tempo (fila, leitura e gravação).
+            batches_in_flight = pipeline_depth + 2 if pipeline_depth and pipeline_depth > 0 else 1
+            tuner = BatchSizeTuner(
+                chunk_size,
+                memory_budget_bytes=batch_memory_bytes / batches_in_flight,
+                target_seconds=target_flush_seconds,
+                num_columns=len(probe.header) if probe.header else None,
+                label=f"'{csv_file_path}'",
+            )
+        rejects = RejectLog(
+            reject_file_path(sanitized_table_name, current_schema, byte_range, reject_dir)
+            if reject_dir
+            else None,
+            label=f"'{csv_file_path}'",
+            # Na retomada, as rejeições das linhas já confirmadas continuam no arquivo.
+            append="offset" in progress,
+        )
+
+        # Lista de encodings para tentar caso o principal falhe
+        encodings_to_try = [file_encoding, 'utf-8', 'latin1', 'iso-8859-1', 'cp1252']
+        # Remove duplicações
+        encodings_to_try = list(dict.fromkeys(encodings_to_try))
+        
+        success = False
+        last_error = None
+        
+        for encoding in encodings_to_try:
+            if success:
+                break
+                
+            try:
+                logging.info(f"Tentando ler {csv_file_path} com encoding: {encoding}")
+                
+                engine_options = {
+                    "max_lengths": max_lengths if encoding == file_encoding else None,
+                    "probe": probe,
+                    "pipeline_depth": pipeline_depth,
+                    "timings": timings,
+                    "tuner": tuner,
+                    "metrics": metrics,
+                    "rejects": rejects,
+                }
+                # Faixas de bytes e checkpoints dependem dos offsets do motor de streaming.
+                current_engine = engine if not byte_range and journal is None else "stream"
+                logging.info(f"Usando motor '{current_engine}' para processamento do arquivo {csv_file_path}")
+                if current_engine == "arrow":
+                    insert_function = _insert_with_arrow_engine
+                elif current_engine == "pandas":
+                    insert_function = _insert_with_pandas_engine
+                else:
+                    insert_function = functools.partial(
+                        _insert_with_streaming_engine,
+                        byte_range=byte_range,
+                        progress=progress,
+                        journal=journal,
+                        data_end=complete_lines_end(csv_file_path) if tail_journal is not None else None,
+                    )
+                header, total_linhas_processadas, total_linhas_inseridas = insert_function(
+                    sink,
+                    sanitized_table_name,
+                    current_schema,
+                    csv_file_path,
+                    encoding,
+                    separator,
+                    chunk_size,
+                    **engine_options,
+                )
+
+                success = True
+                logging.info(
+                    f"Todos os dados do arquivo '{csv_file_path}' foram inseridos com sucesso na tabela '{full_table_name_for_log}' usando encoding {encoding}."
+                )
+                logging.info(f"Total de linhas processadas: {total_linhas_processadas}, linhas inseridas: {total_linhas_inseridas}")
+                logging.info(f"Total de colunas processadas: {len(header)}, colunas inseridas: {len(header)}")
+
+            except UnicodeDecodeError as e:
+                last_error = e
+                logging.warning(
+                    f"Erro de decodificação ao ler {csv_file_path} com encoding {encoding}: {e}. Tentando próximo encoding..."
+                )
+                continue
+            except Exception as e:
+                logging.error(
+                    f"Erro ao processar o arquivo CSV '{csv_file_path}' com encoding {encoding}: {e}"
+                )
+                raise
+        
+        if not success:
+            logging.error(
+                f"Falha ao processar {csv_file_path} após tentar todos os encodings disponíveis. Último erro: {last_error}"
+            )
+            return False
+
+        if "rows" in progress:
+            # Inclui linhas confirmadas por tentativas anteriores (outro encoding) nesta execução.
+            total_linhas_inseridas = progress["rows"] - rows_committed_before
+        if journal is not None:
+            journal.complete({"rows": rows_committed_before + total_linhas_inseridas})
+        log_stage_timings(f"'{csv_file_path}'", timings)
+
+        if stats is not None:
+            stats["rows_processed"] = total_linhas_processadas
+            stats["rows_inserted"] = total_linhas_inseridas
+            stats["stage_seconds"] = timings
+            stats["metrics"] = metrics
+        return True
+        
+    except EmptyCsvError:
+        logging.warning(
+            f"O arquivo CSV '{csv_file_path}' está vazio. Nenhuma tabela criada ou dados inseridos."
+        )
+        return False
+    except Exception as e:
+        logging.error(
+            f"Erro inesperado ao processar o arquivo CSV '{csv_file_path}': {e}"
+        )
+        return False
+    finally:
+        if rejects is not None:
+            rejects.close()
+
+
+def _insert_range_worker(
+    table_name,
+    schema_name,
+    csv_file_path,
+    file_encoding,
+    byte_range,
+    max_lengths=None,
+    checkpoint_dir=None,
+    resume=False,
+    probe=None,
+    pipeline_depth=PIPELINE_DEPTH,
+    chunk_size=10000,
+    batch_memory_bytes=None,
+    target_flush_seconds=TARGET_FLUSH_SECONDS,
+    reject_dir=None,
+):
+    """Executado em um processo do pool para inserir uma única faixa de bytes do arquivo."""
+    range_stats = {}
+    if _worker_sink is None:
+        logging.error(
+            f"Worker {os.getpid()} sem conexão com o destino. Faixa {byte_range} de '{csv_file_path}' não processada."
+        )
+        return False, range_stats
+    success = insert_data_from_csv(
+        _worker_sink,
+        table_name,
+        schema_name,
+        csv_file_path,
+        file_encoding=file_encoding,
+        stats=range_stats,
+        byte_range=byte_range,
+        max_lengths=max_lengths,
+        checkpoint_dir=checkpoint_dir,
+        resume=resume,
+        probe=probe,
+        pipeline_depth=pipeline_depth,
+        chunk_size=chunk_size,
+        batch_memory_bytes=batch_memory_bytes,
+        target_flush_seconds=target_flush_seconds,
+        reject_dir=reject_dir,
+    )
+    return success, range_stats
+
+
+def insert_data_partitioned(
+    sink_options,
+    table_name,
+    schema_name,
+    csv_file_path,
+    file_encoding="utf-8",
+    num_partitions=PARTITION_WORKERS,
+    stats=None,
+    max_lengths=None,
+    checkpoint_dir=None,
+    resume=False,
+    probe=None,
+    pipeline_depth=PIPELINE_DEPTH,
+    chunk_size=10000,
+    batch_memory_bytes=None,
+    target_flush_seconds=TARGET_FLUSH_SECONDS,
+    reject_dir=None,
+):
+    """
+    Divide um CSV grande em faixas de bytes alinhadas a registros e insere cada faixa
+    em paralelo na mesma tabela, cada processo com seu próprio destino (`open_sink(**sink_options)`).
+    As contagens de linhas, os tempos por etapa e as métricas de cada faixa são somados em `stats`. Cada faixa tem seu próprio
+    diário de checkpoint; retomar exige o mesmo número de partições da execução original.
+    O orçamento `batch_memory_bytes` (veja insert_data_from_csv) vale para cada processo.
+    Cada faixa grava suas linhas malformadas em um arquivo próprio em `reject_dir`.
+    As faixas começam no fim do cabeçalho e seguem as aspas do dialeto de `probe` (CsvProbe;
+    sem ele, o arquivo é examinado aqui).
+    """
+    if probe is None:
+        probe = probe_csv_file(csv_file_path, file_encoding)
+    if probe.data_start is None:
+        logging.error(
+            f"O encoding '{probe.encoding}' de '{csv_file_path}' não permite offsets em bytes. Não é possível dividir o arquivo em faixas."
+        )
+        return False
+    ranges = compute_csv_partitions(csv_file_path, num_partitions, probe.data_start, probe.quotechar)
+    logging.info(
+        f"Arquivo {csv_file_path} dividido em {len(ranges)} faixa(s) de bytes para carga paralela."
+    )
+
+    all_succeeded = True
+    total_linhas_processadas = 0
+    total_linhas_inseridas = 0
+    timings = new_stage_timings()
+    metrics = new_load_metrics()
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=len(ranges),
+        initializer=_init_upload_worker,
+        initargs=(sink_options,),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _insert_range_worker,
+                table_name,
+                schema_name,
+                csv_file_path,
+                file_encoding,
+                byte_range,
+                max_lengths,
+                checkpoint_dir,
+                resume,
+                probe,
+                pipeline_depth,
+                chunk_size,
+                batch_memory_bytes,
+                target_flush_seconds,
+                reject_dir,
+            ): byte_range
+            for byte_range in ranges
+        }
+        for future in concurrent.futures.as_completed(futures):
+            byte_range = futures[future]
+            try:
+                success, range_stats = future.result()
+            except Exception as e:
+                logging.error(
+                    f"Erro inesperado ao inserir a faixa {byte_range} de '{csv_file_path}': {e}"
+                )
+                success, range_stats = False, {}
+            all_succeeded = all_succeeded and success
+            total_linhas_processadas += range_stats.get("rows_processed", 0)
+            total_linhas_inseridas += range_stats.get("rows_inserted", 0)
+            add_stage_timings(timings, range_stats.get("stage_seconds", {}))
+            add_load_metrics(metrics, range_stats.get("metrics", {}))
+            logging.info(
+                f"Faixa {byte_range[0]}-{byte_range[1]} de '{csv_file_path}' concluída ({'sucesso' if success else 'falha'}): {range_stats.get('rows_inserted', 0)} linhas inseridas."
+            )
+
+    logging.info(
+        f"Carga particionada de '{csv_file_path}': {total_linhas_processadas} linhas processadas, {total_linhas_inseridas} inseridas em {len(ranges)} faixa(s)."
+    )
+    if stats is not None:
+        stats["rows_processed"] = total_linhas_processadas
+        stats["rows_inserted"] = total_linhas_inseridas
+        stats["partitions"] = len(ranges)
+        stats["stage_seconds"] = timings
+        stats["metrics"] = metrics
+    return all_succeeded
+
+
+def table_name_for_csv(csv_file):
+    """
+    Deriva o nome (sanitizado) da tabela alvo a partir do nome do arquivo CSV (sem a
+    extensão de compactação; o nome do membro, para um .zip).
+    """
+    file_name = os.path.basename(split_zip_member(csv_file)[1] or csv_file)
+    table_name_base, extension = os.path.splitext(file_name)
+    if extension.lower() in COMPRESSED_EXTENSIONS:
+        table_name_base = os.path.splitext(table_name_base)[0]
+    table_name = "".join(c if c.isalnum() else "_" for c in table_name_base)
+    return table_name.replace("-", "_")
+
+
+def process_csv_file(
+    sink, csv_file, schema_name=None, truncate_existing=False, load_options=None
+):
+    """
+    Processa um único arquivo CSV: detecta encoding e separador, cria (ou trunca) a tabela
+    e insere os dados no destino (`CsvSink` ou conexão pyodbc).
+    Retorna um dicionário com o resultado (incluindo a duração em "seconds"), usado no
+    resumo final e no manifesto.
+    """
+    started = time.perf_counter()
+    result = _load_csv_file(sink, csv_file, schema_name, truncate_existing, load_options)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _load_csv_file(sink, csv_file, schema_name, truncate_existing, load_options):
+    options = {**DEFAULT_LOAD_OPTIONS, **(load_options or {})}
+    sink = as_sink(sink)
+    file_name = os.path.basename(csv_file)
+    table_name = table_name_for_csv(csv_file)
+    current_db_schema = schema_name if schema_name else DB_SCHEMA
+    result = {
+        "file": csv_file,
+        "table": f"{current_db_schema}.{table_name}",
+        "status": "failed",
+        "rows_inserted": 0,
+    }
+
+    logging.info(
+        f"Processando arquivo: {csv_file} -> Tabela: {current_db_schema}.{table_name}"
+    )
+
+    merge_keys = options["merge_keys"]
+    if merge_keys:
+        if not sink.supports_merge:
+            logging.error(f"O destino '{sink.kind}' não suporta carga incremental por chave. Pulando '{csv_file}'.")
+            return result
+        if options["swap"]:
+            logging.warning("--swap é ignorado na carga incremental por chave: o merge já usa uma tabela de staging.")
+            options["swap"] = False
+        # A staging é descartada se a carga falhar, e a tabela atual nunca é truncada.
+        options["checkpoint_dir"] = None
+        truncate_existing = False
+
+    tail = options["tail"]
+    if tail and merge_keys:
+        logging.warning("--tail é ignorado na carga incremental por chave (--key).")
+        tail = False
+    if tail and not options["checkpoint_dir"]:
+        logging.error(f"A carga incremental (--tail) guarda o último offset carregado nos checkpoints. Pulando '{csv_file}'.")
+        return result
+    if tail and input_compression(csv_file) is not None:
+        logging.warning(f"'{csv_file}' é compactado e não pode ser lido a partir de um offset. Recarregando o arquivo inteiro.")
+        tail = False
+        truncate_existing = True
+    if tail:
+        # O arquivo é sempre acrescentado; a troca e a leitura por faixas recomeçariam do zero.
+        options["swap"] = False
+
+    swap = options["swap"]
+    if swap and not sink.supports_swap:
+        logging.warning(
+            f"O destino '{sink.kind}' não suporta carga em staging com troca. Carregando '{csv_file}' diretamente."
+        )
+        swap = False
+    if swap and options["checkpoint_dir"]:
+        # A staging é descartada se a carga falhar: não há lotes confirmados a retomar.
+        options["checkpoint_dir"] = None
+    if options["checkpoint_dir"] and options["engine"] != "stream":
+        # Sem offsets por lote, uma carga interrompida não teria de onde ser retomada.
+        logging.warning(
+            f"Checkpoints (e a carga incremental) usam o motor 'stream' (offsets por lote), não '{options['engine']}'. "
+            f"Use --swap ou --checkpoint-dir '' para carregar '{csv_file}' com '{options['engine']}'."
+        )
+        options["engine"] = "stream"
+
+    journal = None
+    resume_point = None
+    if options["checkpoint_dir"] and not tail:
+        journal = CheckpointJournal(
+            csv_file, table_name, current_db_schema, checkpoint_dir=options["checkpoint_dir"]
+        )
+        if options["resume"]:
+            resume_point = journal.resume_point()
+    if resume_point and resume_point["complete"]:
+        logging.info(
+            f"Checkpoint indica que '{csv_file}' já foi carregado em '{current_db_schema}.{table_name}'. Pulando."
+        )
+        result["status"] = "skipped"
+        return result
+    if resume_point and ("offset" in resume_point or "partitions" in resume_point):
+        # Retomada: as linhas já confirmadas não podem ser apagadas.
+        logging.info(f"Retomando carga de '{csv_file}' a partir do checkpoint '{journal.path}'.")
+        truncate_existing = False
+    elif resume_point:
+        # Nenhum lote confirmado no diário: as linhas na tabela não são desta carga e não
+        # há ponto de retomada. A carga recomeça do início, com a tabela truncada.
+        logging.info(
+            f"O checkpoint '{journal.path}' não tem lotes confirmados. Recarregando '{csv_file}' do início."
+        )
+        truncate_existing = True
+        resume_point = None
+        options["resume"] = False
+
+    try:
+        probe = probe_csv_file(csv_file)
+    except OSError as e:
+        logging.error(f"Não foi possível ler {csv_file}: {e}. Pulando arquivo.")
+        return result
+    current_file_encoding = probe.encoding
+    separator = probe.delimiter
+    staging_table = None
+
+    if tail and probe.header and not is_ascii_compatible_encoding(current_file_encoding):
+        logging.warning(
+            f"'{csv_file}' usa o encoding '{current_file_encoding}', sem offsets em bytes. Recarregando o arquivo inteiro."
+        )
+        tail = False
+        truncate_existing = True
+    tail_journal = None
+    tail_point = None
+    if tail and probe.header:
+        tail_journal = CheckpointJournal(
+            csv_file,
+            table_name,
+            current_db_schema,
+            checkpoint_dir=options["checkpoint_dir"],
+            header_hash=header_fingerprint(csv_file, probe.data_start),
+        )
+        tail_point = tail_journal.tail_point()
+        if tail_point and tail_point["complete"]:
+            logging.info(f"Nenhum dado novo em '{csv_file}' desde a última carga. Pulando.")
+            result["status"] = "skipped"
+            return result
+        if tail_point and "offset" in tail_point:
+            # Só os bytes acrescentados são lidos; as linhas já carregadas ficam na tabela.
+            truncate_existing = False
+        else:
+            # Nenhum lote confirmado neste diário: a tabela é recarregada do início dos dados.
+            logging.info(f"Carga incremental de '{csv_file}': carregando o arquivo inteiro em '{current_db_schema}.{table_name}'.")
+            truncate_existing = True
+            if tail_point is None:
+                tail_journal.start()
+                tail_point = {"complete": False}
+
+    try:
+        if not probe.header:
+            logging.warning(
+                f"O arquivo CSV '{csv_file}' parece estar vazio ou contém apenas cabeçalhos. Pulando."
+            )
+            result["status"] = "skipped"
+            return result
+
+        if not probe.has_data:
+            logging.warning(
+                f"O arquivo CSV '{csv_file}' está vazio ou não contém dados após o cabeçalho. Pulando."
+            )
+            result["status"] = "skipped"
+            return result
+
+        column_profiles = None
+        if options["profile"]:
+            column_profiles = profile_csv_file(probe)
+            if column_profiles:
+                log_column_profile(csv_file, column_profiles)
+
+        column_types = None
+        if column_profiles:
+            # O perfil cobre o arquivo inteiro: dispensa a amostragem e dimensiona o NVARCHAR.
+            column_types = [
+                profile.inferred_type() if options["infer_types"] else profile.text_type()
+                for profile in column_profiles
+            ]
+        elif options["infer_types"]:
+            column_types = infer_column_types(probe)
+
+        merge_columns = None
+        if merge_keys:
+            merge_columns = ["".join(c if c.isalnum() else "_" for c in col) for col in probe.header]
+            merge_keys = ["".join(c if c.isalnum() else "_" for c in col) for col in merge_keys]
+            missing_keys = [key for key in merge_keys if key not in merge_columns]
+            if missing_keys:
+                logging.error(
+                    f"Coluna(s)-chave {', '.join(missing_keys)} não encontrada(s) no cabeçalho de '{csv_file}'. Pulando."
+                )
+                return result
+            if not sink.create_table(
+                table_name,
+                probe.header,
+                schema_name=current_db_schema,
+                truncate_existing=False,
+                column_types=column_types,
+            )[0]:
+                logging.error(f"Não foi possível criar a tabela '{current_db_schema}.{table_name}'. Pulando '{csv_file}'.")
+                return result
+
+        if swap or merge_keys:
+            # A tabela atual só é tocada na troca (ou no merge) final, depois da carga completa.
+            staging_table = sink.create_staging_table(
+                table_name,
+                probe.header,
+                schema_name=current_db_schema,
+                column_types=column_types,
+            )
+            created_table_name, created_schema_name, table_existed = (
+                staging_table,
+                current_db_schema,
+                False,
+            )
+        else:
+            created_table_name, created_schema_name, table_existed = sink.create_table(
+                table_name,
+                probe.header,
+                schema_name=current_db_schema,
+                truncate_existing=truncate_existing,
+                column_types=column_types,
+            )
+
+        if created_table_name:
+            if table_existed:
+                logging.info(
+                    f"Tabela '{created_schema_name}.{created_table_name}' já existia. Verifique logs para status de TRUNCATE se aplicável."
+                )
+
+            insert_stats = {}
+            max_lengths = (
+                [profile.max_chars for profile in column_profiles] if column_profiles else None
+            )
+            if options["batch_rows"]:
+                batch_options = {"chunk_size": options["batch_rows"]}
+            else:
+                batch_options = {
+                    "batch_memory_bytes": options["batch_memory_bytes"],
+                    "target_flush_seconds": options["target_flush_seconds"],
+                }
+            threshold = options["partition_threshold_bytes"]
+            if (
+                options["sink_options"] is not None
+                # Só o motor de streaming lê faixas de bytes.
+                and options["engine"] == "stream"
+                and not tail
+                and options["partition_workers"] > 1
+                and threshold
+                and _file_size(csv_file) >= threshold
+                and is_ascii_compatible_encoding(current_file_encoding)
+                # Faixas de bytes exigem acesso aleatório, que entradas compactadas não têm.
+                and input_compression(csv_file) is None
+            ):
+                if journal is not None and not resume_point:
+                    journal.start()
+                    journal.record_partitions(options["partition_workers"])
+                success = insert_data_partitioned(
+                    options["sink_options"],
+                    created_table_name,
+                    created_schema_name,
+                    csv_file,
+                    file_encoding=current_file_encoding,
+                    num_partitions=options["partition_workers"],
+                    stats=insert_stats,
+                    max_lengths=max_lengths,
+                    checkpoint_dir=options["checkpoint_dir"],
+                    resume=options["resume"],
+                    probe=probe,
+                    pipeline_depth=options["pipeline_depth"],
+                    reject_dir=options["reject_dir"],
+                    **batch_options,
+                )
+                if success and journal is not None:
+                    journal.complete({"rows": insert_stats.get("rows_inserted", 0)})
+            else:
+                success = insert_data_from_csv(
+                    sink,
+                    created_table_name,
+                    created_schema_name,
+                    csv_file,
+                    file_encoding=current_file_encoding,
+                    stats=insert_stats,
+                    max_lengths=max_lengths,
+                    checkpoint_dir=options["checkpoint_dir"],
+                    resume=options["resume"],
+                    probe=probe,
+                    pipeline_depth=options["pipeline_depth"],
+                    reject_dir=options["reject_dir"],
+                    engine=options["engine"],
+                    tail_journal=tail_journal,
+                    tail_point=tail_point,
+                    **batch_options,
+                )
+            result["rows_inserted"] = insert_stats.get("rows_inserted", 0)
+            result["rows_parsed"] = insert_stats.get("rows_processed", 0)
+            if "stage_seconds" in insert_stats:
+                result["stage_seconds"] = insert_stats["stage_seconds"]
+            if "metrics" in insert_stats:
+                result["metrics"] = insert_stats["metrics"]
+            if success and swap:
+                success = sink.swap_staging_table(staging_table, table_name, current_db_schema)
+                if success:
+                    staging_table = None
+                    created_table_name = table_name
+            elif success and merge_keys:
+                counts = sink.merge_staging_table(
+                    staging_table,
+                    table_name,
+                    merge_columns,
+                    merge_keys,
+                    current_db_schema,
+                    delete_missing=options["merge_delete"],
+                )
+                success = counts is not None
+                if success:
+                    result["merge"] = counts
+                    staging_table = None
+                    created_table_name = table_name
+            if success:
+                result["status"] = "success"
+                logging.info(
+                    f"Arquivo '{file_name}' processado e dados inseridos na tabela '{created_schema_name}.{created_table_name}'."
+                )
+            else:
+                logging.error(
+                    f"Falha ao inserir dados do arquivo '{file_name}' na tabela '{created_schema_name}.{created_table_name}'."
+                )
+        else:
+            logging.error(
+                f"Não foi possível determinar o nome da tabela ou criar a tabela para o arquivo {csv_file}. Pulando inserção."
+            )
+
+    except EmptyCsvError:
+        logging.warning(
+            f"O arquivo CSV '{csv_file}' está vazio. Nenhuma tabela criada ou dados inseridos."
+        )
+        result["status"] = "skipped"
+    except Exception as e:
+        logging.error(f"Erro inesperado ao processar o arquivo '{csv_file}': {e}")
+
+    if staging_table:
+        sink.drop_table(staging_table, current_db_schema)
+        logging.warning(
+            f"Tabela de staging '{current_db_schema}.{staging_table}' descartada; '{current_db_schema}.{table_name}' não foi alterada."
+        )
+        result["rows_inserted"] = 0
+    return result
+
+
+# Destino próprio de cada processo do pool (aberto no initializer do worker).
+_worker_sink = None
+
+
+def _init_upload_worker(sink_options):
+    """Initializer dos processos do pool: cada worker abre e mantém seu próprio destino."""
+    global _worker_sink
+    _worker_sink = open_sink(**sink_options)
+    if _worker_sink:
+        # Processos do pool terminam via os._exit, que não executa handlers de atexit.
+        multiprocessing.util.Finalize(None, _worker_sink.close, exitpriority=10)
+
+
+def _upload_worker(csv_file, schema_name, truncate_existing, load_options=None):
+    """Executado dentro de um processo do pool para carregar um único arquivo."""
+    if _worker_sink is None:
+        logging.error(
+            f"Worker {os.getpid()} sem conexão com o destino. Arquivo '{csv_file}' não processado."
+        )
+        return {
+            "file": csv_file,
+            "table": f"{schema_name}.{table_name_for_csv(csv_file)}",
+            "status": "failed",
+            "rows_inserted": 0,
+        }
+    return process_csv_file(
+        _worker_sink, csv_file, schema_name, truncate_existing, load_options
+    )
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(source_file_path(path))
+    except OSError:
+        return 0
+
+
+def process_csv_files_parallel(
+    csv_files,
+    sink_options,
+    schema_name,
+    truncate_existing,
+    workers,
+    max_per_table=1,
+    load_options=None,
+):
+    """
+    Carrega os arquivos em um pool de processos, cada um com seu próprio destino.
+    Os arquivos são agendados do maior para o menor, e no máximo `max_per_table`
+    arquivos do mesmo destino são carregados ao mesmo tempo (0 = sem limite).
+    """
+    pending = sorted(csv_files, key=_file_size, reverse=True)
+    results = []
+    in_flight = {}
+    tables_in_flight = collections.Counter()
+
+    logging.info(
+        f"Iniciando carga paralela com {workers} workers (máximo de {max_per_table or 'ilimitados'} arquivo(s) simultâneo(s) por tabela)."
+    )
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_upload_worker,
+        initargs=(sink_options,),
+    ) as executor:
+        while pending or in_flight:
+            index = 0
+            while index < len(pending) and len(in_flight) < workers:
+                csv_file = pending[index]
+                table_name = table_name_for_csv(csv_file)
+                if max_per_table and tables_in_flight[table_name] >= max_per_table:
+                    index += 1
+                    continue
+                pending.pop(index)
+                future = executor.submit(
+                    _upload_worker,
+                    csv_file,
+                    schema_name,
+                    truncate_existing,
+                    load_options,
+                )
+                in_flight[future] = (csv_file, table_name)
+                tables_in_flight[table_name] += 1
+
+            done, _ = concurrent.futures.wait(
+                in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                csv_file, table_name = in_flight.pop(future)
+                tables_in_flight[table_name] -= 1
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logging.error(
+                        f"Erro inesperado no worker ao processar o arquivo '{csv_file}': {e}"
+                    )
+                    results.append(
+                        {
+                            "file": csv_file,
+                            "table": f"{schema_name}.{table_name}",
+                            "status": "failed",
+                            "rows_inserted": 0,
+                        }
+                    )
+    return results
+
+
+# --- Manifesto de arquivos carregados ---
+
+
+def fingerprint_csv_file(file_path, block_size=64 * 1024, num_blocks=16):
+    """
+    Impressão digital rápida de um arquivo: tamanho, mtime e um hash BLAKE2 de
+    `num_blocks` blocos espaçados uniformemente (o arquivo inteiro, se for pequeno).
+    Para um membro de .zip, vale o arquivo .zip inteiro.
+    """
+    file_path = source_file_path(file_path)
+    file_stat = os.stat(file_path)
+    digest = hashlib.blake2b(str(file_stat.st_size).encode("ascii"), digest_size=16)
+    with open(file_path, "rb") as f:
+        if file_stat.st_size <= block_size * num_blocks:
+            digest.update(f.read())
+        else:
+            step = (file_stat.st_size - block_size) // (num_blocks - 1)
+            for index in range(num_blocks):
+                f.seek(index * step)
+                digest.update(f.read(block_size))
+    return {
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "sample_hash": digest.hexdigest(),
+    }
+
+
+def content_hash_csv_file(file_path, block_size=1024 * 1024):
+    """Hash BLAKE2 do conteúdo completo do arquivo (o .zip inteiro, para um membro)."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(source_file_path(file_path), "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_csv_files(csv_files):
+    """
+    Impressões digitais (veja fingerprint_csv_file) de `csv_files`, indexadas pelo CSV.
+    Os membros de um mesmo .zip compartilham o mesmo dicionário, lido uma única vez.
+    """
+    by_source = {}
+    fingerprints = {}
+    for csv_file in csv_files:
+        source = source_file_path(csv_file)
+        if source not in by_source:
+            by_source[source] = fingerprint_csv_file(csv_file)
+        fingerprints[csv_file] = by_source[source]
+    return fingerprints
+
+
+class LoadManifest:
+    """
+    Manifesto local (JSON) dos arquivos carregados com sucesso, indexado pelo caminho
+    absoluto: impressão digital (veja fingerprint_csv_file), tabela de destino, linhas
+    carregadas e duração da carga. O hash completo do conteúdo só é calculado (e então
+    guardado) quando unchanged_entry precisa dele.
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path = manifest_path
+        self.entries = {}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(
+                    f"Manifesto '{manifest_path}' ilegível ({e}). Todos os arquivos serão carregados."
+                )
+
+    def unchanged_entry(self, csv_file, table, fingerprint):
+        """
+        Retorna a entrada do manifesto se o arquivo e a tabela de destino não mudaram desde a
+        última carga. Com mesmo tamanho e blocos amostrados mas mtime diferente (nova
+        exportação), compara o hash completo do conteúdo, que fica em `fingerprint` para que
+        record o guarde; sem hash na entrada, o arquivo é recarregado.
+        """
+        entry = self.entries.get(os.path.abspath(csv_file))
+        if not entry or entry.get("table") != table or entry.get("size") != fingerprint["size"]:
+            return None
+        if (
+            entry.get("mtime_ns") == fingerprint["mtime_ns"]
+            and entry.get("sample_hash") == fingerprint["sample_hash"]
+        ):
+            return entry
+        if entry.get("sample_hash") != fingerprint["sample_hash"]:
+            return None
+        if "content_hash" not in fingerprint:
+            # Calculado junto com a impressão digital, antes da carga; membros de um .zip o reaproveitam.
+            fingerprint["content_hash"] = content_hash_csv_file(csv_file)
+        if entry.get("content_hash") == fingerprint["content_hash"]:
+            entry["mtime_ns"] = fingerprint["mtime_ns"]
+            return entry
+        return None
+
+    def record(self, csv_file, table, fingerprint, rows, seconds):
+        self.entries[os.path.abspath(csv_file)] = {
+            **fingerprint,
+            "table": table,
+            "rows": rows,
+            "seconds": seconds,
+            "loaded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def forget(self, csv_file):
+        self.entries.pop(os.path.abspath(csv_file), None)
+
+    def save(self):
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+
+def update_manifest(manifest, results, fingerprints):
+    """Registra no manifesto as cargas bem-sucedidas de `results`, esquece as que falharam e o grava."""
+    for r in results:
+        if r["status"] == "success":
+            manifest.record(
+                r["file"],
+                r["table"],
+                fingerprints[r["file"]],
+                r["rows_inserted"],
+                r.get("seconds", 0),
+            )
+        elif r["status"] == "failed":
+            manifest.forget(r["file"])
+    manifest.save()
+
+
+def skip_unchanged_files(csv_files, sink, schema_name, manifest, fingerprints):
+    """
+    Separa os arquivos inalterados desde a última carga (mesma impressão digital e mesma
+    tabela, que ainda tem pelo menos as linhas carregadas). Retorna (pendentes, resultados
+    dos pulados).
+    """
+    pending = []
+    skipped_results = []
+    for csv_file in csv_files:
+        table_name = table_name_for_csv(csv_file)
+        table = f"{schema_name}.{table_name}"
+        entry = manifest.unchanged_entry(csv_file, table, fingerprints[csv_file])
+        if entry:
+            current_rows = sink.count_rows(table_name, schema_name)
+            if current_rows is not None and current_rows < entry["rows"]:
+                logging.info(
+                    f"Arquivo '{csv_file}' inalterado, mas a tabela '{table}' tem {current_rows} linhas (esperado {entry['rows']}). Recarregando."
+                )
+                entry = None
+        if not entry:
+            pending.append(csv_file)
+            continue
+        logging.info(
+            f"Arquivo '{csv_file}' inalterado desde {entry.get('loaded_at')} ({entry['rows']} linhas em '{table}'). Pulando."
+        )
+        skipped_results.append(
+            {
+                "file": csv_file,
+                "table": table,
+                "status": "skipped",
+                "rows_inserted": 0,
+                "unchanged": True,
+                "bytes_avoided": entry["size"],
+                "seconds_avoided": entry.get("seconds", 0),
+            }
+        )
+    return pending, skipped_results
+
+
+# --- Exportação de métricas ---
+
+
+def file_metrics_record(result):
+    """Registro de métricas (JSON) de um arquivo a partir do resultado de process_csv_file."""
+    metrics = {**new_load_metrics(), **result.get("metrics", {})}
+    timings = {**new_stage_timings(), **result.get("stage_seconds", {})}
+    seconds = result.get("seconds", 0)
+    rows_inserted = result.get("rows_inserted", 0)
+    merge = result.get("merge", {})
+    return {
+        "event": "file",
+        "file": result["file"],
+        "table": result["table"],
+        "status": result["status"],
+        "seconds": seconds,
+        "bytes_read": metrics["bytes_read"],
+        "compressed_bytes_read": metrics["compressed_bytes_read"],
+        "rows_parsed": result.get("rows_parsed", 0),
+        "rows_inserted": rows_inserted,
+        "rows_rejected": metrics["rows_rejected"],
+        "rows_adjusted": metrics["rows_adjusted"],
+        "parse_seconds": round(timings["parse"], 3),
+        "insert_seconds": round(timings["insert"], 3),
+        "commit_seconds": round(timings["commit"], 3),
+        "rows_per_second": round(rows_inserted / seconds, 1) if seconds else 0.0,
+        "mb_per_second": round(metrics["bytes_read"] / (1024 * 1024) / seconds, 3) if seconds else 0.0,
+        "batches": metrics["batches"],
+        "batch_seconds_sum": round(metrics["batch_seconds_sum"], 3),
+        "batch_seconds_buckets": dict(
+            zip([str(bound) for bound in BATCH_LATENCY_BUCKETS] + ["+Inf"], metrics["batch_seconds_buckets"])
+        ),
+        **{f"merge_{key}": merge.get(key, 0) for key in MERGE_COUNT_KEYS},
+    }
+
+
+def _prometheus_labels(**labels):
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def format_prometheus_metrics(records, run_record):
+    """Formata as métricas no formato texto do Prometheus (coletor textfile do node exporter)."""
+    gauges = [
+        ("csv_ship_file_bytes_read", "Bytes lidos do arquivo (descompactados) na última carga.", "bytes_read"),
+        (
+            "csv_ship_file_compressed_bytes_read",
+            "Bytes compactados lidos do disco na última carga (0 se o arquivo não for compactado).",
+            "compressed_bytes_read",
+        ),
+        ("csv_ship_file_rows_parsed", "Linhas lidas do arquivo na última carga.", "rows_parsed"),
+        ("csv_ship_file_rows_inserted", "Linhas inseridas na última carga.", "rows_inserted"),
+        ("csv_ship_file_rows_rejected", "Linhas descartadas por erro de parsing na última carga.", "rows_rejected"),
+        ("csv_ship_file_rows_adjusted", "Linhas com colunas divergentes ajustadas na última carga.", "rows_adjusted"),
+        ("csv_ship_file_duration_seconds", "Duração da última carga do arquivo.", "seconds"),
+        ("csv_ship_file_rows_per_second", "Linhas inseridas por segundo na última carga.", "rows_per_second"),
+        ("csv_ship_file_megabytes_per_second", "MB lidos por segundo na última carga.", "mb_per_second"),
+    ]
+    lines = []
+    for name, help_text, key in gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for record in records:
+            labels = _prometheus_labels(file=record["file"], table=record["table"], status=record["status"])
+            lines.append(f"{name}{labels} {record[key]}")
+
+    lines.append("# HELP csv_ship_file_stage_seconds Segundos por etapa da última carga do arquivo.")
+    lines.append("# TYPE csv_ship_file_stage_seconds gauge")
+    for record in records:
+        for stage in ("parse", "insert", "commit"):
+            labels = _prometheus_labels(file=record["file"], table=record["table"], stage=stage)
+            lines.append(f"csv_ship_file_stage_seconds{labels} {record[stage + '_seconds']}")
+
+    lines.append("# HELP csv_ship_file_merge_rows Linhas da última carga incremental por chave, por ação.")
+    lines.append("# TYPE csv_ship_file_merge_rows gauge")
+    for record in records:
+        for action in MERGE_COUNT_KEYS:
+            labels = _prometheus_labels(file=record["file"], table=record["table"], action=action)
+            lines.append(f"csv_ship_file_merge_rows{labels} {record['merge_' + action]}")
+
+    lines.append("# HELP csv_ship_batch_flush_seconds Latência de gravação (envio + commit) de cada lote.")
+    lines.append("# TYPE csv_ship_batch_flush_seconds histogram")
+    for record in records:
+        cumulative = 0
+        for bound, count in record["batch_seconds_buckets"].items():
+            cumulative += count
+            labels = _prometheus_labels(file=record["file"], table=record["table"], le=bound)
+            lines.append(f"csv_ship_batch_flush_seconds_bucket{labels} {cumulative}")
+        labels = _prometheus_labels(file=record["file"], table=record["table"])
+        lines.append(f"csv_ship_batch_flush_seconds_sum{labels} {record['batch_seconds_sum']}")
+        lines.append(f"csv_ship_batch_flush_seconds_count{labels} {record['batches']}")
+
+    lines.append("# HELP csv_ship_run_files Arquivos da última execução por status.")
+    lines.append("# TYPE csv_ship_run_files gauge")
+    for status in ("success", "failed", "skipped"):
+        lines.append(f"csv_ship_run_files{_prometheus_labels(status=status)} {run_record['files'][status]}")
+    for name, help_text, key in (
+        ("csv_ship_run_rows_inserted", "Linhas inseridas na última execução.", "rows_inserted"),
+        ("csv_ship_run_bytes_read", "Bytes lidos (descompactados) na última execução.", "bytes_read"),
+        (
+            "csv_ship_run_compressed_bytes_read",
+            "Bytes compactados lidos do disco na última execução.",
+            "compressed_bytes_read",
+        ),
+        ("csv_ship_run_duration_seconds", "Duração da última execução.", "seconds"),
+        ("csv_ship_run_timestamp_seconds", "Fim da última execução (epoch).", "timestamp"),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {run_record[key]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(results, metrics_dir, run_seconds):
+    """
+    Grava as métricas da execução em `metrics_dir`: acrescenta um JSON por arquivo e um
+    resumo da execução em METRICS_JSONL_FILENAME e substitui (de forma atômica, como o
+    coletor textfile exige) METRICS_PROM_FILENAME.
+    """
+    records = [file_metrics_record(r) for r in results]
+    files = collections.Counter(r["status"] for r in results)
+    run_record = {
+        "event": "run",
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "timestamp": round(time.time(), 3),
+        "seconds": round(run_seconds, 3),
+        "files": {status: files.get(status, 0) for status in ("success", "failed", "skipped")},
+        "rows_inserted": sum(record["rows_inserted"] for record in records),
+        "bytes_read": sum(record["bytes_read"] for record in records),
+        "compressed_bytes_read": sum(record["compressed_bytes_read"] for record in records),
+    }
+    try:
+        os.makedirs(metrics_dir, exist_ok=True)
+        with open(os.path.join(metrics_dir, METRICS_JSONL_FILENAME), "a", encoding="utf-8") as fh:
+            for record in records + [run_record]:
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        prom_path = os.path.join(metrics_dir, METRICS_PROM_FILENAME)
+        with open(prom_path + ".tmp", "w", encoding="utf-8") as fh:
+            fh.write(format_prometheus_metrics(records, run_record))
+        os.replace(prom_path + ".tmp", prom_path)
+    except OSError as e:
+        logging.error(f"Não foi possível gravar as métricas em '{metrics_dir}': {e}")
+        return False
+    logging.info(f"Métricas da execução gravadas em '{metrics_dir}'.")
+    return True
+
+
+def log_upload_summary(results):
+    """Registra o resumo agregado (sucessos/falhas/pulados) de uma execução."""
+    succeeded = [r for r in results if r["status"] == "success"]
+    failed = [r for r in results if r["status"] == "failed"]
+    skipped = [r for r in results if r["status"] == "skipped"]
+    unchanged = [r for r in skipped if r.get("unchanged")]
+    total_rows = sum(r.get("rows_inserted", 0) for r in results)
+
+    logging.info(
+        f"Resumo: {len(results)} arquivo(s) processado(s): {len(succeeded)} com sucesso, {len(failed)} com falha, {len(skipped)} pulado(s). Total de linhas inseridas: {total_rows}."
+    )
+    if unchanged:
+        bytes_avoided = sum(r["bytes_avoided"] for r in unchanged)
+        seconds_avoided = sum(r["seconds_avoided"] for r in unchanged)
+        logging.info(
+            f"Arquivos inalterados pulados: {len(unchanged)} ({bytes_avoided / (1024 * 1024):.1f} MB de leitura e ~{seconds_avoided:.1f} s de carga evitados)."
+        )
+    loaded = [r["metrics"] for r in results if "metrics" in r]
+    if loaded:
+        bytes_read = sum(metrics["bytes_read"] for metrics in loaded)
+        compressed = [metrics["compressed_bytes_read"] for metrics in loaded if metrics.get("compressed_bytes_read")]
+        logging.info(
+            f"Bytes lidos: {bytes_read / (1024 * 1024):.1f} MB"
+            + (
+                f" ({len(compressed)} arquivo(s) compactado(s): {sum(compressed) / (1024 * 1024):.1f} MB lidos do disco)."
+                if compressed
+                else "."
+            )
+        )
+    merged = [r["merge"] for r in results if "merge" in r]
+    if merged:
+        log_merge_counts(
+            f"{len(merged)} arquivo(s) (soma)",
+            {key: sum(counts[key] for counts in merged) for key in MERGE_COUNT_KEYS},
+        )
+    staged = [r["stage_seconds"] for r in results if "stage_seconds" in r]
+    if staged:
+        timings = new_stage_timings()
+        for file_timings in staged:
+            add_stage_timings(timings, file_timings)
+        log_stage_timings(f"{len(staged)} arquivo(s) (soma)", timings)
+    for r in failed:
+        logging.error(f"  - Falha: {r['file']} -> {r['table']}")
+
+
+# --- Modo contínuo (watch) ---
+
+
+class _InotifyWatch:
+    """Descritor inotify (Linux, via ctypes) que registra criações, escritas e renomeações em um diretório."""
+
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    MASK = 0x002 | 0x008 | 0x080 | 0x100
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch falhou para '{directory}'")
+
+    def wait(self, timeout):
+        """Espera até `timeout` segundos por eventos e os descarta; retorna True se houve algum."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    Acorda o modo contínuo quando `directory` muda (inotify, no Linux) ou, no máximo, a cada
+    `poll_seconds`. A verificação periódica também cobre o inotify, que não vê escritas
+    feitas por outras máquinas em compartilhamentos de rede.
+    """
+
+    def __init__(self, directory, poll_seconds=WATCH_POLL_SECONDS, stop_event=None):
+        self.poll_seconds = poll_seconds
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.inotify = None
+        try:
+            self.inotify = _InotifyWatch(directory)
+            self.mode = "inotify"
+        except (OSError, AttributeError, TypeError) as e:
+            self.mode = "polling"
+            logging.info(f"inotify indisponível ({e}). O diretório '{directory}' será verificado a cada {poll_seconds} s.")
+
+    def wait(self, timeout=None):
+        """Espera uma mudança no diretório, `timeout` segundos ou o sinal de parada."""
+        timeout = self.poll_seconds if timeout is None else min(timeout, self.poll_seconds)
+        if self.inotify is not None and not self.stop_event.is_set():
+            return self.inotify.wait(timeout)
+        self.stop_event.wait(timeout)
+        return False
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+
+class FileSettleTracker:
+    """
+    Acompanha tamanho e mtime dos arquivos observados: um arquivo fica pronto depois de
+    `settle_seconds` sem mudar (o produtor terminou de gravá-lo) e só volta a ficar pronto
+    se mudar de novo.
+    """
+
+    def __init__(self, settle_seconds=WATCH_SETTLE_SECONDS):
+        self.settle_seconds = settle_seconds
+        self.observed = {}  # caminho -> (tamanho, mtime_ns, instante em que esse estado foi visto)
+        self.handled = {}  # caminho -> (tamanho, mtime_ns) quando ficou pronto
+
+    def update(self, paths, now=None):
+        """Registra o estado atual de `paths` e retorna os que ficaram prontos."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        present = set()
+        for path in paths:
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                continue
+            present.add(path)
+            signature = (file_stat.st_size, file_stat.st_mtime_ns)
+            if self.handled.get(path) == signature:
+                continue
+            seen = self.observed.get(path)
+            if seen is None or seen[:2] != signature:
+                self.observed[path] = (*signature, now)
+            elif now - seen[2] >= self.settle_seconds:
+                del self.observed[path]
+                self.handled[path] = signature
+                ready.append(path)
+        # Arquivos removidos ou movidos deixam de ser acompanhados.
+        for tracked in (self.observed, self.handled):
+            for path in [path for path in tracked if path not in present]:
+                del tracked[path]
+        return ready
+
+    def next_check(self, now=None):
+        """Segundos até o próximo arquivo observado poder ficar pronto (None se não houver nenhum)."""
+        if not self.observed:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(seen[2] for seen in self.observed.values()) + self.settle_seconds - now)
+
+
+def move_processed_file(path, target_dir):
+    """
+    Move `path` para `target_dir`, acrescentando data e hora ao nome se já houver um arquivo
+    com o mesmo nome. Retorna o novo caminho ou None se não for possível mover.
+    """
+    name = os.path.basename(path)
+    target = os.path.join(target_dir, name)
+    if os.path.exists(target):
+        stem, dot, extension = name.partition(".")
+        target = os.path.join(
+            target_dir, f"{stem}_{datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')}{dot}{extension}"
+        )
+    try:
+        os.makedirs(target_dir, exist_ok=True)
+        shutil.move(path, target)
+    except OSError as e:
+        logging.error(f"Não foi possível mover '{path}' para '{target_dir}': {e}")
+        return None
+    logging.info(f"Arquivo '{path}' movido para '{target}'.")
+    return target
+
+
+def _init_watch_worker(sink_options):
+    """Initializer do pool do modo contínuo: o Ctrl+C só chega ao processo principal, que encerra as cargas."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_upload_worker(sink_options)
+
+
+def _stop_on_signals(stop_event):
+    """Faz SIGINT e SIGTERM apenas sinalizarem `stop_event`. Retorna os handlers anteriores."""
+    if threading.current_thread() is not threading.main_thread():
+        return {}
+    previous = {}
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        previous[signum] = signal.signal(signum, lambda *_: stop_event.set())
+    return previous
+
+
+def watch_csv_directory(
+    csv_dir,
+    sink,
+    sink_options,
     schema_name,
-    csv_file_path,
-    file_encoding="utf-8",
-    chunk_size=10000,
+    truncate_existing,
+    load_options,
+    workers=1,
+    max_per_table=1,
+    manifest=None,
+    metrics_dir=None,
+    settle_seconds=WATCH_SETTLE_SECONDS,
+    poll_seconds=WATCH_POLL_SECONDS,
+    done_dir=None,
+    failed_dir=None,
+    stop_event=None,
 ):
     """
-    Insere dados de um arquivo CSV em uma tabela do SQL Server usando chunks.
-    A tabela já deve existir.
+    Modo contínuo: observa `csv_dir` (veja DirectoryWatcher) e carrega cada arquivo novo ou
+    alterado depois que ele para de crescer (veja FileSettleTracker), até `stop_event`.
+    Com `workers` > 1 as cargas rodam em um pool de processos criado uma única vez, cujos
+    destinos ficam abertos entre um arquivo e outro; senão, no processo atual, em `sink`.
+    No máximo `workers` arquivos (e `max_per_table` por tabela) são carregados ao mesmo
+    tempo; os demais prontos esperam na fila.
+    Arquivos carregados vão para `done_dir` e os que falharam para `failed_dir` (None os
+    mantém no lugar, e só voltam a ser carregados se mudarem); com a carga incremental
+    (`tail`) os arquivos nunca são movidos. Com um `manifest` (LoadManifest) os arquivos
+    inalterados são pulados. O manifesto, o resumo e as métricas são atualizados a cada
+    arquivo de entrada concluído.
     """
-    cursor = conn.cursor()
-    sanitized_table_name = "".join(c if c.isalnum() else "_" for c in table_name)
-    current_schema = schema_name if schema_name else DB_SCHEMA
-    full_table_name_for_query = f"[{current_schema}].[{sanitized_table_name}]"
-    full_table_name_for_log = f"{current_schema}.{sanitized_table_name}"
+    stop_event = stop_event if stop_event is not None else threading.Event()
+    tail = (load_options or {}).get("tail")
+    if tail and (done_dir or failed_dir):
+        logging.warning("Com --tail os arquivos continuam crescendo no lugar: --done-dir e --failed-dir são ignorados.")
+        done_dir = failed_dir = None
+    watcher = DirectoryWatcher(csv_dir, poll_seconds, stop_event)
+    tracker = FileSettleTracker(settle_seconds)
+    waiting = collections.deque()  # (arquivo de entrada, CSV) prontos para carregar
+    pending_entries = {}  # arquivo de entrada -> CSVs ainda não concluídos
+    source_results = {}
+    fingerprints = {}
+    in_flight = {}
+    tables_in_flight = collections.Counter()
+    executor = None
+    if workers and workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_watch_worker,
+            initargs=(sink_options,),
+        )
+    logging.info(
+        f"Modo contínuo: observando '{csv_dir}' ({watcher.mode}); cada arquivo é carregado após {settle_seconds} s sem mudanças, "
+        f"com até {workers if executor else 1} carga(s) simultânea(s)."
+    )
+
+    def finish_source(source):
+        results = source_results.pop(source)
+        del pending_entries[source]
+        if manifest is not None:
+            update_manifest(manifest, results, fingerprints)
+        failed = not results or any(r["status"] == "failed" for r in results)
+        target_dir = failed_dir if failed else done_dir
+        if target_dir:
+            move_processed_file(source, target_dir)
+        if results:
+            log_upload_summary(results)
+            if metrics_dir:
+                write_metrics(results, metrics_dir, sum(r.get("seconds", 0) for r in results))
+
+    def finish_entry(source, result):
+        source_results[source].append(result)
+        pending_entries[source] -= 1
+        if pending_entries[source] == 0:
+            finish_source(source)
+
+    def collect(future):
+        source, csv_file, table_name = in_flight.pop(future)
+        tables_in_flight[table_name] -= 1
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Erro inesperado no worker ao processar o arquivo '{csv_file}': {e}")
+            result = {"file": csv_file, "table": f"{schema_name}.{table_name}", "status": "failed", "rows_inserted": 0}
+        finish_entry(source, result)
 
     try:
-        separator = detect_separator(csv_file_path, file_encoding)
-        logging.info(
-            f"Iniciando leitura do arquivo CSV: {csv_file_path} para a tabela {full_table_name_for_log} com encoding {file_encoding} e separador '{separator}'"
-        )
-        
-        # Lista de encodings para tentar caso o principal falhe
-        encodings_to_try = [file_encoding, 'utf-8', 'latin1', 'iso-8859-1', 'cp1252']
-        # Remove duplicações
-        encodings_to_try = list(dict.fromkeys(encodings_to_try))
-        
-        success = False
-        last_error = None
-        
-        for encoding in encodings_to_try:
-            if success:
-                break
-                
-            try:
-                logging.info(f"Tentando ler {csv_file_path} com encoding: {encoding}")
-                
-                # Estatísticas globais
-                total_linhas_processadas = 0
-                total_linhas_inseridas = 0
-                num_colunas_detectadas_no_arquivo = 0
-                # Configurar opções para pandas
-                csv_options = {
-                    'sep': separator,
-                    'encoding': encoding,
-                    'chunksize': chunk_size,
-                    'dtype': str,  # Para garantir que todas as colunas sejam lidas como string
-                    'quoting': csv.QUOTE_MINIMAL,  # Adicionar esta linha para ajudar com campos que contêm separadores
-                    'quotechar': '"'  # Garantir que as aspas duplas sejam reconhecidas corretamente
-                }
-                
-                # Modificação para verificar versão do pandas
-                try:
-                    pd_version = pd.__version__
-                    logging.info(f"Versão do pandas detectada: {pd_version}")
-                    
-                    from packaging import version
-                    if version.parse(pd_version) >= version.parse('1.3.0'):
-                        csv_options['on_bad_lines'] = 'skip'  # Melhor opção é 'skip' para não perder dados
-                        # Parâmetros para pandas >= 1.3.0
-                    # Parâmetros para pandas < 1.3.0
-                    else:
-                        csv_options['error_bad_lines'] = False  # Não levanta erro em linhas ruins
-                        csv_options['warn_bad_lines'] = True  # Avisa sobre linhas ruins
-                except Exception as version_error:
-                    logging.warning(f"Erro ao verificar versão do pandas: {version_error}. Usando parâmetros seguros.")
-                    # Não adicionar parâmetros potencialmente incompatíveis
-                
-                # Verifica se deve usar a abordagem alternativa linha por linha
-                usar_abordagem_alternativa = True  # Defina como True para forçar o uso da abordagem alternativa
-                
-                if usar_abordagem_alternativa:
-                    logging.info(f"Usando abordagem alternativa (linha por linha) para processamento do arquivo {csv_file_path}")
-                    # Abordagem alternativa: ler o arquivo linha a linha e processar manualmente
-                    with open(csv_file_path, 'r', encoding=encoding) as file:
-                        import csv as csv_module  # Para evitar conflito com o módulo já importado
-                        
-                        # Ler o cabeçalho
-                        header_line = file.readline().strip()
-                        reader = csv_module.reader([header_line], delimiter=separator, quotechar='"')
-                        header = next(reader)
-                        num_colunas_detectadas_no_arquivo = len(header)
-                        
-                        # Sanitizar nomes de colunas
-                        sanitized_columns = ["".join(c if c.isalnum() else "_" for c in col) for col in header]
-                        
-                        # Preparar SQL
-                        cols = ", ".join([f"[{col}]" for col in sanitized_columns])
-                        placeholders = ", ".join(["?"] * len(sanitized_columns))
-                        insert_sql = f"INSERT INTO {full_table_name_for_query} ({cols}) VALUES ({placeholders})"
-                        
-                        # Processar linhas em chunks
-                        batch = []
-                        line_count = 1  # Já lemos a primeira linha (cabeçalho)
-                        
-                        # Estatísticas
-                        linhas_com_colunas_divergentes = 0
-                        total_colunas_originais = 0
-                        total_colunas_inseridas = 0
-                        linhas_por_colunas = {}  # Dicionário para contar linhas por quantidade de colunas
-                        
-                        for line in file:
-                            line_count += 1
-                            try:
-                                # Ler a linha como CSV
-                                row_reader = csv_module.reader([line.strip()], delimiter=separator, quotechar='"')
-                                row = next(row_reader)
-                                
-                                # Verificar se o número de campos é diferente do cabeçalho
-                                if len(row) != len(header):
-                                    colunas_originais = len(row)
-                                    colunas_esperadas = len(header)
-                                    
-                                    linhas_com_colunas_divergentes += 1
-                                    total_colunas_originais += colunas_originais
-                                    total_colunas_inseridas += min(colunas_originais, colunas_esperadas)
-                                    
-                                    # Contagem de linhas por quantidade de colunas
-                                    if colunas_originais not in linhas_por_colunas:
-                                        linhas_por_colunas[colunas_originais] = 0
-                                    linhas_por_colunas[colunas_originais] += 1
-                                    
-                                    logging.warning(f"Linha {line_count} tem {colunas_originais} campos, esperado {colunas_esperadas}. " + 
-                                                    f"Relação: {min(colunas_originais, colunas_esperadas)}/{colunas_originais} colunas.")
-                                    
-                                    # Se tiver campos a mais, corta
-                                    if len(row) > len(header):
-                                        row = row[:len(header)]
-                                    # Se tiver campos a menos, completa com vazios
-                                    else:
-                                        row.extend([''] * (len(header) - len(row)))
-                                
-                                # Processar valores nulos
-                                processed_row = []
-                                for value in row:
-                                    stripped_value = value.strip() if isinstance(value, str) else value
-                                    if stripped_value == '':
-                                        processed_row.append(None)
-                                    else:
-                                        processed_row.append(stripped_value)
-                                
-                                batch.append(tuple(processed_row))
-                                
-                                # Inserir em chunks
-                                if len(batch) >= chunk_size:
-                                    cursor.fast_executemany = True
-                                    cursor.executemany(insert_sql, batch)
-                                    conn.commit()
-                                    total_linhas_inseridas += len(batch)
-                                    logging.info(f"Inseridas {len(batch)} linhas (até linha {line_count}) na tabela '{full_table_name_for_log}'")
-                                    batch = []
-                                    
-                            except Exception as line_error:
-                                logging.warning(f"Erro ao processar linha {line_count}: {line_error}. Continuando...")
-                        
-                        # Inserir o último batch
-                        if batch:
-                            cursor.fast_executemany = True
-                            cursor.executemany(insert_sql, batch)
-                            conn.commit()
-                            total_linhas_inseridas += len(batch)
-                            logging.info(f"Inseridas últimas {len(batch)} linhas na tabela '{full_table_name_for_log}'")
-                        
-                        total_linhas_processadas = line_count - 1
-                        # Exibir estatísticas finais
-                        if linhas_com_colunas_divergentes > 0:
-                            logging.info(f"Estatísticas do arquivo {csv_file_path}:")
-                            logging.info(f"- Total de linhas com colunas divergentes: {linhas_com_colunas_divergentes}")
-                            logging.info(f"- Relação colunas inseridas/originais: {total_colunas_inseridas}/{total_colunas_originais}")
-                            logging.info(f"- Total de colunas processadas: {len(header)}, colunas inseridas: {len(header)}")
-                            logging.info(f"- Distribuição de linhas por quantidade de colunas:")
-                            for num_cols, count in sorted(linhas_por_colunas.items()):
-                                logging.info(f"  * {num_cols} colunas: {count} linhas")
-                    
-                    success = True
-                    logging.info(f"Processamento alternativo bem-sucedido para '{csv_file_path}'")
-                    logging.info(f"Total de linhas processadas: {total_linhas_processadas}, linhas inseridas: {total_linhas_inseridas}")
-                    logging.info(f"Total de colunas processadas: {num_colunas_detectadas_no_arquivo}, colunas inseridas: {num_colunas_detectadas_no_arquivo}")
-                else:
-                    # Abordagem padrão com pandas
-                    first_chunk = True
-                    for i, chunk_df in enumerate(pd.read_csv(csv_file_path, **csv_options)):
-                        logging.info(
-                            f"Processando chunk {i+1} do arquivo {csv_file_path} ({len(chunk_df)} linhas)"
-                        )
-                        
-                        total_linhas_processadas += len(chunk_df)
-
-                        if first_chunk:
-                            num_colunas_detectadas_no_arquivo = len(chunk_df.columns)
-                            first_chunk = False
-
-                        chunk_df.columns = [
-                            "".join(c if c.isalnum() else "_" for c in col)
-                            for col in chunk_df.columns
-                        ]
-
-                        # Verificar se existem linhas com colunas incorretas
-                        colunas_esperadas = len(chunk_df.columns)
-                        logging.info(f"Número de colunas esperado: {colunas_esperadas}")
-
-                        cols = ", ".join([f"[{col}]" for col in chunk_df.columns])
-                        placeholders = ", ".join(["?"] * len(chunk_df.columns))
-                        insert_sql = f"INSERT INTO {full_table_name_for_query} ({cols}) VALUES ({placeholders})"
-
-                        data_tuples = []
-                        for row_tuple in chunk_df.itertuples(index=False, name=None):
-                            processed_row = []
-                            for item in row_tuple:
-                                if pd.isna(item):
-                                    processed_row.append(None)
-                                else:
-                                    processed_row.append(str(item).strip())
-                            data_tuples.append(tuple(processed_row))
-
-                        try:
-                            cursor.fast_executemany = True
-                            cursor.executemany(insert_sql, data_tuples)
-                            conn.commit()
-                            total_linhas_inseridas += len(data_tuples)
-                            logging.info(
-                                f"Chunk {i+1} ({len(chunk_df)} linhas) inserido com sucesso na tabela '{full_table_name_for_log}'."
-                            )
-                        except pyodbc.Error as e:
-                            logging.error(
-                                f"Erro ao inserir dados do chunk {i+1} na tabela '{full_table_name_for_log}': {e}"
-                            )
-                            logging.error(
-                                f"Dados do chunk que falhou (primeiras 5 linhas):\n{chunk_df.head()}"
-                            )
-                            conn.rollback()
-                            raise e
-                
-                # Se chegou aqui sem exceções, foi um sucesso
-                success = True
-                logging.info(
-                    f"Todos os dados do arquivo '{csv_file_path}' foram inseridos com sucesso na tabela '{full_table_name_for_log}' usando encoding {encoding}."
-                )
-                logging.info(f"Total de linhas processadas: {total_linhas_processadas}, linhas inseridas: {total_linhas_inseridas}")
-                logging.info(f"Total de colunas processadas: {num_colunas_detectadas_no_arquivo}, colunas inseridas: {num_colunas_detectadas_no_arquivo}")
-                
-            except UnicodeDecodeError as e:
-                last_error = e
-                logging.warning(
-                    f"Erro de decodificação ao ler {csv_file_path} com encoding {encoding}: {e}. Tentando próximo encoding..."
-                )
-                continue
-            except Exception as e:
-                last_error = e
-                logging.error(
-                    f"Erro ao processar o arquivo CSV '{csv_file_path}' com encoding {encoding}: {e}"
-                )
-                if "codec can't decode" in str(e) or "Error tokenizing data" in str(e):
-                    logging.warning("Erro parece ser de encoding ou formato de dados, tentando próximo encoding ou método alternativo...")
-                    
-                    if "Error tokenizing data" in str(e):
-                        try:
-                            logging.info(f"Tentando abordagem alternativa com leitura linha a linha para {csv_file_path}")
-                            # Abordagem alternativa: ler o arquivo linha a linha e processar manualmente
-                            with open(csv_file_path, 'r', encoding=encoding) as file:
-                                import csv as csv_module  # Para evitar conflito com o módulo já importado
-                                
-                                # Ler o cabeçalho
-                                header_line = file.readline().strip()
-                                reader = csv_module.reader([header_line], delimiter=separator)
-                                header = next(reader)
-                                num_colunas_detectadas_no_arquivo = len(header)
-                                
-                                # Sanitizar nomes de colunas
-                                sanitized_columns = ["".join(c if c.isalnum() else "_" for c in col) for col in header]
-                                
-                                # Preparar SQL
-                                cols = ", ".join([f"[{col}]" for col in sanitized_columns])
-                                placeholders = ", ".join(["?"] * len(sanitized_columns))
-                                insert_sql = f"INSERT INTO {full_table_name_for_query} ({cols}) VALUES ({placeholders})"
-                                
-                                # Processar linhas em chunks
-                                batch = []
-                                line_count = 1  # Já lemos a primeira linha (cabeçalho)
-                                
-                                # Estatísticas
-                                linhas_com_colunas_divergentes = 0
-                                total_colunas_originais = 0
-                                total_colunas_inseridas = 0
-                                linhas_por_colunas = {}  # Dicionário para contar linhas por quantidade de colunas
-                                
-                                for line in file:
-                                    line_count += 1
-                                    try:
-                                        # Ler a linha como CSV
-                                        row_reader = csv_module.reader([line.strip()], delimiter=separator)
-                                        row = next(row_reader)
-                                        
-                                        # Verificar se o número de campos é diferente do cabeçalho
-                                        if len(row) != len(header):
-                                            colunas_originais = len(row)
-                                            colunas_esperadas = len(header)
-                                            
-                                            linhas_com_colunas_divergentes += 1
-                                            total_colunas_originais += colunas_originais
-                                            total_colunas_inseridas += min(colunas_originais, colunas_esperadas)
-                                            
-                                            # Contagem de linhas por quantidade de colunas
-                                            if colunas_originais not in linhas_por_colunas:
-                                                linhas_por_colunas[colunas_originais] = 0
-                                            linhas_por_colunas[colunas_originais] += 1
-                                            
-                                            logging.warning(f"Linha {line_count} tem {colunas_originais} campos, esperado {colunas_esperadas}. " + 
-                                                            f"Relação: {min(colunas_originais, colunas_esperadas)}/{colunas_originais} colunas.")
-                                            
-                                            # Se tiver campos a mais, corta
-                                            if len(row) > len(header):
-                                                row = row[:len(header)]
-                                            # Se tiver campos a menos, completa com vazios
-                                            else:
-                                                row.extend([''] * (len(header) - len(row)))
-                                        
-                                        # Processar valores nulos
-                                        processed_row = []
-                                        for value in row:
-                                            stripped_value = value.strip() if isinstance(value, str) else value
-                                            if stripped_value == '':
-                                                processed_row.append(None)
-                                            else:
-                                                processed_row.append(stripped_value)
-                                        
-                                        batch.append(tuple(processed_row))
-                                        
-                                        # Inserir em chunks
-                                        if len(batch) >= chunk_size:
-                                            cursor.fast_executemany = True
-                                            cursor.executemany(insert_sql, batch)
-                                            conn.commit()
-                                            total_linhas_inseridas += len(batch)
-                                            logging.info(f"Inseridas {len(batch)} linhas (até linha {line_count}) na tabela '{full_table_name_for_log}'")
-                                            batch = []
-                                            
-                                    except Exception as line_error:
-                                        logging.warning(f"Erro ao processar linha {line_count}: {line_error}. Continuando...")
-                                
-                                # Inserir o último batch
-                                if batch:
-                                    cursor.fast_executemany = True
-                                    cursor.executemany(insert_sql, batch)
-                                    conn.commit()
-                                    total_linhas_inseridas += len(batch)
-                                    logging.info(f"Inseridas últimas {len(batch)} linhas na tabela '{full_table_name_for_log}'")
-                                
-                                # Exibir estatísticas finais
-                                if linhas_com_colunas_divergentes > 0:
-                                    logging.info(f"Estatísticas do arquivo {csv_file_path}:")
-                                    logging.info(f"- Total de linhas com colunas divergentes: {linhas_com_colunas_divergentes}")
-                                    logging.info(f"- Relação colunas inseridas/originais: {total_colunas_inseridas}/{total_colunas_originais}")
-                                    logging.info(f"- Total de colunas processadas: {len(header)}, colunas inseridas: {len(header)}")
-                                    logging.info(f"- Distribuição de linhas por quantidade de colunas:")
-                                    for num_cols, count in sorted(linhas_por_colunas.items()):
-                                        logging.info(f"  * {num_cols} colunas: {count} linhas")
-                            
-                            success = True
-                            total_linhas_processadas = line_count - 1
-                            logging.info(f"Processamento alternativo bem-sucedido para '{csv_file_path}'")
-                            logging.info(f"Total de linhas processadas: {total_linhas_processadas}, linhas inseridas: {total_linhas_inseridas}")
-                            logging.info(f"Total de colunas processadas: {len(header)}, colunas inseridas: {len(header)}")
-                            break
-                            
-                        except Exception as alt_error:
-                            logging.error(f"Falha na abordagem alternativa: {alt_error}")
-                    
-                    continue
+        while not stop_event.is_set():
+            for source in tracker.update(list_csv_sources(csv_dir)):
+                entries = expand_csv_source(source)
+                skipped_results = []
+                if manifest is not None:
+                    fingerprints.update(fingerprint_csv_files(entries))
+                    entries, skipped_results = skip_unchanged_files(
+                        entries, sink, schema_name, manifest, fingerprints
+                    )
+                source_results[source] = skipped_results
+                pending_entries[source] = len(entries)
+                if entries:
+                    logging.info(f"Arquivo '{source}' pronto para carga ({len(entries)} CSV(s)).")
+                    waiting.extend((source, csv_file) for csv_file in entries)
                 else:
-                    # Outro tipo de erro, não relacionado a encoding ou parsing
-                    raise e
-        
-        if not success:
-            logging.error(
-                f"Falha ao processar {csv_file_path} após tentar todos os encodings disponíveis. Último erro: {last_error}"
-            )
-            return False
-            
-        return True
-        
-    except pd.errors.EmptyDataError:
-        logging.warning(
-            f"O arquivo CSV '{csv_file_path}' está vazio. Nenhuma tabela criada ou dados inseridos."
-        )
-        return False
-    except Exception as e:
-        logging.error(
-            f"Erro inesperado ao processar o arquivo CSV '{csv_file_path}': {e}"
-        )
-        return False
+                    finish_source(source)
+
+            if executor is None:
+                while waiting and not stop_event.is_set():
+                    source, csv_file = waiting.popleft()
+                    try:
+                        result = process_csv_file(sink, csv_file, schema_name, truncate_existing, load_options)
+                    except Exception as e:
+                        logging.error(f"Erro inesperado ao processar o arquivo '{csv_file}': {e}")
+                        result = {
+                            "file": csv_file,
+                            "table": f"{schema_name}.{table_name_for_csv(csv_file)}",
+                            "status": "failed",
+                            "rows_inserted": 0,
+                        }
+                    finish_entry(source, result)
+            else:
+                for future in [future for future in in_flight if future.done()]:
+                    collect(future)
+                index = 0
+                while index < len(waiting) and len(in_flight) < workers:
+                    source, csv_file = waiting[index]
+                    table_name = table_name_for_csv(csv_file)
+                    if max_per_table and tables_in_flight[table_name] >= max_per_table:
+                        index += 1
+                        continue
+                    del waiting[index]
+                    future = executor.submit(_upload_worker, csv_file, schema_name, truncate_existing, load_options)
+                    in_flight[future] = (source, csv_file, table_name)
+                    tables_in_flight[table_name] += 1
+
+            timeout = tracker.next_check()
+            if in_flight:
+                # As cargas em andamento são conferidas a cada segundo.
+                timeout = min(timeout, 1.0) if timeout is not None else 1.0
+            watcher.wait(timeout)
+    finally:
+        if executor is not None:
+            if in_flight:
+                logging.info(f"Encerrando o modo contínuo: aguardando {len(in_flight)} carga(s) em andamento.")
+            for future in concurrent.futures.as_completed(list(in_flight)):
+                collect(future)
+            executor.shutdown()
+        watcher.close()
+    if waiting:
+        logging.info(f"{len(waiting)} CSV(s) prontos não foram carregados antes do encerramento e ficam para a próxima execução.")
+    logging.info(f"Modo contínuo encerrado: '{csv_dir}' deixou de ser observado.")
 
 
 def process_csv_uploads(
@@ -668,156 +4009,227 @@ def process_csv_uploads(
     use_trusted_connection=False,
     truncate_existing_tables=False,
     db_schema_override=None,
+    workers=1,
+    max_workers_per_table=1,
+    partition_threshold_bytes=PARTITION_THRESHOLD_BYTES,
+    partition_workers=PARTITION_WORKERS,
+    load_mode="executemany",
+    bulk_staging_dir=None,
+    bulk_server_dir=None,
+    sink="sqlserver",
+    sink_path=None,
+    infer_types=False,
+    profile=False,
+    profile_only=False,
+    resume=False,
+    checkpoint_dir=CHECKPOINT_DIR,
+    skip_unchanged=False,
+    manifest_path=MANIFEST_PATH,
+    pipeline_depth=PIPELINE_DEPTH,
+    batch_rows=None,
+    batch_memory_bytes=BATCH_MEMORY_BUDGET_BYTES,
+    target_flush_seconds=TARGET_FLUSH_SECONDS,
+    swap=False,
+    metrics_dir=None,
+    reject_dir=REJECT_DIR,
+    engine=DEFAULT_ENGINE,
+    merge_keys=None,
+    merge_delete=False,
+    tail=False,
+    watch=False,
+    settle_seconds=WATCH_SETTLE_SECONDS,
+    poll_seconds=WATCH_POLL_SECONDS,
+    done_dir=None,
+    failed_dir=None,
 ):
     """
     Função principal para orquestrar o upload dos CSVs.
     Permite override das configurações globais.
+    Com `workers` > 1 os arquivos são carregados em paralelo por um pool de processos.
+    Arquivos com pelo menos `partition_threshold_bytes` são divididos em faixas de bytes
+    carregadas por `partition_workers` processos (0 desabilita a divisão).
+    `load_mode` define o envio dos lotes ('executemany', 'tvp' ou 'bulk', veja insert_data_from_csv).
+    `sink` escolhe o destino: 'sqlserver' (padrão), 'sqlite' ou 'file' (em `sink_path`) ou
+    'null', que descarta as linhas para medir apenas a leitura.
+    Com `infer_types` as tabelas novas recebem tipos inferidos por amostragem e as colunas
+    são alargadas se um lote posterior violar o tipo inferido.
+    Com `profile` cada arquivo é perfilado antes da carga (veja profile_csv_file) e o perfil
+    dimensiona as colunas novas e os parâmetros do insert; `profile_only` apenas grava os
+    perfis em PROFILE_DIR, sem conectar ao banco.
+    Os lotes confirmados são registrados em diários de checkpoint em `checkpoint_dir`
+    (None desabilita); com `resume` arquivos já concluídos são pulados e cargas
+    interrompidas continuam do último lote confirmado.
+    Com `skip_unchanged`, arquivos e tabelas inalterados desde a última carga registrada no
+    manifesto em `manifest_path` são pulados, e cada carga bem-sucedida é registrada nele.
+    Com `pipeline_depth` > 0 cada arquivo é lido por uma thread própria, até
+    `pipeline_depth` lotes à frente da gravação; o resumo informa o tempo de cada etapa.
+    Com `batch_rows` os lotes têm tamanho fixo; sem ele, o tamanho é ajustado para que cada
+    lote leve cerca de `target_flush_seconds` sem passar de `batch_memory_bytes` em memória.
+    Com `swap` cada arquivo é carregado em uma tabela de staging que substitui a tabela atual
+    em uma única transação ao final; se a carga falhar, a tabela atual não é alterada.
+    Com `merge_keys` (lista de colunas) a carga é incremental: a staging é aplicada na tabela
+    atual com MERGE, inserindo chaves novas e atualizando só as linhas cujo hash das demais
+    colunas mudou; `merge_delete` também remove as chaves ausentes do arquivo.
+    Com `tail` cada execução carrega apenas os bytes acrescentados a cada arquivo desde a
+    anterior; um arquivo truncado, rotacionado ou com outro cabeçalho é recarregado inteiro.
+    Com `watch` a função não termina: observa o diretório e carrega cada arquivo que ficar
+    `settle_seconds` sem mudar, com as conexões abertas entre um arquivo e outro, movendo-o
+    para `done_dir` ou `failed_dir` (veja watch_csv_directory), até SIGINT ou SIGTERM.
+    Com `metrics_dir`, as métricas de cada arquivo e da execução são gravadas em JSON lines
+    e em um textfile do Prometheus (veja write_metrics).
+    Linhas malformadas são gravadas em CSVs compactados em `reject_dir` (None desabilita) e
+    só uma amostra delas vai para o log.
+    `engine` escolhe o motor de leitura: 'stream' (padrão), 'arrow' (requer pyarrow) ou 'pandas'.
     """
-    logging.info("Iniciando processo de upload de CSVs para o SQL Server.")
+    run_started = time.perf_counter()
+    logging.info(f"Iniciando processo de upload de CSVs (destino: {sink}).")
 
     current_csv_directory = csv_dir if csv_dir else CSV_DIRECTORY
     current_db_schema = db_schema_override if db_schema_override else DB_SCHEMA
     logging.info(f"Usando esquema: '{current_db_schema}'")
 
-    conn = get_sql_server_connection(
-        server=db_server_override,
-        database=db_name_override,
-        user=db_user_override,
-        password=db_password_override,
-        trusted_connection=use_trusted_connection,
-    )
-    if not conn:
+    if profile_only:
+        csv_files = discover_csv_files(current_csv_directory)
+        if not csv_files:
+            logging.warning(
+                f"Nenhum arquivo CSV encontrado no diretório '{current_csv_directory}'."
+            )
+        profile_csv_files(csv_files)
+        logging.info("Perfil dos CSVs concluído.")
+        return
+
+    if engine == "arrow" and pa is None:
+        logging.error("O motor 'arrow' requer o pacote 'pyarrow' (pip install pyarrow). Abortando.")
+        return
+    if engine == "pandas" and PANDAS_VERSION is None:
+        logging.error("O motor 'pandas' requer o pacote 'pandas' (pip install pandas). Abortando.")
+        return
+
+    conn_kwargs = {
+        "server": db_server_override,
+        "database": db_name_override,
+        "user": db_user_override,
+        "password": db_password_override,
+        "trusted_connection": use_trusted_connection,
+    }
+    sink_options = {
+        "kind": sink,
+        "path": sink_path,
+        "conn_kwargs": conn_kwargs,
+        "load_mode": load_mode,
+        "bulk_staging_dir": bulk_staging_dir,
+        "bulk_server_dir": bulk_server_dir,
+        # Colunas dimensionadas por inferência ou perfil são alargadas se outro arquivo não couber.
+        "infer_types": infer_types or profile,
+    }
+    current_sink = open_sink(**sink_options)
+    if not current_sink:
         logging.error("Não foi possível conectar ao banco de dados. Abortando.")
         return
 
-    csv_files = glob.glob(os.path.join(current_csv_directory, "*.csv"))
+    load_options = {
+        "sink_options": sink_options,
+        "partition_threshold_bytes": partition_threshold_bytes,
+        "partition_workers": partition_workers,
+        "infer_types": infer_types,
+        "profile": profile,
+        "checkpoint_dir": checkpoint_dir,
+        "resume": resume,
+        "pipeline_depth": pipeline_depth,
+        "batch_rows": batch_rows,
+        "batch_memory_bytes": batch_memory_bytes,
+        "target_flush_seconds": target_flush_seconds,
+        "swap": swap,
+        "reject_dir": reject_dir,
+        "engine": engine,
+        "merge_keys": merge_keys,
+        "merge_delete": merge_delete,
+        "tail": tail,
+    }
+
+    if watch:
+        stop_event = threading.Event()
+        previous_handlers = _stop_on_signals(stop_event)
+        try:
+            watch_csv_directory(
+                current_csv_directory,
+                current_sink,
+                sink_options,
+                current_db_schema,
+                truncate_existing_tables,
+                load_options,
+                workers=workers,
+                max_per_table=max_workers_per_table,
+                manifest=LoadManifest(manifest_path) if manifest_path and skip_unchanged else None,
+                metrics_dir=metrics_dir,
+                settle_seconds=settle_seconds,
+                poll_seconds=poll_seconds,
+                done_dir=done_dir,
+                failed_dir=failed_dir,
+                stop_event=stop_event,
+            )
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            current_sink.close()
+        return
+
+    csv_files = discover_csv_files(current_csv_directory)
     if not csv_files:
         logging.warning(
             f"Nenhum arquivo CSV encontrado no diretório '{current_csv_directory}'."
         )
-        conn.close()
+        current_sink.close()
         return
 
     logging.info(
         f"Arquivos CSV encontrados: {len(csv_files)} em '{current_csv_directory}'"
     )
-    for csv_file in csv_files:
-        file_name = os.path.basename(csv_file)
-        table_name_base = os.path.splitext(file_name)[0]
-        table_name = "".join(c if c.isalnum() else "_" for c in table_name_base)
-        table_name = table_name.replace("-", "_")
 
-        logging.info(
-            f"Processando arquivo: {csv_file} -> Tabela: {current_db_schema}.{table_name}"
+    # Sem --skip-unchanged o manifesto não é lido nem gravado: a execução não paga sua leitura extra.
+    manifest = LoadManifest(manifest_path) if manifest_path and skip_unchanged else None
+    fingerprints = {}
+    skipped_results = []
+    if manifest is not None:
+        fingerprints = fingerprint_csv_files(csv_files)
+        csv_files, skipped_results = skip_unchanged_files(
+            csv_files, current_sink, current_db_schema, manifest, fingerprints
         )
 
-        current_file_encoding = detect_encoding(csv_file)
-        if not current_file_encoding:
-            logging.error(
-                f"Não foi possível determinar o encoding para {csv_file}. Pulando arquivo."
-            )
-            continue
-
-        try:
-            try:
-                separator = detect_separator(csv_file, current_file_encoding)
-                first_chunk = next(
-                    pd.read_csv(
-                        csv_file,
-                        chunksize=5,
-                        low_memory=False,
-                        encoding=current_file_encoding,
-                        sep=separator,
-                    )
-                )
-                logging.info(
-                    f"Primeiro chunk de {csv_file} lido com sucesso usando encoding '{current_file_encoding}' e separador '{separator}'."
-                )
-            except UnicodeDecodeError:
-                logging.error(
-                    f"Falha de UnicodeDecodeError ao ler {csv_file} com encoding detectado/fallback '{current_file_encoding}'. Verifique o arquivo."
-                )
-                logging.warning(
-                    f"Tentando com latin1 como último recurso para {csv_file}"
-                )
-                try:
-                    current_file_encoding = "latin1"
-                    separator = detect_separator(csv_file, current_file_encoding)
-                    first_chunk = next(
-                        pd.read_csv(
-                            csv_file,
-                            chunksize=5,
-                            low_memory=False,
-                            encoding=current_file_encoding,
-                            sep=separator,
-                        )
-                    )
-                    logging.info(
-                        f"Primeiro chunk de {csv_file} lido com sucesso usando encoding de último recurso '{current_file_encoding}' e separador '{separator}'."
-                    )
-                except Exception as e_fallback:
-                    logging.error(
-                        f"Falha ao ler {csv_file} mesmo com encoding de último recurso '{current_file_encoding}': {e_fallback}. Pulando arquivo."
-                    )
-                    continue
-            except StopIteration:
-                logging.warning(
-                    f"O arquivo CSV '{csv_file}' parece estar vazio ou contém apenas cabeçalhos. Pulando."
-                )
-                continue
-
-            if first_chunk.empty:
-                logging.warning(
-                    f"O arquivo CSV '{csv_file}' está vazio ou não contém dados após o cabeçalho. Pulando."
-                )
-                continue
-
-            created_table_name, created_schema_name, table_existed = (
-                create_table_from_csv(
-                    conn,
-                    table_name,
-                    first_chunk,
-                    schema_name=current_db_schema,
-                    truncate_existing=truncate_existing_tables,
-                )
-            )
-
-            if created_table_name:
-                if table_existed:
-                    logging.info(
-                        f"Tabela '{created_schema_name}.{created_table_name}' já existia. Verifique logs para status de TRUNCATE se aplicável."
-                    )
-
-                success = insert_data_from_csv(
-                    conn,
-                    created_table_name,
-                    created_schema_name,
-                    csv_file,
-                    file_encoding=current_file_encoding,
-                )
-                if success:
-                    logging.info(
-                        f"Arquivo '{file_name}' processado e dados inseridos na tabela '{created_schema_name}.{created_table_name}'."
-                    )
-                else:
-                    logging.error(
-                        f"Falha ao inserir dados do arquivo '{file_name}' na tabela '{created_schema_name}.{created_table_name}'."
-                    )
-            else:
-                logging.error(
-                    f"Não foi possível determinar o nome da tabela ou criar a tabela para o arquivo {csv_file}. Pulando inserção."
-                )
-
-        except pd.errors.EmptyDataError:
-            logging.warning(
-                f"O arquivo CSV '{csv_file}' está vazio. Nenhuma tabela criada ou dados inseridos."
+    if not csv_files:
+        results = []
+    elif workers and workers > 1 and len(csv_files) > 1:
+        # Cada worker abre o próprio destino; o do processo principal só validou o acesso.
+        current_sink.close()
+        current_sink = None
+        results = process_csv_files_parallel(
+            csv_files,
+            sink_options,
+            current_db_schema,
+            truncate_existing_tables,
+            workers=min(workers, len(csv_files)),
+            max_per_table=max_workers_per_table,
+            load_options=load_options,
+        )
+    else:
+        results = [
+            process_csv_file(
+                current_sink,
+                csv_file,
+                current_db_schema,
+                truncate_existing_tables,
+                load_options,
             )
-        except Exception as e:
-            logging.error(f"Erro inesperado ao processar o arquivo '{csv_file}': {e}")
+            for csv_file in csv_files
+        ]
 
-    if conn:
-        conn.close()
-        logging.info("Conexão com SQL Server fechada.")
+    if current_sink:
+        current_sink.close()
+    if manifest is not None:
+        update_manifest(manifest, results, fingerprints)
+    log_upload_summary(skipped_results + results)
+    if metrics_dir:
+        write_metrics(skipped_results + results, metrics_dir, time.perf_counter() - run_started)
     logging.info("Processo de upload de CSVs concluído.")
 
 
@@ -877,6 +4289,230 @@ if __name__ == "__main__":
         default=False,
         help="Se especificado, as tabelas existentes serão truncadas antes da inserção de novos dados. Padrão: Não truncar.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Número de processos carregando arquivos em paralelo, cada um com sua própria conexão. Padrão: 1 (sequencial).",
+    )
+    parser.add_argument(
+        "--max-per-table",
+        type=int,
+        default=1,
+        help="Máximo de arquivos carregados simultaneamente na mesma tabela quando --workers > 1 (0 = sem limite). Padrão: 1.",
+    )
+    parser.add_argument(
+        "--partition-threshold-mb",
+        type=int,
+        default=PARTITION_THRESHOLD_BYTES // (1024 * 1024),
+        help="Arquivos com pelo menos este tamanho (MB) são divididos em faixas de bytes carregadas em paralelo (0 desabilita). "
+        f"Padrão: {PARTITION_THRESHOLD_BYTES // (1024 * 1024)}.",
+    )
+    parser.add_argument(
+        "--partition-workers",
+        type=int,
+        default=PARTITION_WORKERS,
+        help=f"Número de faixas/processos usados na carga particionada de um arquivo grande. Padrão: {PARTITION_WORKERS}.",
+    )
+    parser.add_argument(
+        "--sink",
+        choices=SINK_KINDS,
+        default="sqlserver",
+        help="Destino da carga: 'sqlserver' (padrão), 'sqlite' ou 'file' (ambos em --sink-path) ou 'null' "
+        "(descarta as linhas; mede só a leitura). Útil para benchmarks locais sem SQL Server.",
+    )
+    parser.add_argument(
+        "--sink-path",
+        type=str,
+        default=None,
+        help="Arquivo .db (sink 'sqlite') ou diretório de saída (sink 'file').",
+    )
+    parser.add_argument(
+        "--load-mode",
+        choices=LOAD_MODES,
+        default="executemany",
+        help="Como os lotes são enviados ao servidor: 'executemany' (fast_executemany), 'tvp' "
+        "(um table-valued parameter por lote) ou 'bulk' (arquivo de staging + BULK INSERT com TABLOCK). "
+        "Padrão: executemany.",
+    )
+    parser.add_argument(
+        "--bulk-staging-dir",
+        type=str,
+        default=None,
+        help="Diretório (local ou compartilhamento) onde os arquivos de staging do modo 'bulk' são gravados. "
+        "Se inacessível, a carga usa executemany.",
+    )
+    parser.add_argument(
+        "--bulk-server-dir",
+        type=str,
+        default=None,
+        help="Caminho do diretório de staging visto pelo SQL Server (ex.: \\\\servidor\\staging), se diferente de --bulk-staging-dir.",
+    )
+    parser.add_argument(
+        "--infer-types",
+        action="store_true",
+        default=False,
+        help="Infere o tipo de cada coluna (INT, BIGINT, DECIMAL, DATE, DATETIME2, BIT ou NVARCHAR(n)) a partir de uma amostra "
+        "do arquivo ao criar tabelas novas. Colunas cujo tipo for violado por um lote posterior são alargadas. "
+        "Padrão: todas as colunas NVARCHAR(MAX).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="Perfila cada arquivo (uma leitura completa) antes da carga: as colunas novas são dimensionadas pelo maior valor "
+        "e os parâmetros do insert são declarados com setinputsizes.",
+    )
+    parser.add_argument(
+        "--profile-only",
+        action="store_true",
+        default=False,
+        help=f"Apenas perfila os arquivos (comprimentos, nulos, numéricos/datas, distintos aproximados) e grava os relatórios em '{PROFILE_DIR}/', sem carregar.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="Retoma uma execução interrompida a partir dos diários de checkpoint: arquivos concluídos são pulados e "
+        "os demais continuam do último lote confirmado (sem truncar a tabela).",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=str,
+        default=CHECKPOINT_DIR,
+        help=f"Diretório dos diários de checkpoint (offset em bytes e linhas confirmadas por arquivo/tabela). Padrão: '{CHECKPOINT_DIR}'.",
+    )
+    parser.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        default=False,
+        help="Pula arquivos cujo tamanho, data e hash de conteúdo e tabela de destino não mudaram desde a última carga "
+        "bem-sucedida registrada no manifesto.",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=MANIFEST_PATH,
+        help=f"Arquivo JSON do manifesto de arquivos carregados. Padrão: '{MANIFEST_PATH}'.",
+    )
+
+    parser.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=PIPELINE_DEPTH,
+        help="Lê e normaliza os lotes em uma thread própria, até este número de lotes à frente da gravação, "
+        "para que a leitura não pare enquanto o banco grava (0 desabilita). O log informa o tempo de leitura e "
+        f"de gravação de cada arquivo. Padrão: {PIPELINE_DEPTH}.",
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=LOAD_ENGINES,
+        default=DEFAULT_ENGINE,
+        help="Motor de leitura do CSV: 'stream' (csv embutido, com checkpoints por offset), 'arrow' (pyarrow.csv, "
+        "parse em várias threads e normalização vetorizada; requer pyarrow) ou 'pandas' (parser C do read_csv em chunks, "
+        "normalização vetorizada). 'arrow' e 'pandas' não dividem arquivos em faixas e, sem offsets por lote, só são "
+        f"usados sem checkpoints (--swap, --key ou --checkpoint-dir ''). Padrão: '{DEFAULT_ENGINE}'.",
+    )
+
+    parser.add_argument(
+        "--key",
+        default=None,
+        help="Colunas-chave separadas por vírgula (ex.: 'cliente,data'). Ativa a carga incremental: cada arquivo é "
+        "carregado em uma tabela de staging e aplicado na tabela atual com MERGE, que insere as chaves novas e "
+        "atualiza apenas as linhas cujo hash das demais colunas mudou. Chaves nulas ou repetidas no arquivo fazem "
+        "a carga falhar sem alterar a tabela. Substitui --truncate e --swap e desativa checkpoints.",
+    )
+    parser.add_argument(
+        "--merge-delete",
+        action="store_true",
+        default=False,
+        help="Com --key, remove da tabela as chaves que não aparecem no arquivo (o arquivo é o retrato completo da tabela).",
+    )
+    parser.add_argument(
+        "--tail",
+        action="store_true",
+        default=False,
+        help="Carga incremental de arquivos que crescem ao longo do dia: cada execução insere apenas as linhas "
+        "completas acrescentadas desde a anterior, a partir do último offset registrado nos checkpoints. Se o "
+        "arquivo encolher, for substituído ou mudar de cabeçalho, a tabela é truncada e o arquivo recarregado inteiro.",
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        default=False,
+        help="Modo contínuo: em vez de uma execução única, observa --csv-dir (inotify no Linux, verificação periódica "
+        "nos demais casos) e carrega cada arquivo novo ou alterado depois que ele para de crescer, mantendo as conexões "
+        "abertas entre as cargas. Encerra com Ctrl+C ou SIGTERM, depois das cargas em andamento.",
+    )
+    parser.add_argument(
+        "--settle-seconds",
+        type=float,
+        default=WATCH_SETTLE_SECONDS,
+        help=f"Com --watch, tempo que um arquivo precisa ficar sem mudar de tamanho e de data para ser carregado. Padrão: {WATCH_SETTLE_SECONDS}.",
+    )
+    parser.add_argument(
+        "--poll-seconds",
+        type=float,
+        default=WATCH_POLL_SECONDS,
+        help=f"Com --watch, intervalo máximo entre duas verificações do diretório. Padrão: {WATCH_POLL_SECONDS}.",
+    )
+    parser.add_argument(
+        "--done-dir",
+        default=None,
+        help="Com --watch, diretório para onde os arquivos carregados com sucesso são movidos. Se omitido, ficam no lugar.",
+    )
+    parser.add_argument(
+        "--failed-dir",
+        default=None,
+        help="Com --watch, diretório para onde os arquivos cuja carga falhou são movidos. Se omitido, ficam no lugar.",
+    )
+
+    parser.add_argument(
+        "--batch-rows",
+        type=int,
+        default=None,
+        help="Número fixo de linhas por lote. Se omitido, o tamanho do lote é ajustado a cada lote pelos bytes por linha "
+        "medidos e pelo tempo de gravação (veja --batch-memory-mb e --target-flush-seconds).",
+    )
+    parser.add_argument(
+        "--batch-memory-mb",
+        type=int,
+        default=BATCH_MEMORY_BUDGET_BYTES // (1024 * 1024),
+        help="Memória máxima (MB) das linhas em trânsito por arquivo (e por processo), incluindo a fila do pipeline. "
+        f"Padrão: {BATCH_MEMORY_BUDGET_BYTES // (1024 * 1024)}.",
+    )
+    parser.add_argument(
+        "--target-flush-seconds",
+        type=float,
+        default=TARGET_FLUSH_SECONDS,
+        help=f"Tempo alvo de gravação de cada lote usado no ajuste do tamanho. Padrão: {TARGET_FLUSH_SECONDS}.",
+    )
+
+    parser.add_argument(
+        "--swap",
+        action="store_true",
+        default=False,
+        help="Carrega cada arquivo em uma tabela de staging (<tabela>__staging) e, se a carga terminar com sucesso, a troca "
+        "pela tabela atual em uma única transação (ALTER TABLE SWITCH ou renomeação). Leitores nunca veem a tabela vazia "
+        "ou pela metade, e uma falha descarta a staging sem tocar na tabela atual. Substitui --truncate e desativa checkpoints.",
+    )
+
+    parser.add_argument(
+        "--metrics-dir",
+        type=str,
+        default=None,
+        help=f"Diretório onde gravar as métricas da execução: '{METRICS_JSONL_FILENAME}' (um JSON por arquivo e por execução, "
+        f"acrescentado) e '{METRICS_PROM_FILENAME}' (textfile do Prometheus para o node exporter, substituído a cada execução).",
+    )
+    parser.add_argument(
+        "--reject-dir",
+        type=str,
+        default=REJECT_DIR,
+        help=f"Diretório dos arquivos de linhas malformadas (<esquema>.<tabela>.rejects.csv.gz, com número da linha, motivo "
+        f"e campos lidos); o log recebe só uma amostra. Use '' para não gravar os arquivos. Padrão: '{REJECT_DIR}'.",
+    )
 
     args = parser.parse_args()
 
@@ -905,4 +4541,36 @@ if __name__ == "__main__":
         use_trusted_connection=use_trusted_arg,
         truncate_existing_tables=args.truncate,
         db_schema_override=args.db_schema,
+        workers=args.workers,
+        max_workers_per_table=args.max_per_table,
+        partition_threshold_bytes=args.partition_threshold_mb * 1024 * 1024,
+        partition_workers=args.partition_workers,
+        load_mode=args.load_mode,
+        bulk_staging_dir=args.bulk_staging_dir,
+        bulk_server_dir=args.bulk_server_dir,
+        sink=args.sink,
+        sink_path=args.sink_path,
+        infer_types=args.infer_types,
+        profile=args.profile,
+        profile_only=args.profile_only,
+        resume=args.resume,
+        checkpoint_dir=args.checkpoint_dir,
+        skip_unchanged=args.skip_unchanged,
+        manifest_path=args.manifest,
+        pipeline_depth=args.pipeline_depth,
+        batch_rows=args.batch_rows,
+        batch_memory_bytes=args.batch_memory_mb * 1024 * 1024,
+        target_flush_seconds=args.target_flush_seconds,
+        swap=args.swap,
+        metrics_dir=args.metrics_dir,
+        reject_dir=args.reject_dir or None,
+        engine=args.engine,
+        merge_keys=[key.strip() for key in args.key.split(",") if key.strip()] if args.key else None,
+        merge_delete=args.merge_delete,
+        tail=args.tail,
+        watch=args.watch,
+        settle_seconds=args.settle_seconds,
+        poll_seconds=args.poll_seconds,
+        done_dir=args.done_dir,
+        failed_dir=args.failed_dir,
     )
@@ -0,0 +1,1313 @@
+import csv
+import io
+import logging
+import os
+import sqlite3
+import uuid
+import zlib
+
+import pyodbc
+
+import db_pool
+from sql_types import NVARCHAR_MAX_LENGTH, build_type_validator, infer_sql_type, merge_sql_types
+
+# Esquema usado quando nenhum é informado (o csv_ship já passa o seu DB_SCHEMA).
+DB_SCHEMA = "dbo"
+
+# Espera máxima pelo lock de aplicação que serializa o alargamento de colunas de uma tabela.
+WIDEN_LOCK_TIMEOUT_MS = 60_000
+
+
+def _up_to_line(last_line):
+    """Trecho " (até linha N)" das mensagens de lote; vazio se o motor não informa a linha."""
+    return f" (até linha {last_line})" if last_line is not None else ""
+
+
+def build_column_definitions(columns, column_types=None):
+    """
+    Gera as definições de coluna usadas no CREATE TABLE (e no tipo TVP equivalente).
+    Sem `column_types` (um tipo SQL por coluna) todas as colunas são NVARCHAR(MAX).
+    """
+    column_types = column_types or ["NVARCHAR(MAX)"] * len(columns)
+    column_definitions = []
+    for col_name, sql_type in zip(columns, column_types):
+        sanitized_col_name = "".join(c if c.isalnum() else "_" for c in col_name)
+        column_definitions.append(f"[{sanitized_col_name}] {sql_type}")
+    return column_definitions
+
+
+def create_table_from_csv(
+    conn,
+    table_name,
+    df_chunk,
+    schema_name=None,
+    truncate_existing=False,
+    column_types=None,
+):
+    """
+    Cria uma tabela no SQL Server com base no DataFrame (primeiro chunk) ou na lista de colunas.
+    Por padrão todas as colunas são criadas como NVARCHAR(MAX) para simplicidade e para evitar
+    erros de tipo; `column_types` (veja infer_column_types) define um tipo por coluna.
+    """
+    columns = list(getattr(df_chunk, "columns", df_chunk))
+    cursor = conn.cursor()
+    sanitized_table_name = "".join(c if c.isalnum() else "_" for c in table_name)
+    current_schema = schema_name if schema_name else DB_SCHEMA
+    full_table_name_for_query = f"[{current_schema}].[{sanitized_table_name}]"
+    full_table_name_for_log = f"{current_schema}.{sanitized_table_name}"
+
+    check_table_sql = f"IF OBJECT_ID(N'{current_schema}.{sanitized_table_name}', N'U') IS NOT NULL SELECT 1 ELSE SELECT 0"
+    logging.debug(f"Verificando existência da tabela com SQL: {check_table_sql}")
+    cursor.execute(check_table_sql)
+    if cursor.fetchone()[0] == 1:
+        logging.info(f"Tabela '{full_table_name_for_log}' já existe.")
+        if truncate_existing:
+            try:
+                logging.info(
+                    f"Opção TRUNCATE habilitada. Truncando tabela '{full_table_name_for_log}'..."
+                )
+                cursor.execute(f"TRUNCATE TABLE {full_table_name_for_query}")
+                conn.commit()
+                logging.info(
+                    f"Tabela '{full_table_name_for_log}' truncada com sucesso."
+                )
+            except pyodbc.Error as e_truncate:
+                logging.error(
+                    f"Erro ao truncar a tabela '{full_table_name_for_log}': {e_truncate}"
+                )
+                conn.rollback()
+                return sanitized_table_name, current_schema, False
+        return sanitized_table_name, current_schema, True
+
+    column_definitions = build_column_definitions(columns, column_types)
+
+    create_table_sql = (
+        f"CREATE TABLE {full_table_name_for_query} ({', '.join(column_definitions)})"
+    )
+
+    try:
+        logging.info(
+            f"Criando tabela '{full_table_name_for_log}' com as colunas: {', '.join(column_definitions)}"
+        )
+        cursor.execute(create_table_sql)
+        conn.commit()
+        logging.info(f"Tabela '{full_table_name_for_log}' criada com sucesso.")
+        return sanitized_table_name, current_schema, False
+    except pyodbc.Error as e:
+        if (
+            "2760" in str(e)
+            or "schema" in str(e).lower()
+            and ("does not exist" in str(e).lower() or "cannot find" in str(e).lower())
+        ):
+            logging.warning(
+                f"O esquema '{current_schema}' parece não existir ou não há permissão para usá-lo. Tentando criar o esquema '{current_schema}'..."
+            )
+            try:
+                cursor.execute(
+                    f"IF NOT EXISTS (SELECT * FROM sys.schemas WHERE name = '{current_schema}') EXEC('CREATE SCHEMA [{current_schema}]')"
+                )
+                conn.commit()
+                logging.info(
+                    f"Esquema '{current_schema}' verificado/criado. Tentando criar a tabela '{full_table_name_for_log}' novamente."
+                )
+                cursor.execute(create_table_sql)
+                conn.commit()
+                logging.info(
+                    f"Tabela '{full_table_name_for_log}' criada com sucesso após criação do esquema."
+                )
+                return sanitized_table_name, current_schema, False
+            except pyodbc.Error as e_schema:
+                logging.error(
+                    f"Erro ao tentar criar o esquema '{current_schema}' ou a tabela '{full_table_name_for_log}' após tentativa de criação do esquema: {e_schema}"
+                )
+                conn.rollback()
+                return sanitized_table_name, current_schema, False
+        else:
+            logging.error(f"Erro ao criar tabela '{full_table_name_for_log}': {e}")
+            conn.rollback()
+            return sanitized_table_name, current_schema, False
+
+
+class ExecutemanyLoader:
+    """
+    Carrega cada lote com cursor.executemany (fast_executemany); `commit` confirma o lote.
+    Com `max_lengths` (maior valor de cada coluna, veja profile_csv_file) os parâmetros são
+    declarados via setinputsizes, evitando buffers de tamanho ilimitado.
+    """
+
+    mode = "executemany"
+    durable_commits = True
+
+    def __init__(
+        self, conn, full_table_name_for_query, full_table_name_for_log, columns, max_lengths=None
+    ):
+        self.conn = conn
+        self.input_sizes = None
+        if max_lengths:
+            self.input_sizes = [
+                (pyodbc.SQL_WVARCHAR, max(length, 1) if length <= NVARCHAR_MAX_LENGTH else 0, 0)
+                for length in max_lengths
+            ]
+        self.reset_cursor()
+        self.full_table_name_for_log = full_table_name_for_log
+        cols = ", ".join([f"[{col}]" for col in columns])
+        placeholders = ", ".join(["?"] * len(columns))
+        self.insert_sql = f"INSERT INTO {full_table_name_for_query} ({cols}) VALUES ({placeholders})"
+        self.rows_loaded = 0
+        self._pending_rows = 0
+        self._pending_last_line = None
+
+    def reset_cursor(self):
+        """Abre um novo cursor, descartando os parâmetros já descritos (ex.: após ALTER COLUMN)."""
+        self.cursor = self.conn.cursor()
+        self.cursor.fast_executemany = True
+        if self.input_sizes:
+            self.cursor.setinputsizes(self.input_sizes)
+
+    def write_batch(self, batch, last_line=None):
+        self.cursor.executemany(self.insert_sql, batch)
+        self._pending_rows += len(batch)
+        self._pending_last_line = last_line
+
+    def commit(self):
+        if not self._pending_rows:
+            return
+        self.conn.commit()
+        self.rows_loaded += self._pending_rows
+        logging.info(
+            f"Inseridas {self._pending_rows} linhas{_up_to_line(self._pending_last_line)} na tabela '{self.full_table_name_for_log}'"
+        )
+        self._pending_rows = 0
+
+    def finish(self):
+        self.commit()
+        return self.rows_loaded
+
+    def abort(self):
+        pass
+
+
+BULK_FIELD_TERMINATOR = "\x1f"
+BULK_ROW_TERMINATOR = "\x1e"
+
+
+class BulkInsertLoader:
+    """
+    Grava os lotes já normalizados em um arquivo de staging (UTF-16LE, separadores de
+    controle 0x1F/0x1E, campo vazio = NULL) e ao final executa um único BULK INSERT com
+    BATCHSIZE e TABLOCK. Se o BULK INSERT falhar, o arquivo de staging é reenviado via
+    executemany.
+    """
+
+    mode = "bulk"
+    # Nada chega à tabela antes de `finish`: os lotes não podem ser usados como checkpoint.
+    durable_commits = False
+
+    def __init__(
+        self,
+        conn,
+        schema_name,
+        table_name,
+        columns,
+        staging_dir,
+        server_staging_dir=None,
+        batch_size=10000,
+        tablock=True,
+    ):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.full_table_name_for_query = f"[{schema_name}].[{table_name}]"
+        self.full_table_name_for_log = f"{schema_name}.{table_name}"
+        self.columns = columns
+        self.batch_size = batch_size
+        self.tablock = tablock
+        self.rows_loaded = 0
+        self.rows_staged = 0
+
+        self.table_columns = self._table_column_order(schema_name, table_name)
+        missing = [col for col in columns if col not in self.table_columns]
+        if missing or len(set(columns)) != len(columns):
+            raise ValueError(
+                f"Colunas do CSV não correspondem às colunas da tabela '{self.full_table_name_for_log}': {missing}"
+            )
+        positions = {col: index for index, col in enumerate(columns)}
+        order = [positions.get(col) for col in self.table_columns]
+        self._reorder = None if order == list(range(len(columns))) else order
+
+        file_name = f"{table_name}_{os.getpid()}_{uuid.uuid4().hex}.dat"
+        self.staging_path = os.path.join(staging_dir, file_name)
+        server_dir = server_staging_dir or os.path.abspath(staging_dir)
+        server_sep = "\\" if "\\" in server_dir else "/"
+        self.server_path = server_dir.rstrip("\\/") + server_sep + file_name
+        self._file = open(self.staging_path, "w", encoding="utf-16-le", newline="")
+
+    def _table_column_order(self, schema_name, table_name):
+        self.cursor.execute(
+            "SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS "
+            "WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ? ORDER BY ORDINAL_POSITION",
+            schema_name,
+            table_name,
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def _format_batch(self, batch):
+        fs, rs = BULK_FIELD_TERMINATOR, BULK_ROW_TERMINATOR
+        if self._reorder is not None:
+            order = self._reorder
+            batch = [
+                tuple([row[i] if i is not None else None for i in order])
+                for row in batch
+            ]
+        text = rs.join(
+            fs.join([value if value is not None else "" for value in row])
+            for row in batch
+        ) + rs
+        num_fields = len(self.table_columns)
+        if text.count(fs) != len(batch) * (num_fields - 1) or text.count(rs) != len(
+            batch
+        ):
+            # Algum valor contém um dos separadores de controle: substitui por espaço.
+            text = rs.join(
+                fs.join(
+                    [
+                        value.replace(fs, " ").replace(rs, " ")
+                        if value is not None
+                        else ""
+                        for value in row
+                    ]
+                )
+                for row in batch
+            ) + rs
+        return text
+
+    def write_batch(self, batch, last_line=None):
+        self._file.write(self._format_batch(batch))
+        self.rows_staged += len(batch)
+        logging.debug(
+            f"Gravadas {len(batch)} linhas{_up_to_line(last_line)} no arquivo de staging {self.staging_path}"
+        )
+
+    def commit(self):
+        # As linhas só chegam ao servidor no BULK INSERT executado em `finish`.
+        pass
+
+    def _read_staged_batches(self):
+        batch = []
+        pending = ""
+        with open(self.staging_path, "r", encoding="utf-16-le", newline="") as staged:
+            while True:
+                block = staged.read(1024 * 1024)
+                if not block:
+                    break
+                records = (pending + block).split(BULK_ROW_TERMINATOR)
+                pending = records.pop()
+                for record in records:
+                    batch.append(
+                        tuple(
+                            [
+                                value or None
+                                for value in record.split(BULK_FIELD_TERMINATOR)
+                            ]
+                        )
+                    )
+                    if len(batch) >= self.batch_size:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+
+    def finish(self):
+        self._file.close()
+        server_path_literal = self.server_path.replace("'", "''")
+        options = [
+            "DATAFILETYPE = 'widechar'",
+            "FIELDTERMINATOR = '0x1f'",
+            "ROWTERMINATOR = '0x1e'",
+            f"BATCHSIZE = {int(self.batch_size)}",
+            "KEEPNULLS",
+        ]
+        if self.tablock:
+            options.append("TABLOCK")
+        bulk_sql = f"BULK INSERT {self.full_table_name_for_query} FROM '{server_path_literal}' WITH ({', '.join(options)})"
+        try:
+            logging.info(
+                f"Executando BULK INSERT de {self.rows_staged} linhas a partir de '{self.server_path}' na tabela '{self.full_table_name_for_log}'"
+            )
+            self.cursor.execute(bulk_sql)
+            self.conn.commit()
+            self.rows_loaded = self.rows_staged
+        except pyodbc.Error as e:
+            self.conn.rollback()
+            logging.warning(
+                f"BULK INSERT falhou para '{self.full_table_name_for_log}' ({e}). Reenviando o arquivo de staging via executemany."
+            )
+            fallback = ExecutemanyLoader(
+                self.conn,
+                self.full_table_name_for_query,
+                self.full_table_name_for_log,
+                self.table_columns,
+            )
+            for batch in self._read_staged_batches():
+                fallback.write_batch(batch)
+                fallback.commit()
+            self.rows_loaded = fallback.finish()
+        finally:
+            self._remove_staging_file()
+        return self.rows_loaded
+
+    def abort(self):
+        if not self._file.closed:
+            self._file.close()
+        self._remove_staging_file()
+
+    def _remove_staging_file(self):
+        try:
+            os.remove(self.staging_path)
+        except OSError as e:
+            logging.warning(
+                f"Não foi possível remover o arquivo de staging {self.staging_path}: {e}"
+            )
+
+
+class TvpLoader:
+    """
+    Envia cada lote como um único table-valued parameter para um INSERT ... SELECT FROM ?,
+    com uma ida ao servidor por lote. O tipo de tabela é gerado a partir das mesmas
+    definições de coluna de `create_table_from_csv` e reaproveitado entre execuções.
+    """
+
+    mode = "tvp"
+    durable_commits = True
+
+    def __init__(self, conn, schema_name, table_name, columns):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.schema_name = schema_name
+        self.full_table_name_for_log = f"{schema_name}.{table_name}"
+        self.rows_loaded = 0
+        self._pending_rows = 0
+        self._pending_last_line = None
+
+        column_definitions = build_column_definitions(columns)
+        definitions_sql = ", ".join(column_definitions)
+        # O sufixo muda quando as colunas mudam, evitando reaproveitar um tipo desatualizado.
+        self.type_name = (
+            f"tvp_{table_name}_{zlib.crc32(definitions_sql.encode('utf-8')):08x}"
+        )
+        self.cursor.execute(
+            f"IF TYPE_ID(N'{schema_name}.{self.type_name}') IS NULL "
+            f"CREATE TYPE [{schema_name}].[{self.type_name}] AS TABLE ({definitions_sql})"
+        )
+        self.conn.commit()
+
+        cols = ", ".join([f"[{col}]" for col in columns])
+        self.insert_sql = f"INSERT INTO [{schema_name}].[{table_name}] ({cols}) SELECT {cols} FROM ?"
+
+    def write_batch(self, batch, last_line=None):
+        # Fora de stored procedures o pyodbc exige nome e esquema do tipo antes das linhas.
+        self.cursor.execute(self.insert_sql, [[self.type_name, self.schema_name] + batch])
+        self._pending_rows += len(batch)
+        self._pending_last_line = last_line
+
+    def commit(self):
+        if not self._pending_rows:
+            return
+        self.conn.commit()
+        self.rows_loaded += self._pending_rows
+        logging.info(
+            f"Inseridas {self._pending_rows} linhas via TVP{_up_to_line(self._pending_last_line)} na tabela '{self.full_table_name_for_log}'"
+        )
+        self._pending_rows = 0
+
+    def finish(self):
+        self.commit()
+        return self.rows_loaded
+
+    def abort(self):
+        pass
+
+
+def is_staging_dir_reachable(staging_dir):
+    """Verifica se o diretório de staging (local ou compartilhamento) existe e aceita escrita."""
+    return bool(staging_dir) and os.path.isdir(staging_dir) and os.access(staging_dir, os.W_OK)
+
+
+def create_batch_loader(
+    conn,
+    schema_name,
+    table_name,
+    columns,
+    load_mode="executemany",
+    chunk_size=10000,
+    bulk_staging_dir=None,
+    bulk_server_dir=None,
+    max_lengths=None,
+):
+    """
+    Cria o carregador de lotes do modo pedido ('executemany', 'bulk' ou 'tvp'). Os modos
+    'bulk' e 'tvp' recaem para executemany quando não podem ser preparados.
+    `max_lengths` dimensiona os parâmetros do executemany (veja ExecutemanyLoader).
+    """
+    full_table_name_for_query = f"[{schema_name}].[{table_name}]"
+    full_table_name_for_log = f"{schema_name}.{table_name}"
+    if load_mode == "bulk":
+        if not is_staging_dir_reachable(bulk_staging_dir):
+            logging.warning(
+                f"Diretório de staging '{bulk_staging_dir}' inacessível. Usando executemany para '{full_table_name_for_log}'."
+            )
+        else:
+            try:
+                return BulkInsertLoader(
+                    conn,
+                    schema_name,
+                    table_name,
+                    columns,
+                    bulk_staging_dir,
+                    server_staging_dir=bulk_server_dir,
+                    batch_size=chunk_size,
+                )
+            except (OSError, ValueError, pyodbc.Error) as e:
+                logging.warning(
+                    f"Não foi possível preparar o BULK INSERT para '{full_table_name_for_log}': {e}. Usando executemany."
+                )
+    elif load_mode == "tvp":
+        try:
+            return TvpLoader(conn, schema_name, table_name, columns)
+        except pyodbc.Error as e:
+            conn.rollback()
+            logging.warning(
+                f"Não foi possível criar o tipo TVP para '{full_table_name_for_log}': {e}. Usando executemany."
+            )
+    elif load_mode != "executemany":
+        logging.warning(f"Modo de carga desconhecido '{load_mode}'. Usando executemany.")
+    return ExecutemanyLoader(
+        conn,
+        full_table_name_for_query,
+        full_table_name_for_log,
+        columns,
+        max_lengths=max_lengths,
+    )
+
+
+class CsvSink:
+    """
+    Destino de uma carga. Para cada arquivo o pipeline chama `create_table` e depois
+    `begin_load`, `write_batch` + `commit` a cada lote e `end_load` (ou `abort_load`).
+    """
+
+    kind = None
+    # Indica se cada `commit` grava o lote em definitivo (base para checkpoints).
+    durable_commits = True
+    # Indica se o destino implementa a carga em staging com troca (create_staging_table).
+    supports_swap = False
+    # Indica se o destino aplica a staging por colunas-chave (merge_staging_table).
+    supports_merge = False
+
+    def create_table(
+        self, table_name, columns, schema_name=None, truncate_existing=False, column_types=None
+    ):
+        """
+        Cria a tabela se necessário. Retorna (tabela, esquema, já_existia).
+        `column_types` (tipos SQL Server inferidos) é usado apenas por destinos tipados.
+        """
+        raise NotImplementedError
+
+    def truncate(self, table_name, schema_name=None):
+        raise NotImplementedError
+
+    def begin_load(
+        self, table_name, schema_name, columns, chunk_size=10000, max_lengths=None
+    ):
+        """Prepara a carga; `max_lengths` é o maior comprimento de cada coluna, se conhecido."""
+        raise NotImplementedError
+
+    def write_batch(self, batch, last_line=None):
+        raise NotImplementedError
+
+    def commit(self):
+        pass
+
+    def end_load(self):
+        """Conclui a carga atual e retorna o total de linhas gravadas."""
+        raise NotImplementedError
+
+    def abort_load(self):
+        pass
+
+    def count_rows(self, table_name, schema_name=None):
+        """Número de linhas da tabela (0 se não existir), ou None se o destino não souber."""
+        return None
+
+    def create_staging_table(self, table_name, columns, schema_name=None, column_types=None):
+        """
+        Cria vazia a tabela de staging de `table_name` (descartando uma que tenha sobrado de
+        outra execução) e retorna seu nome, ou None se falhar.
+        """
+        raise NotImplementedError
+
+    def swap_staging_table(self, staging_table, table_name, schema_name=None):
+        """
+        Substitui o conteúdo de `table_name` pelo da tabela de staging em uma única
+        transação, descartando a staging. Retorna True se a troca foi feita.
+        """
+        raise NotImplementedError
+
+    def merge_staging_table(
+        self, staging_table, table_name, columns, key_columns, schema_name=None, delete_missing=False
+    ):
+        """
+        Aplica a tabela de staging em `table_name` pelas colunas `key_columns`, em uma única
+        transação: insere as chaves novas, atualiza as linhas cujas demais colunas mudaram e,
+        com `delete_missing`, remove as chaves ausentes da staging, que é descartada ao final.
+        Chaves nulas ou repetidas na staging fazem a operação falhar sem alterar a tabela.
+        Retorna um dicionário com as contagens (veja MERGE_COUNT_KEYS) ou None se falhar.
+        """
+        raise NotImplementedError
+
+    def drop_table(self, table_name, schema_name=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def staging_table_name(table_name):
+    """Nome da tabela de staging usada na carga com troca (veja CsvSink.create_staging_table)."""
+    return f"{table_name}__staging"
+
+
+# Contagens da carga incremental por chave (veja CsvSink.merge_staging_table).
+MERGE_COUNT_KEYS = ("inserted", "updated", "deleted", "unchanged")
+
+
+def _row_hash_sql(alias, columns):
+    """
+    Expressão T-SQL do hash SHA2_256 das `columns` de uma linha. Cada valor recebe um
+    prefixo que distingue NULL de texto vazio, e os valores são separados por NCHAR(31).
+    """
+    parts = [f"ISNULL(N'1' + CAST({alias}.[{col}] AS NVARCHAR(MAX)), N'0')" for col in columns]
+    return f"HASHBYTES('SHA2_256', CONCAT({', NCHAR(31), '.join(parts)}, N''))"
+
+
+def build_merge_sql(target_ref, staging_ref, columns, key_columns, delete_missing=False):
+    """
+    Monta o MERGE set-based da carga incremental: chaves novas são inseridas, linhas cujo
+    hash das colunas não-chave difere são atualizadas e, com `delete_missing`, chaves
+    ausentes da staging são removidas. O lote termina com um SELECT de (linhas na staging,
+    inseridas, atualizadas, removidas).
+    """
+    value_columns = [col for col in columns if col not in key_columns]
+    all_columns = ", ".join(f"[{col}]" for col in columns)
+    lines = [
+        "SET NOCOUNT ON;",
+        "DECLARE @actions TABLE ([action] NVARCHAR(10));",
+        f"MERGE {target_ref} WITH (HOLDLOCK) AS t",
+        f"USING {staging_ref} AS s",
+        "ON " + " AND ".join(f"t.[{col}] = s.[{col}]" for col in key_columns),
+    ]
+    if value_columns:
+        lines.append(f"WHEN MATCHED AND {_row_hash_sql('t', value_columns)} <> {_row_hash_sql('s', value_columns)}")
+        lines.append("    THEN UPDATE SET " + ", ".join(f"t.[{col}] = s.[{col}]" for col in value_columns))
+    lines.append(
+        f"WHEN NOT MATCHED BY TARGET THEN INSERT ({all_columns}) VALUES ("
+        + ", ".join(f"s.[{col}]" for col in columns)
+        + ")"
+    )
+    if delete_missing:
+        lines.append("WHEN NOT MATCHED BY SOURCE THEN DELETE")
+    lines.append("OUTPUT $action INTO @actions;")
+    lines.append(
+        f"SELECT (SELECT COUNT_BIG(*) FROM {staging_ref}), "
+        + ", ".join(
+            f"SUM(CASE WHEN [action] = '{action}' THEN 1 ELSE 0 END)"
+            for action in ("INSERT", "UPDATE", "DELETE")
+        )
+        + " FROM @actions;"
+    )
+    return "\n".join(lines)
+
+
+def merge_counts(staged, inserted, updated, deleted):
+    """Dicionário de contagens do merge; inalteradas são as linhas da staging não inseridas nem atualizadas."""
+    inserted, updated, deleted = inserted or 0, updated or 0, deleted or 0
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": (staged or 0) - inserted - updated,
+    }
+
+
+def log_merge_counts(label, counts):
+    logging.info(
+        f"Merge em {label}: {counts['inserted']} linha(s) inserida(s), {counts['updated']} atualizada(s), "
+        f"{counts['deleted']} removida(s), {counts['unchanged']} inalterada(s)."
+    )
+
+
+class SqlServerSink(CsvSink):
+    """
+    Destino SQL Server via pyodbc; os lotes são enviados pelo carregador de `load_mode`.
+    Com `infer_types`, cada lote é validado contra os tipos das colunas da tabela e as
+    colunas violadas são alargadas (ALTER COLUMN) antes do envio, até NVARCHAR(MAX).
+    Com um `pool` (db_pool.ConnectionPool que entregou `conn`), a conexão é testada antes
+    de cada arquivo e, se cair durante um lote ainda não confirmado, é reaberta e o lote
+    reenviado.
+    """
+
+    kind = "sqlserver"
+    supports_swap = True
+    supports_merge = True
+
+    def __init__(
+        self,
+        conn,
+        load_mode="executemany",
+        bulk_staging_dir=None,
+        bulk_server_dir=None,
+        infer_types=False,
+        pool=None,
+    ):
+        self.conn = conn
+        self.load_mode = load_mode
+        self.bulk_staging_dir = bulk_staging_dir
+        self.bulk_server_dir = bulk_server_dir
+        self.infer_types = infer_types
+        self.pool = pool
+        self.loader = None
+        self._type_checks = []
+        self._load_target = None
+        self._load_args = None
+
+    def _ensure_connection(self):
+        """Com um pool, troca a conexão se ela não responder mais. Retorna False se caiu de vez."""
+        if self.pool is None:
+            return True
+        conn = self.pool.validate(self.conn)
+        if conn is None:
+            return False
+        self.conn = conn
+        return True
+
+    def create_table(
+        self, table_name, columns, schema_name=None, truncate_existing=False, column_types=None
+    ):
+        if not self._ensure_connection():
+            return None, None, False
+        return create_table_from_csv(
+            self.conn,
+            table_name,
+            columns,
+            schema_name=schema_name,
+            truncate_existing=truncate_existing,
+            column_types=column_types,
+        )
+
+    def truncate(self, table_name, schema_name=None):
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        self.conn.cursor().execute(f"TRUNCATE TABLE [{current_schema}].[{table_name}]")
+        self.conn.commit()
+
+    def _table_column_types(self, table_name, schema_name):
+        """Lê os tipos atuais das colunas da tabela, no formato de infer_sql_type."""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE "
+            "FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?",
+            schema_name,
+            table_name,
+        )
+        column_types = {}
+        for col, data_type, max_length, precision, scale in cursor.fetchall():
+            data_type = data_type.upper()
+            if data_type in ("NVARCHAR", "VARCHAR", "NCHAR", "CHAR"):
+                length = "MAX" if max_length in (None, -1) else max_length
+                column_types[col] = f"{data_type}({length})"
+            elif data_type in ("DECIMAL", "NUMERIC"):
+                column_types[col] = f"DECIMAL({precision},{scale})"
+            else:
+                column_types[col] = data_type
+        return column_types
+
+    def _prepare_type_checks(self, table_name, schema_name, columns):
+        column_types = self._table_column_types(table_name, schema_name)
+        self._type_checks = []
+        for index, col in enumerate(columns):
+            sql_type = column_types.get(col)
+            validator = build_type_validator(sql_type) if sql_type else None
+            if validator:
+                self._type_checks.append((index, col, sql_type, validator))
+
+    def _lock_table_for_widening(self, cursor, schema_name, table_name):
+        """
+        Obtém o lock de aplicação exclusivo da tabela, mantido até o fim da transação do
+        lote, que serializa os ALTER COLUMN das cargas concorrentes na mesma tabela.
+        """
+        cursor.execute(
+            "SET NOCOUNT ON; DECLARE @result INT; "
+            "EXEC @result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', "
+            "@LockOwner = 'Transaction', @LockTimeout = ?; SELECT @result",
+            f"csv_ship.widen.{schema_name}.{table_name}",
+            WIDEN_LOCK_TIMEOUT_MS,
+        )
+        result = cursor.fetchone()[0]
+        if result < 0:
+            raise RuntimeError(
+                f"Não foi possível obter o lock para alterar colunas de '{schema_name}.{table_name}' (sp_getapplock retornou {result})."
+            )
+
+    def _widen_columns_for_batch(self, batch):
+        """Alarga as colunas cujo tipo não comporta algum valor do lote."""
+        schema_name, table_name = self._load_target
+        widened = []
+        for index, col, sql_type, validator in self._type_checks:
+            new_type = sql_type
+            for row in batch:
+                value = row[index]
+                if value is None or validator(value):
+                    continue
+                new_type = merge_sql_types(new_type, infer_sql_type([value]))
+                validator = build_type_validator(new_type)
+                if validator is None:
+                    break
+            if new_type != sql_type:
+                widened.append((col, sql_type, new_type))
+
+        if not widened:
+            return
+        cursor = self.conn.cursor()
+        # Outras faixas ou workers podem ter alargado a coluna depois que os tipos foram
+        # lidos: com o lock da tabela, o novo tipo é combinado com o tipo atual do servidor,
+        # nunca com o da leitura inicial, para que um alargamento nunca estreite a coluna.
+        self._lock_table_for_widening(cursor, schema_name, table_name)
+        server_types = self._table_column_types(table_name, schema_name)
+        new_types = {}
+        altered = False
+        for col, sql_type, new_type in widened:
+            current_type = server_types.get(col, sql_type)
+            new_type = merge_sql_types(current_type, new_type)
+            new_types[col] = new_type
+            if new_type == current_type:
+                logging.info(
+                    f"Coluna '{col}' em '{schema_name}.{table_name}' já foi alterada para {current_type} por outra carga."
+                )
+                continue
+            logging.warning(
+                f"Lote viola o tipo {current_type} da coluna '{col}' em '{schema_name}.{table_name}'. Alterando para {new_type}."
+            )
+            cursor.execute(
+                f"ALTER TABLE [{schema_name}].[{table_name}] ALTER COLUMN [{col}] {new_type} NULL"
+            )
+            altered = True
+        if altered and isinstance(self.loader, ExecutemanyLoader):
+            self.loader.reset_cursor()
+
+        type_checks = []
+        for index, col, sql_type, validator in self._type_checks:
+            if col in new_types:
+                sql_type = new_types[col]
+                validator = build_type_validator(sql_type)
+            if validator:
+                type_checks.append((index, col, sql_type, validator))
+        self._type_checks = type_checks
+
+    def begin_load(
+        self, table_name, schema_name, columns, chunk_size=10000, max_lengths=None
+    ):
+        self._load_target = (schema_name, table_name)
+        self._load_args = (columns, chunk_size, max_lengths)
+        self._type_checks = []
+        if self.infer_types:
+            self._prepare_type_checks(table_name, schema_name, columns)
+        self.loader = create_batch_loader(
+            self.conn,
+            schema_name,
+            table_name,
+            columns,
+            load_mode=self.load_mode,
+            chunk_size=chunk_size,
+            bulk_staging_dir=self.bulk_staging_dir,
+            bulk_server_dir=self.bulk_server_dir,
+            max_lengths=max_lengths,
+        )
+
+    @property
+    def durable_commits(self):
+        return self.loader is None or self.loader.durable_commits
+
+    def _can_replay_batch(self, error):
+        # Só o lote atual está pendente quando os anteriores já foram confirmados um a um.
+        return (
+            self.pool is not None
+            and db_pool.is_connection_lost(error)
+            and self.loader.durable_commits
+            and not self.loader._pending_rows
+        )
+
+    def _reopen_load(self):
+        """Reabre a conexão e refaz begin_load, preservando as linhas já confirmadas."""
+        conn = self.pool.reconnect(self.conn)
+        if conn is None:
+            return False
+        self.conn = conn
+        rows_loaded = self.loader.rows_loaded
+        schema_name, table_name = self._load_target
+        # ALTER COLUMN não confirmado se perdeu com a conexão: os tipos são relidos.
+        self.begin_load(table_name, schema_name, *self._load_args)
+        self.loader.rows_loaded = rows_loaded
+        return True
+
+    def write_batch(self, batch, last_line=None):
+        try:
+            if self._type_checks:
+                self._widen_columns_for_batch(batch)
+            self.loader.write_batch(batch, last_line=last_line)
+        except pyodbc.Error as e:
+            if not self._can_replay_batch(e):
+                raise
+            logging.warning(
+                f"Conexão perdida ao enviar o lote{_up_to_line(last_line)} para '{'.'.join(self._load_target)}': {e}. Reconectando e reenviando o lote..."
+            )
+            if not self._reopen_load():
+                raise
+            if self._type_checks:
+                self._widen_columns_for_batch(batch)
+            self.loader.write_batch(batch, last_line=last_line)
+
+    def commit(self):
+        self.loader.commit()
+
+    def end_load(self):
+        rows_loaded = self.loader.finish()
+        self.loader = None
+        return rows_loaded
+
+    def abort_load(self):
+        if self.loader is not None:
+            self.loader.abort()
+            self.loader = None
+        try:
+            self.conn.rollback()
+        except pyodbc.Error as e:
+            logging.warning(f"Erro ao desfazer a transação após falha na carga: {e}")
+
+    def _table_exists(self, cursor, table_name, schema_name):
+        cursor.execute(
+            f"IF OBJECT_ID(N'{schema_name}.{table_name}', N'U') IS NOT NULL SELECT 1 ELSE SELECT 0"
+        )
+        return cursor.fetchone()[0] == 1
+
+    def create_staging_table(self, table_name, columns, schema_name=None, column_types=None):
+        if not self._ensure_connection():
+            return None
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        staging_table = staging_table_name(table_name)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS [{current_schema}].[{staging_table}]")
+            if self._table_exists(cursor, table_name, current_schema):
+                # Heap vazio com as colunas e tipos da tabela atual (BULK INSERT com TABLOCK
+                # em um heap vazio pode ser minimamente registrado no log).
+                cursor.execute(
+                    f"SELECT TOP 0 * INTO [{current_schema}].[{staging_table}] FROM [{current_schema}].[{table_name}]"
+                )
+                self.conn.commit()
+                logging.info(
+                    f"Tabela de staging '{current_schema}.{staging_table}' criada com a estrutura de '{current_schema}.{table_name}'."
+                )
+                return staging_table
+            self.conn.commit()
+        except pyodbc.Error as e:
+            logging.error(
+                f"Erro ao preparar a tabela de staging '{current_schema}.{staging_table}': {e}"
+            )
+            self.conn.rollback()
+            return None
+        created_table, _, _ = create_table_from_csv(
+            self.conn,
+            staging_table,
+            columns,
+            schema_name=current_schema,
+            column_types=column_types,
+        )
+        return created_table
+
+    def swap_staging_table(self, staging_table, table_name, schema_name=None):
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        live_ref = f"[{current_schema}].[{table_name}]"
+        staging_ref = f"[{current_schema}].[{staging_table}]"
+        cursor = self.conn.cursor()
+        try:
+            live_exists = self._table_exists(cursor, table_name, current_schema)
+            if live_exists:
+                try:
+                    # Troca apenas de metadados que preserva o objeto atual (permissões,
+                    # índices, views); exige estruturas idênticas.
+                    cursor.execute(f"TRUNCATE TABLE {live_ref}")
+                    cursor.execute(f"ALTER TABLE {staging_ref} SWITCH TO {live_ref}")
+                    cursor.execute(f"DROP TABLE {staging_ref}")
+                    self.conn.commit()
+                    logging.info(
+                        f"Tabela de staging '{current_schema}.{staging_table}' trocada com '{current_schema}.{table_name}' via ALTER TABLE SWITCH."
+                    )
+                    return True
+                except pyodbc.Error as e:
+                    self.conn.rollback()
+                    logging.warning(
+                        f"ALTER TABLE SWITCH para '{current_schema}.{table_name}' não foi possível ({e}). Trocando as tabelas por renomeação."
+                    )
+                old_table = f"{table_name}__old"
+                cursor.execute(f"DROP TABLE IF EXISTS [{current_schema}].[{old_table}]")
+                cursor.execute("EXEC sp_rename ?, ?", f"{current_schema}.{table_name}", old_table)
+            cursor.execute("EXEC sp_rename ?, ?", f"{current_schema}.{staging_table}", table_name)
+            if live_exists:
+                cursor.execute(f"DROP TABLE [{current_schema}].[{old_table}]")
+            self.conn.commit()
+        except pyodbc.Error as e:
+            logging.error(
+                f"Erro ao trocar a tabela de staging '{current_schema}.{staging_table}' por '{current_schema}.{table_name}': {e}"
+            )
+            self.conn.rollback()
+            return False
+        logging.info(
+            f"Tabela de staging '{current_schema}.{staging_table}' renomeada para '{current_schema}.{table_name}'."
+        )
+        return True
+
+    def merge_staging_table(
+        self, staging_table, table_name, columns, key_columns, schema_name=None, delete_missing=False
+    ):
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        live_ref = f"[{current_schema}].[{table_name}]"
+        staging_ref = f"[{current_schema}].[{staging_table}]"
+        keys = ", ".join(f"[{col}]" for col in key_columns)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(
+                f"SELECT TOP 1 1 FROM {staging_ref} WHERE "
+                + " OR ".join(f"[{col}] IS NULL" for col in key_columns)
+            )
+            if cursor.fetchone():
+                logging.error(f"A staging '{current_schema}.{staging_table}' tem linhas com chave ({keys}) nula.")
+                return None
+            cursor.execute(f"SELECT TOP 1 {keys}, COUNT(*) FROM {staging_ref} GROUP BY {keys} HAVING COUNT(*) > 1")
+            duplicate = cursor.fetchone()
+            if duplicate:
+                logging.error(
+                    f"A chave ({keys}) se repete na staging '{current_schema}.{staging_table}': {tuple(duplicate[:-1])} aparece {duplicate[-1]} vezes."
+                )
+                return None
+            cursor.execute(build_merge_sql(live_ref, staging_ref, columns, key_columns, delete_missing))
+            counts = merge_counts(*cursor.fetchone())
+            cursor.execute(f"DROP TABLE {staging_ref}")
+            self.conn.commit()
+        except pyodbc.Error as e:
+            logging.error(
+                f"Erro ao aplicar a staging '{current_schema}.{staging_table}' em '{current_schema}.{table_name}' com MERGE: {e}"
+            )
+            self.conn.rollback()
+            return None
+        log_merge_counts(f"'{current_schema}.{table_name}'", counts)
+        return counts
+
+    def drop_table(self, table_name, schema_name=None):
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        try:
+            self.conn.cursor().execute(f"DROP TABLE IF EXISTS [{current_schema}].[{table_name}]")
+            self.conn.commit()
+        except pyodbc.Error as e:
+            logging.warning(f"Não foi possível remover a tabela '{current_schema}.{table_name}': {e}")
+            self.conn.rollback()
+
+    def count_rows(self, table_name, schema_name=None):
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        try:
+            cursor = self.conn.cursor()
+            # Contagem pelos metadados das partições: não varre a tabela.
+            cursor.execute(
+                "SELECT SUM(p.rows) FROM sys.partitions p "
+                "WHERE p.object_id = OBJECT_ID(?) AND p.index_id IN (0, 1)",
+                f"[{current_schema}].[{table_name}]",
+            )
+            row = cursor.fetchone()
+        except pyodbc.Error as e:
+            logging.warning(f"Não foi possível contar as linhas de '{current_schema}.{table_name}': {e}")
+            return None
+        return int(row[0] or 0) if row else 0
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.discard(self.conn)
+            self.pool.log_stats()
+            self.pool.close()
+        else:
+            self.conn.close()
+        logging.info("Conexão com SQL Server fechada.")
+
+
+class SQLiteSink(CsvSink):
+    """
+    Destino SQLite para benchmarks e testes locais. O esquema vira prefixo do nome da
+    tabela (`esquema__tabela`) e todas as colunas são TEXT.
+    """
+
+    kind = "sqlite"
+    supports_swap = True
+    supports_merge = True
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self.conn = sqlite3.connect(database_path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.insert_sql = None
+        self.rows_loaded = 0
+
+    @staticmethod
+    def _table_ref(table_name, schema_name):
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        return f'"{current_schema}__{table_name}"'
+
+    def create_table(
+        self, table_name, columns, schema_name=None, truncate_existing=False, column_types=None
+    ):
+        sanitized_table_name = "".join(c if c.isalnum() else "_" for c in table_name)
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        table_ref = self._table_ref(sanitized_table_name, current_schema)
+        existed = (
+            self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (table_ref.strip('"'),),
+            ).fetchone()
+            is not None
+        )
+        if existed:
+            if truncate_existing:
+                self.truncate(sanitized_table_name, current_schema)
+            return sanitized_table_name, current_schema, True
+        column_definitions = ", ".join(
+            f'"{"".join(c if c.isalnum() else "_" for c in col)}" TEXT' for col in columns
+        )
+        self.conn.execute(f"CREATE TABLE {table_ref} ({column_definitions})")
+        self.conn.commit()
+        logging.info(f"Tabela SQLite {table_ref} criada em '{self.database_path}'.")
+        return sanitized_table_name, current_schema, False
+
+    def truncate(self, table_name, schema_name=None):
+        self.conn.execute(f"DELETE FROM {self._table_ref(table_name, schema_name)}")
+        self.conn.commit()
+
+    def begin_load(
+        self, table_name, schema_name, columns, chunk_size=10000, max_lengths=None
+    ):
+        cols = ", ".join(f'"{col}"' for col in columns)
+        placeholders = ", ".join(["?"] * len(columns))
+        self.insert_sql = f"INSERT INTO {self._table_ref(table_name, schema_name)} ({cols}) VALUES ({placeholders})"
+        self.rows_loaded = 0
+
+    def write_batch(self, batch, last_line=None):
+        self.conn.executemany(self.insert_sql, batch)
+        self.rows_loaded += len(batch)
+
+    def commit(self):
+        self.conn.commit()
+
+    def end_load(self):
+        self.conn.commit()
+        return self.rows_loaded
+
+    def abort_load(self):
+        self.conn.rollback()
+
+    def count_rows(self, table_name, schema_name=None):
+        table_ref = self._table_ref(table_name, schema_name)
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table_ref.strip('"'),),
+        ).fetchone()
+        if not exists:
+            return 0
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table_ref}").fetchone()[0]
+
+    def create_staging_table(self, table_name, columns, schema_name=None, column_types=None):
+        staging_table = staging_table_name(table_name)
+        self.drop_table(staging_table, schema_name)
+        created_table, _, _ = self.create_table(staging_table, columns, schema_name)
+        return created_table
+
+    def swap_staging_table(self, staging_table, table_name, schema_name=None):
+        live_ref = self._table_ref(table_name, schema_name)
+        staging_ref = self._table_ref(staging_table, schema_name)
+        try:
+            # DDL no SQLite é transacional, mas o módulo sqlite3 não abre a transação sozinho.
+            self.conn.execute("BEGIN")
+            self.conn.execute(f"DROP TABLE IF EXISTS {live_ref}")
+            self.conn.execute(f"ALTER TABLE {staging_ref} RENAME TO {live_ref}")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Erro ao trocar a tabela de staging {staging_ref} por {live_ref}: {e}")
+            return False
+        logging.info(f"Tabela de staging {staging_ref} renomeada para {live_ref}.")
+        return True
+
+    def merge_staging_table(
+        self, staging_table, table_name, columns, key_columns, schema_name=None, delete_missing=False
+    ):
+        live_ref = self._table_ref(table_name, schema_name)
+        staging_ref = self._table_ref(staging_table, schema_name)
+        keys = ", ".join(f'"{col}"' for col in key_columns)
+        value_columns = [col for col in columns if col not in key_columns]
+        all_columns = ", ".join(f'"{col}"' for col in columns)
+        match = " AND ".join(f't."{col}" = s."{col}"' for col in key_columns)
+        try:
+            if self.conn.execute(
+                f"SELECT 1 FROM {staging_ref} WHERE " + " OR ".join(f'"{col}" IS NULL' for col in key_columns) + " LIMIT 1"
+            ).fetchone():
+                logging.error(f"A staging {staging_ref} tem linhas com chave ({keys}) nula.")
+                return None
+            duplicate = self.conn.execute(
+                f"SELECT {keys}, COUNT(*) FROM {staging_ref} GROUP BY {keys} HAVING COUNT(*) > 1 LIMIT 1"
+            ).fetchone()
+            if duplicate:
+                logging.error(
+                    f"A chave ({keys}) se repete na staging {staging_ref}: {tuple(duplicate[:-1])} aparece {duplicate[-1]} vezes."
+                )
+                return None
+            self.conn.execute("BEGIN")
+            self.conn.execute(f"CREATE INDEX {self._table_ref(staging_table + '__key', schema_name)} ON {staging_ref} ({keys})")
+            staged = self.conn.execute(f"SELECT COUNT(*) FROM {staging_ref}").fetchone()[0]
+            updated = 0
+            if value_columns:
+                # Sem função de hash no SQLite: a comparação coluna a coluna com IS NOT trata NULL como valor.
+                updated = self.conn.execute(
+                    f"UPDATE {live_ref} AS t SET "
+                    + ", ".join(f'"{col}" = s."{col}"' for col in value_columns)
+                    + f" FROM {staging_ref} AS s WHERE {match} AND ("
+                    + " OR ".join(f't."{col}" IS NOT s."{col}"' for col in value_columns)
+                    + ")"
+                ).rowcount
+            inserted = self.conn.execute(
+                f"INSERT INTO {live_ref} ({all_columns}) SELECT "
+                + ", ".join(f's."{col}"' for col in columns)
+                + f" FROM {staging_ref} AS s WHERE NOT EXISTS (SELECT 1 FROM {live_ref} AS t WHERE {match})"
+            ).rowcount
+            deleted = 0
+            if delete_missing:
+                deleted = self.conn.execute(
+                    f"DELETE FROM {live_ref} AS t WHERE NOT EXISTS (SELECT 1 FROM {staging_ref} AS s WHERE {match})"
+                ).rowcount
+            self.conn.execute(f"DROP TABLE {staging_ref}")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            logging.error(f"Erro ao aplicar a staging {staging_ref} em {live_ref}: {e}")
+            return None
+        counts = merge_counts(staged, inserted, updated, deleted)
+        log_merge_counts(live_ref, counts)
+        return counts
+
+    def drop_table(self, table_name, schema_name=None):
+        self.conn.execute(f"DROP TABLE IF EXISTS {self._table_ref(table_name, schema_name)}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class FileSink(CsvSink):
+    """
+    Destino em arquivos: cada tabela vira `<esquema>.<tabela>.csv` em `output_dir`, com os
+    valores já normalizados (NULL = campo vazio). Útil para inspecionar a saída do parser.
+    """
+
+    kind = "file"
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._file = None
+        self.rows_loaded = 0
+
+    def _path(self, table_name, schema_name):
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        return os.path.join(self.output_dir, f"{current_schema}.{table_name}.csv")
+
+    def create_table(
+        self, table_name, columns, schema_name=None, truncate_existing=False, column_types=None
+    ):
+        sanitized_table_name = "".join(c if c.isalnum() else "_" for c in table_name)
+        current_schema = schema_name if schema_name else DB_SCHEMA
+        path = self._path(sanitized_table_name, current_schema)
+        existed = os.path.exists(path)
+        if existed and not truncate_existing:
+            return sanitized_table_name, current_schema, True
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerow(
+                ["".join(c if c.isalnum() else "_" for c in col) for col in columns]
+            )
+        return sanitized_table_name, current_schema, existed
+
+    def truncate(self, table_name, schema_name=None):
+        path = self._path(table_name, schema_name)
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            header = f.readline()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(header)
+
+    def begin_load(
+        self, table_name, schema_name, columns, chunk_size=10000, max_lengths=None
+    ):
+        self._file = open(
+            self._path(table_name, schema_name), "a", encoding="utf-8", newline=""
+        )
+        self.rows_loaded = 0
+
+    def write_batch(self, batch, last_line=None):
+        # Um único write por lote, para que processos paralelos não intercalem linhas.
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        self._file.write(buffer.getvalue())
+        self.rows_loaded += len(batch)
+
+    def commit(self):
+        self._file.flush()
+
+    def end_load(self):
+        self._file.close()
+        self._file = None
+        return self.rows_loaded
+
+    def abort_load(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class NullSink(CsvSink):
+    """Descarta os lotes e apenas conta as linhas: mede a vazão do parser sem banco."""
+
+    kind = "null"
+
+    def __init__(self):
+        self.rows_loaded = 0
+
+    def create_table(
+        self, table_name, columns, schema_name=None, truncate_existing=False, column_types=None
+    ):
+        sanitized_table_name = "".join(c if c.isalnum() else "_" for c in table_name)
+        return sanitized_table_name, schema_name if schema_name else DB_SCHEMA, False
+
+    def truncate(self, table_name, schema_name=None):
+        pass
+
+    def begin_load(
+        self, table_name, schema_name, columns, chunk_size=10000, max_lengths=None
+    ):
+        self.rows_loaded = 0
+
+    def write_batch(self, batch, last_line=None):
+        self.rows_loaded += len(batch)
+
+    def end_load(self):
+        return self.rows_loaded
@@ -0,0 +1,259 @@
+import logging
+import threading
+import time
+
+import pyodbc
+
+# Driver ODBC usado por todas as conexões (csv_ship e dump/csv_dump).
+ODBC_DRIVER = "ODBC Driver 17 for SQL Server"
+
+# SQLSTATEs de conexão perdida/inexistente: a conexão não pode mais ser usada.
+CONNECTION_LOST_SQLSTATES = ("08S01", "08S02", "08003", "08007", "01002")
+
+# Conexões ociosas há mais tempo que isto são testadas (SELECT 1) antes de serem entregues.
+VALIDATE_AFTER_SECONDS = 30
+RECONNECT_ATTEMPTS = 3
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+def connect(server, database, user=None, password=None, trusted_connection=False):
+    """
+    Abre uma conexão com o SQL Server (usuário/senha ou Autenticação do Windows).
+    Os parâmetros já devem vir resolvidos (veja get_sql_server_connection de cada script).
+    Retorna None se a conexão falhar.
+    """
+    try:
+        if trusted_connection or (not user and not password):
+            conn_str = f"DRIVER={{{ODBC_DRIVER}}};SERVER={server};DATABASE={database};Trusted_Connection=yes;"
+            logging.info(
+                f"Tentando conectar ao SQL Server: {server}, Banco de Dados: {database} usando Autenticação do Windows."
+            )
+        elif user and password:
+            conn_str = f"DRIVER={{{ODBC_DRIVER}}};SERVER={server};DATABASE={database};UID={user};PWD={password}"
+            logging.info(
+                f"Tentando conectar ao SQL Server: {server}, Banco de Dados: {database} com usuário: {user}."
+            )
+        else:
+            conn_str = f"DRIVER={{{ODBC_DRIVER}}};SERVER={server};DATABASE={database};Trusted_Connection=yes;"
+            logging.info(
+                f"Tentando conectar ao SQL Server: {server}, Banco de Dados: {database} usando Autenticação do Windows (fallback)."
+            )
+
+        conn = pyodbc.connect(conn_str)
+        logging.info("Conexão com SQL Server estabelecida com sucesso.")
+        return conn
+    except pyodbc.Error as ex:
+        sqlstate = ex.args[0]
+        logging.error(f"Erro ao conectar ao SQL Server: {sqlstate} - {ex}")
+        if "08001" in sqlstate:
+            logging.error(
+                "Verifique se o nome do servidor SQL está correto e se o servidor está acessível."
+            )
+        elif "28000" in sqlstate:
+            logging.error(
+                "Falha na autenticação. Verifique suas credenciais (usuário/senha) ou configuração de Trusted_Connection."
+            )
+        elif "42000" in sqlstate:
+            logging.error(
+                f"Não foi possível abrir o banco de dados '{database}'. O login falhou ou verifique se o banco de dados existe e você tem permissão."
+            )
+        return None
+
+
+def is_connection_lost(error):
+    """Indica se o erro pyodbc significa que a conexão caiu (e não um erro do comando)."""
+    return (
+        isinstance(error, pyodbc.Error)
+        and bool(error.args)
+        and str(error.args[0]) in CONNECTION_LOST_SQLSTATES
+    )
+
+
+def is_alive(conn):
+    """Testa a conexão com um `SELECT 1`."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        cursor.close()
+        return True
+    except pyodbc.Error:
+        return False
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except pyodbc.Error:
+        pass
+
+
+class ConnectionPool:
+    """
+    Pool de até `size` conexões abertas por `connect_fn` (função sem argumentos que
+    retorna uma conexão ou None). `acquire` entrega uma conexão validada: conexões ociosas
+    há mais de `validate_after` segundos são testadas e, se caíram, substituídas.
+    `reconnect` troca uma conexão em uso que caiu no meio da carga, com até
+    `reconnect_attempts` tentativas espaçadas (backoff exponencial). O pool é seguro entre
+    threads; cada processo deve ter o seu, pois conexões pyodbc não atravessam processos.
+    O tempo para obter cada conexão é acumulado em `stats()`.
+    """
+
+    def __init__(
+        self,
+        connect_fn,
+        size=1,
+        validate_after=VALIDATE_AFTER_SECONDS,
+        reconnect_attempts=RECONNECT_ATTEMPTS,
+        reconnect_delay=RECONNECT_DELAY_SECONDS,
+    ):
+        self.connect_fn = connect_fn
+        self.size = size
+        self.validate_after = validate_after
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self._idle = []  # (conexão, instante em que foi devolvida)
+        self._in_use = 0
+        self._available = threading.Condition()
+        self._stats = {
+            "acquires": 0,
+            "connects": 0,
+            "connect_failures": 0,
+            "health_check_failures": 0,
+            "reconnects": 0,
+            "acquire_seconds": 0.0,
+            "max_acquire_seconds": 0.0,
+        }
+
+    def _record(self, key, amount=1):
+        with self._available:
+            self._stats[key] += amount
+
+    def _record_acquire(self, started):
+        elapsed = time.perf_counter() - started
+        with self._available:
+            self._stats["acquires"] += 1
+            self._stats["acquire_seconds"] += elapsed
+            self._stats["max_acquire_seconds"] = max(self._stats["max_acquire_seconds"], elapsed)
+
+    def _open(self):
+        """Abre uma conexão nova, tentando de novo com espera crescente se falhar."""
+        delay = self.reconnect_delay
+        for attempt in range(1, self.reconnect_attempts + 1):
+            conn = self.connect_fn()
+            if conn is not None:
+                self._record("connects")
+                return conn
+            self._record("connect_failures")
+            if attempt < self.reconnect_attempts:
+                logging.warning(
+                    f"Falha ao conectar (tentativa {attempt}/{self.reconnect_attempts}). Nova tentativa em {delay:.1f} s."
+                )
+                time.sleep(delay)
+                delay *= 2
+        return None
+
+    def acquire(self, timeout=None):
+        """
+        Retorna uma conexão validada, esperando até `timeout` segundos (None = sem limite)
+        se todas estiverem em uso. Retorna None se não for possível conectar ou se o tempo
+        acabar.
+        """
+        started = time.perf_counter()
+        with self._available:
+            if not self._available.wait_for(
+                lambda: self._idle or self._in_use < self.size, timeout
+            ):
+                logging.error(f"Nenhuma conexão livre no pool após {timeout} s.")
+                return None
+            self._in_use += 1
+            conn, released_at = self._idle.pop() if self._idle else (None, None)
+
+        try:
+            if conn is not None and time.monotonic() - released_at >= self.validate_after:
+                if not is_alive(conn):
+                    logging.warning("Conexão ociosa do pool não responde. Abrindo uma nova.")
+                    self._record("health_check_failures")
+                    _close_quietly(conn)
+                    conn = None
+            if conn is None:
+                conn = self._open()
+        except BaseException:
+            self._discard_slot()
+            raise
+        if conn is None:
+            self._discard_slot()
+            return None
+        self._record_acquire(started)
+        return conn
+
+    def _discard_slot(self):
+        with self._available:
+            self._in_use -= 1
+            self._available.notify()
+
+    def release(self, conn):
+        """Devolve ao pool uma conexão obtida com `acquire`."""
+        with self._available:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    def discard(self, conn):
+        """Fecha uma conexão obtida com `acquire` em vez de devolvê-la ao pool."""
+        _close_quietly(conn)
+        self._discard_slot()
+
+    def validate(self, conn):
+        """
+        Testa uma conexão em uso (ex.: antes de cada arquivo) e, se caiu, a substitui.
+        Retorna a conexão (a mesma ou uma nova) ou None se não for possível reconectar.
+        """
+        started = time.perf_counter()
+        if is_alive(conn):
+            self._record_acquire(started)
+            return conn
+        logging.warning("Conexão com o SQL Server não responde. Reconectando...")
+        self._record("health_check_failures")
+        return self.reconnect(conn, started=started)
+
+    def reconnect(self, conn, started=None):
+        """
+        Substitui uma conexão em uso que caiu, mantendo a vaga no pool. Retorna a nova
+        conexão ou None (a vaga continua ocupada até `discard`).
+        """
+        started = started if started is not None else time.perf_counter()
+        _close_quietly(conn)
+        new_conn = self._open()
+        if new_conn is None:
+            logging.error("Não foi possível reconectar ao SQL Server.")
+            return None
+        self._record("reconnects")
+        self._record_acquire(started)
+        logging.info("Reconexão com o SQL Server estabelecida.")
+        return new_conn
+
+    def stats(self):
+        """Contadores do pool, incluindo o tempo médio e máximo para obter uma conexão."""
+        with self._available:
+            stats = dict(self._stats)
+        stats["avg_acquire_seconds"] = (
+            stats["acquire_seconds"] / stats["acquires"] if stats["acquires"] else 0.0
+        )
+        return stats
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(
+            f"Pool de conexões: {stats['acquires']} conexão(ões) entregue(s) em média em {stats['avg_acquire_seconds'] * 1000:.1f} ms "
+            + f"(máximo {stats['max_acquire_seconds'] * 1000:.1f} ms), {stats['connects']} aberta(s), "
+            + f"{stats['reconnects']} reconexão(ões), {stats['health_check_failures']} falha(s) de verificação, "
+            + f"{stats['connect_failures']} falha(s) ao conectar."
+        )
+
+    def close(self):
+        """Fecha as conexões ociosas do pool."""
+        with self._available:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close_quietly(conn)
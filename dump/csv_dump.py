@@ -5,6 +5,11 @@ import logging
 from logging.handlers import RotatingFileHandler
 import datetime
 import argparse
+import functools
+
+# db_pool.py fica na raiz do repositório: execute a partir dela, como módulo
+# (python -m dump.run_dump ou python -m dump.csv_dump).
+import db_pool
 
 # --- Configuração do Logging ---
 LOG_DIR = "logs"
@@ -37,45 +42,13 @@ CSV_DIRECTORY = "csv"
 def get_sql_server_connection(
     server=None, database=None, user=None, password=None, trusted_connection=False
 ):
-    db_server_to_use = server if server else DB_SERVER
-    db_name_to_use = database if database else DB_NAME
-    db_user_to_use = user if user else DB_USER
-    db_password_to_use = password if password else DB_PASSWORD
-
-    try:
-        if trusted_connection or (
-            not db_user_to_use and not db_password_to_use and not user and not password
-        ):
-            conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={db_server_to_use};DATABASE={db_name_to_use};Trusted_Connection=yes;"
-            logging.info(
-                f"Tentando conectar ao SQL Server: {db_server_to_use}, DB: {db_name_to_use} (Windows Auth)."
-            )
-        elif db_user_to_use and db_password_to_use:
-            conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={db_server_to_use};DATABASE={db_name_to_use};UID={db_user_to_use};PWD={db_password_to_use}"
-            logging.info(
-                f"Tentando conectar ao SQL Server: {db_server_to_use}, DB: {db_name_to_use} com usuário: {db_user_to_use}."
-            )
-        else:
-            conn_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={db_server_to_use};DATABASE={db_name_to_use};Trusted_Connection=yes;"
-            logging.info(
-                f"Tentando conectar ao SQL Server: {db_server_to_use}, DB: {db_name_to_use} (Windows Auth fallback)."
-            )
-
-        conn = pyodbc.connect(conn_str)
-        logging.info("Conexão com SQL Server estabelecida com sucesso.")
-        return conn
-    except pyodbc.Error as ex:
-        sqlstate = ex.args[0]
-        logging.error(f"Erro ao conectar ao SQL Server: {sqlstate} - {ex}")
-        if "08001" in sqlstate:
-            logging.error("Verifique nome/acesso ao servidor SQL.")
-        elif "28000" in sqlstate:
-            logging.error("Falha na autenticação.")
-        elif "42000" in sqlstate:
-            logging.error(
-                f"Não foi possível abrir DB '{db_name_to_use}'. Login falhou ou DB não existe/sem permissão."
-            )
-        return None
+    return db_pool.connect(
+        server if server else DB_SERVER,
+        database if database else DB_NAME,
+        user=user if user else DB_USER,
+        password=password if password else DB_PASSWORD,
+        trusted_connection=trusted_connection,
+    )
 
 
 def delete_sql_table(conn, table_name, schema_name):
@@ -128,13 +101,17 @@ def process_table_deletions(
         )
         return
 
-    conn = get_sql_server_connection(
-        server=db_server_override,
-        database=db_name_override,
-        user=db_user_override,
-        password=db_password_override,
-        trusted_connection=use_trusted_connection,
+    pool = db_pool.ConnectionPool(
+        functools.partial(
+            get_sql_server_connection,
+            server=db_server_override,
+            database=db_name_override,
+            user=db_user_override,
+            password=db_password_override,
+            trusted_connection=use_trusted_connection,
+        )
     )
+    conn = pool.acquire()
     if not conn:
         logging.error(
             "Não foi possível conectar ao banco de dados. Abortando deleções."
@@ -175,13 +152,24 @@ def process_table_deletions(
     deleted_count = 0
     failed_count = 0
     for table_name in tables_to_delete:
-        if delete_sql_table(conn, table_name, current_db_schema):  # Passa o esquema
+        deleted = delete_sql_table(conn, table_name, current_db_schema)  # Passa o esquema
+        if not deleted and not db_pool.is_alive(conn):
+            # DROP TABLE IF EXISTS é idempotente: com a conexão refeita, basta repetir.
+            logging.warning("Conexão com SQL Server perdida. Reconectando...")
+            new_conn = pool.reconnect(conn)
+            if new_conn is None:
+                failed_count += len(tables_to_delete) - deleted_count - failed_count
+                break
+            conn = new_conn
+            deleted = delete_sql_table(conn, table_name, current_db_schema)
+        if deleted:
             deleted_count += 1
         else:
             failed_count += 1
 
     if conn:
-        conn.close()
+        pool.discard(conn)
+        pool.log_stats()
         logging.info("Conexão com SQL Server fechada.")
 
     logging.info(
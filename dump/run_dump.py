@@ -1,4 +1,4 @@
-import csv_dump
+from dump import csv_dump
 import logging
 import os
 from dotenv import load_dotenv
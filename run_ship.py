@@ -19,6 +19,13 @@ def main():
     use_trusted = not (user and password)
     csv_directory = os.getenv("CSV_FILES_DIR_SHIP") or None
     db_schema = os.getenv("DB_SCHEMA") or None
+    workers = int(os.getenv("SHIP_WORKERS") or 1)
+    # Arquivos inalterados desde a última carga são pulados (SHIP_SKIP_UNCHANGED=0 desativa).
+    skip_unchanged = (os.getenv("SHIP_SKIP_UNCHANGED") or "1") != "0"
+    # Modo contínuo (SHIP_WATCH=1): observa o diretório em vez de rodar uma vez pelo cron.
+    watch = (os.getenv("SHIP_WATCH") or "0") != "0"
+    done_dir = os.getenv("SHIP_DONE_DIR") or None
+    failed_dir = os.getenv("SHIP_FAILED_DIR") or None
 
     print(
         f"Conectando ao servidor: {server}, banco de dados: {database}, Trusted Connection: {use_trusted}"
@@ -30,6 +37,13 @@ def main():
             f"Usando esquema padrão (geralmente 'dbo', conforme definido em core/importer.py)"
         )
 
+    if workers > 1:
+        print(f"Carga paralela com {workers} workers")
+    if skip_unchanged:
+        print("Arquivos inalterados desde a última carga serão pulados")
+    if watch:
+        print("Modo contínuo: o diretório será observado até Ctrl+C ou SIGTERM")
+
     if csv_directory:
         print(f"Buscando CSVs em: {csv_directory}")
     else:
@@ -47,6 +61,11 @@ def main():
             use_trusted_connection=use_trusted,
             truncate_existing_tables=True,
             db_schema_override=db_schema,
+            workers=workers,
+            skip_unchanged=skip_unchanged,
+            watch=watch,
+            done_dir=done_dir,
+            failed_dir=failed_dir,
         )
         print(
             "Processo de importação de CSVs (scripts/run_importer.py) concluído com sucesso."
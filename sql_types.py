@@ -0,0 +1,153 @@
+import datetime
+import re
+
+# Folga aplicada sobre a amostra: comprimentos são multiplicados, inteiros ganham um dígito.
+TYPE_INFERENCE_LENGTH_MARGIN = 2.0
+TYPE_INFERENCE_DIGIT_MARGIN = 1
+NVARCHAR_MAX_LENGTH = 4000
+
+_INT_RE = re.compile(r"-?(?:0|[1-9]\d*)")
+DECIMAL_RE = re.compile(r"-?(?:0|[1-9]\d*)(?:\.(\d+))?")
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_DATETIME_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2}(?::\d{2}(?:\.\d{1,7})?)?)?")
+_SQL_TYPE_RE = re.compile(r"(\w+)(?:\((\w+)(?:,\s*(\d+))?\))?")
+
+INT_MAX = 2**31 - 1
+BIGINT_MAX = 2**63 - 1
+
+
+def _is_valid_date(value):
+    try:
+        datetime.date.fromisoformat(value[:10])
+        return True
+    except ValueError:
+        return False
+
+
+def is_valid_datetime(value):
+    if not _DATETIME_RE.fullmatch(value) or not _is_valid_date(value):
+        return False
+    if len(value) > 10:
+        hour, minute = int(value[11:13]), int(value[14:16])
+        second = int(value[17:19]) if len(value) >= 19 else 0
+        return hour < 24 and minute < 60 and second < 60
+    return True
+
+
+def _decimal_digits(value):
+    """Retorna (dígitos inteiros, dígitos decimais) de um número já validado."""
+    integer_part, _, fraction = value.lstrip("-").partition(".")
+    return len(integer_part), len(fraction)
+
+
+def infer_sql_type(values):
+    """
+    Escolhe o tipo SQL Server mais estreito que acomoda todos os valores (texto) da amostra,
+    com folga: BIT (só 0/1), INT, BIGINT, DECIMAL(p,s), DATE, DATETIME2 ou NVARCHAR(n).
+    Valores vazios são ignorados; sem valores, o resultado é NVARCHAR(MAX).
+    """
+    values = [value.strip() for value in values if value and value.strip()]
+    if not values:
+        return "NVARCHAR(MAX)"
+
+    if all(value in ("0", "1") for value in values):
+        return "BIT"
+    if all(_INT_RE.fullmatch(value) for value in values):
+        digits = max(len(value.lstrip("-")) for value in values) + TYPE_INFERENCE_DIGIT_MARGIN
+        if digits < len(str(INT_MAX)):
+            return "INT"
+        if digits < len(str(BIGINT_MAX)):
+            return "BIGINT"
+    if all(DECIMAL_RE.fullmatch(value) for value in values):
+        digits = [_decimal_digits(value) for value in values]
+        scale = max(fraction for _, fraction in digits)
+        precision = max(integer for integer, _ in digits) + TYPE_INFERENCE_DIGIT_MARGIN + scale
+        if precision <= 38:
+            return f"DECIMAL({precision},{scale})"
+    if all(_DATE_RE.fullmatch(value) and _is_valid_date(value) for value in values):
+        return "DATE"
+    if all(is_valid_datetime(value) for value in values):
+        return "DATETIME2"
+
+    length = int(max(len(value) for value in values) * TYPE_INFERENCE_LENGTH_MARGIN)
+    if length > NVARCHAR_MAX_LENGTH:
+        return "NVARCHAR(MAX)"
+    return f"NVARCHAR({max(length, 1)})"
+
+
+def parse_sql_type(sql_type):
+    """Separa 'DECIMAL(10,2)' em ('DECIMAL', '10', '2'); partes ausentes vêm como None."""
+    match = _SQL_TYPE_RE.fullmatch(sql_type.replace(" ", "").upper())
+    if not match:
+        return sql_type.upper(), None, None
+    return match.group(1), match.group(2), match.group(3)
+
+
+def _numeric_shape(sql_type):
+    """(dígitos inteiros, escala) de um tipo numérico, ou None se não for numérico."""
+    base, arg1, arg2 = parse_sql_type(sql_type)
+    if base == "BIT":
+        return 1, 0
+    if base == "INT":
+        return len(str(INT_MAX)) - 1, 0
+    if base == "BIGINT":
+        return len(str(BIGINT_MAX)) - 1, 0
+    if base == "DECIMAL":
+        precision, scale = int(arg1), int(arg2 or 0)
+        return precision - scale, scale
+    return None
+
+
+def merge_sql_types(current, other):
+    """Menor tipo que acomoda dois tipos inferidos; recai para NVARCHAR(MAX)."""
+    if current == other:
+        return current
+    current_base, other_base = parse_sql_type(current)[0], parse_sql_type(other)[0]
+    current_shape, other_shape = _numeric_shape(current), _numeric_shape(other)
+    if current_shape and other_shape:
+        if {current_base, other_base} <= {"BIT", "INT", "BIGINT"}:
+            order = ("BIT", "INT", "BIGINT")
+            return max(current_base, other_base, key=order.index)
+        integer = max(current_shape[0], other_shape[0])
+        scale = max(current_shape[1], other_shape[1])
+        if integer + scale <= 38:
+            return f"DECIMAL({integer + scale},{scale})"
+    elif {current_base, other_base} == {"DATE", "DATETIME2"}:
+        return "DATETIME2"
+    elif current_base == other_base == "NVARCHAR":
+        lengths = [parse_sql_type(t)[1] for t in (current, other)]
+        if "MAX" not in lengths:
+            return f"NVARCHAR({max(int(length) for length in lengths)})"
+    return "NVARCHAR(MAX)"
+
+
+def build_type_validator(sql_type):
+    """
+    Retorna uma função que indica se um valor (texto não nulo) cabe no tipo, ou None
+    quando qualquer texto cabe (NVARCHAR(MAX) e tipos desconhecidos).
+    """
+    base, arg1, arg2 = parse_sql_type(sql_type)
+    if base == "BIT":
+        return lambda value: value in ("0", "1")
+    if base in ("INT", "BIGINT"):
+        limit = INT_MAX if base == "INT" else BIGINT_MAX
+        return lambda value: bool(_INT_RE.fullmatch(value)) and abs(int(value)) <= limit
+    if base == "DECIMAL":
+        max_integer = int(arg1) - int(arg2 or 0)
+        max_scale = int(arg2 or 0)
+
+        def validate_decimal(value):
+            if not DECIMAL_RE.fullmatch(value):
+                return False
+            integer, fraction = _decimal_digits(value)
+            return integer <= max_integer and fraction <= max_scale
+
+        return validate_decimal
+    if base == "DATE":
+        return lambda value: bool(_DATE_RE.fullmatch(value)) and _is_valid_date(value)
+    if base == "DATETIME2":
+        return is_valid_datetime
+    if base == "NVARCHAR" and arg1 and arg1 != "MAX":
+        length = int(arg1)
+        return lambda value: len(value) <= length
+    return None
@@ -0,0 +1,139 @@
+import json
+import os
+
+import csv_ship
+
+
+def write_csv(path, text, mode="w"):
+    with open(path, mode, encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def journal_entries(journal):
+    with open(journal.path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def new_journal(file_path, checkpoint_dir, tail=False):
+    header_hash = None
+    if tail:
+        probe = csv_ship.probe_csv_file(file_path)
+        header_hash = csv_ship.header_fingerprint(file_path, probe.data_start)
+    return csv_ship.CheckpointJournal(
+        file_path, "feed", "dbo", checkpoint_dir=str(checkpoint_dir), header_hash=header_hash
+    )
+
+
+def test_resume_point_returns_the_last_committed_batch(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n3,c\n")
+    journal = new_journal(file_path, tmp_path / "ck")
+
+    assert journal.resume_point() is None
+    journal.start()
+    assert journal.resume_point() == {"complete": False}
+    journal.record({"offset": 9, "line": 2, "rows": 1})
+    journal.record({"offset": 13, "line": 3, "rows": 2})
+    assert journal.resume_point() == {"complete": False, "offset": 13, "line": 3, "rows": 2}
+    journal.complete({"rows": 3})
+    assert journal.resume_point()["complete"] is True
+
+
+def test_resume_point_ignores_a_journal_of_a_changed_file(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n")
+    journal = new_journal(file_path, tmp_path / "ck")
+    journal.start()
+    journal.record({"offset": 9, "line": 2, "rows": 1})
+
+    write_csv(file_path, "2,b\n", mode="a")
+
+    assert journal.resume_point() is None
+
+
+def test_resume_point_ignores_a_truncated_last_line(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n")
+    journal = new_journal(file_path, tmp_path / "ck")
+    journal.start()
+    journal.record({"offset": 9, "line": 2, "rows": 1})
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"event": "commit", "offs')
+
+    assert journal.resume_point() == {"complete": False, "offset": 9, "line": 2, "rows": 1}
+
+
+def test_tail_point_continues_after_growth(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n")
+    journal = new_journal(file_path, tmp_path / "ck", tail=True)
+    journal.start()
+    journal.record({"offset": 13, "line": 3, "rows": 2})
+    journal.complete({"rows": 2})
+
+    assert journal.tail_point() == {"complete": True, "offset": 13, "line": 3, "rows": 2}
+    write_csv(file_path, "3,c\n", mode="a")
+    assert journal.tail_point() == {"complete": False, "offset": 13, "line": 3, "rows": 2}
+
+
+def test_complete_compacts_the_tail_journal(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n")
+    journal = new_journal(file_path, tmp_path / "ck", tail=True)
+    journal.start()
+    journal.record({"offset": 9, "line": 2, "rows": 1})
+    journal.record({"offset": 13, "line": 3, "rows": 2})
+    journal.complete({"rows": 2})
+
+    entries = journal_entries(journal)
+    assert [entry["event"] for entry in entries] == ["start", "complete"]
+    assert entries[1]["offset"] == 13
+    assert entries[1]["rows"] == 2
+    assert not os.path.exists(f"{journal.path}.tmp")
+
+
+def test_tail_point_detects_rotation_after_a_crash(tmp_path):
+    # A carga anterior caiu depois de confirmar lotes, sem gravar "complete"; o arquivo
+    # foi então rotacionado para um conteúdo diferente e maior.
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n" + "".join(f"{i},a{i}\n" for i in range(10)))
+    journal = new_journal(file_path, tmp_path / "ck", tail=True)
+    journal.start()
+    journal.record({"offset": 25, "line": 6, "rows": 5})
+    assert journal.tail_point()["offset"] == 25
+
+    write_csv(file_path, "id,v\n" + "".join(f"{i},rotated{i}\n" for i in range(20)))
+
+    assert journal.tail_point() is None
+
+
+def test_tail_point_detects_a_shrunk_file(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n")
+    journal = new_journal(file_path, tmp_path / "ck", tail=True)
+    journal.start()
+    journal.record({"offset": 13, "line": 3, "rows": 2})
+
+    write_csv(file_path, "id,v\n1,a\n")
+
+    assert journal.tail_point() is None
+
+
+def test_tail_point_rejects_a_changed_header(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n")
+    journal = new_journal(file_path, tmp_path / "ck", tail=True)
+    journal.start()
+    journal.complete({"rows": 1})
+
+    write_csv(file_path, '"id","v"\n1,a\n')
+
+    assert new_journal(file_path, tmp_path / "ck", tail=True).tail_point() is None
+
+
+def test_tail_point_ignores_a_full_load_journal(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n")
+    new_journal(file_path, tmp_path / "ck").start()
+
+    assert new_journal(file_path, tmp_path / "ck", tail=True).tail_point() is None
@@ -0,0 +1,21 @@
+import pytest
+
+import csv_sinks
+import csv_ship
+
+
+@pytest.mark.parametrize("engine", ["stream", "arrow", "pandas"])
+def test_a_file_without_header_is_skipped(tmp_path, engine):
+    if engine != "stream":
+        pytest.importorskip("pyarrow" if engine == "arrow" else "pandas")
+    path = tmp_path / "feed.csv"
+    path.write_text("", encoding="utf-8")
+    sink = csv_sinks.SQLiteSink(str(tmp_path / "t.db"))
+
+    result = csv_ship.process_csv_file(
+        sink, str(path), load_options={"checkpoint_dir": None, "reject_dir": None, "engine": engine}
+    )
+
+    assert result["status"] == "skipped"
+    assert issubclass(csv_ship.EmptyCsvError, ValueError)
+    sink.close()
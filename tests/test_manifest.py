@@ -0,0 +1,88 @@
+import os
+
+import csv_ship
+
+
+def write_csv(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def touch_later(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def loaded_manifest(tmp_path, file_path, table="dbo.feed"):
+    manifest = csv_ship.LoadManifest(str(tmp_path / "manifest.json"))
+    manifest.record(file_path, table, csv_ship.fingerprint_csv_file(file_path), 2, 0.5)
+    manifest.save()
+    return csv_ship.LoadManifest(str(tmp_path / "manifest.json"))
+
+
+def test_unchanged_file_and_table_match(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n")
+    manifest = loaded_manifest(tmp_path, file_path)
+
+    entry = manifest.unchanged_entry(file_path, "dbo.feed", csv_ship.fingerprint_csv_file(file_path))
+
+    assert entry is not None
+    assert entry["rows"] == 2
+
+
+def test_other_table_or_changed_content_does_not_match(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n")
+    manifest = loaded_manifest(tmp_path, file_path)
+
+    assert manifest.unchanged_entry(file_path, "dbo.other", csv_ship.fingerprint_csv_file(file_path)) is None
+    write_csv(file_path, "id,v\n1,a\n2,c\n")
+    assert manifest.unchanged_entry(file_path, "dbo.feed", csv_ship.fingerprint_csv_file(file_path)) is None
+    write_csv(file_path, "id,v\n1,a\n2,b\n3,c\n")
+    assert manifest.unchanged_entry(file_path, "dbo.feed", csv_ship.fingerprint_csv_file(file_path)) is None
+
+
+def test_unknown_file_does_not_match(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n")
+    manifest = csv_ship.LoadManifest(str(tmp_path / "missing.json"))
+
+    assert manifest.unchanged_entry(file_path, "dbo.feed", csv_ship.fingerprint_csv_file(file_path)) is None
+
+
+def test_reexport_with_same_content_matches_once_the_hash_is_known(tmp_path):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n")
+    manifest = loaded_manifest(tmp_path, file_path)
+    assert "content_hash" not in manifest.entries[os.path.abspath(file_path)]
+
+    # Primeira reexportação: sem hash no manifesto, o arquivo é recarregado e o hash,
+    # calculado antes da carga, vai para a impressão digital registrada.
+    touch_later(file_path, 10)
+    fingerprint = csv_ship.fingerprint_csv_file(file_path)
+    assert manifest.unchanged_entry(file_path, "dbo.feed", fingerprint) is None
+    assert "content_hash" in fingerprint
+    manifest.record(file_path, "dbo.feed", fingerprint, 2, 0.5)
+
+    touch_later(file_path, 20)
+    fingerprint = csv_ship.fingerprint_csv_file(file_path)
+    entry = manifest.unchanged_entry(file_path, "dbo.feed", fingerprint)
+    assert entry is not None
+    assert entry["mtime_ns"] == fingerprint["mtime_ns"]
+
+
+def test_content_hash_is_only_computed_when_the_mtime_changed(tmp_path, monkeypatch):
+    file_path = str(tmp_path / "feed.csv")
+    write_csv(file_path, "id,v\n1,a\n2,b\n")
+    manifest = loaded_manifest(tmp_path, file_path)
+    hashed = []
+    original = csv_ship.content_hash_csv_file
+    monkeypatch.setattr(csv_ship, "content_hash_csv_file", lambda path: hashed.append(path) or original(path))
+
+    manifest.unchanged_entry(file_path, "dbo.feed", csv_ship.fingerprint_csv_file(file_path))
+    assert hashed == []
+
+    touch_later(file_path, 10)
+    manifest.unchanged_entry(file_path, "dbo.feed", csv_ship.fingerprint_csv_file(file_path))
+    assert hashed == [file_path]
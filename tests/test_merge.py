@@ -0,0 +1,67 @@
+import csv_sinks
+
+
+def test_merge_sql_matches_on_keys_and_compares_value_hashes():
+    sql = csv_sinks.build_merge_sql(
+        "[dbo].[t]", "[dbo].[t__staging]", ["id", "regiao", "nome"], ["id", "regiao"]
+    )
+
+    assert "MERGE [dbo].[t] WITH (HOLDLOCK) AS t" in sql
+    assert "USING [dbo].[t__staging] AS s" in sql
+    assert "ON t.[id] = s.[id] AND t.[regiao] = s.[regiao]" in sql
+    assert "WHEN MATCHED AND HASHBYTES('SHA2_256', CONCAT(ISNULL(N'1' + CAST(t.[nome] AS NVARCHAR(MAX)), N'0'), N''))" in sql
+    assert "THEN UPDATE SET t.[nome] = s.[nome]" in sql
+    assert "INSERT ([id], [regiao], [nome]) VALUES (s.[id], s.[regiao], s.[nome])" in sql
+    assert "NOT MATCHED BY SOURCE" not in sql
+    assert sql.endswith("FROM @actions;")
+
+
+def test_merge_sql_deletes_missing_keys_only_when_asked():
+    sql = csv_sinks.build_merge_sql("[dbo].[t]", "[dbo].[t__staging]", ["id", "v"], ["id"], delete_missing=True)
+
+    assert "WHEN NOT MATCHED BY SOURCE THEN DELETE" in sql
+
+
+def test_merge_sql_without_value_columns_only_inserts():
+    sql = csv_sinks.build_merge_sql("[dbo].[t]", "[dbo].[t__staging]", ["id"], ["id"])
+
+    assert "WHEN MATCHED" not in sql
+    assert "WHEN NOT MATCHED BY TARGET THEN INSERT ([id]) VALUES (s.[id])" in sql
+
+
+def test_merge_counts_derives_unchanged_rows():
+    assert csv_sinks.merge_counts(10, 3, 2, None) == {"inserted": 3, "updated": 2, "deleted": 0, "unchanged": 5}
+
+
+def load_rows(sink, table_name, rows):
+    sink.begin_load(table_name, "dbo", ["id", "v"])
+    sink.write_batch(rows)
+    sink.end_load()
+
+
+def test_sqlite_merge_inserts_updates_and_deletes(tmp_path):
+    sink = csv_sinks.SQLiteSink(str(tmp_path / "m.db"))
+    sink.create_table("t", ["id", "v"], "dbo")
+    load_rows(sink, "t", [("1", "a"), ("2", "b"), ("3", None)])
+
+    staging = sink.create_staging_table("t", ["id", "v"], "dbo")
+    load_rows(sink, staging, [("1", "a"), ("2", "B"), ("4", "d")])
+    counts = sink.merge_staging_table(staging, "t", ["id", "v"], ["id"], "dbo", delete_missing=True)
+
+    assert counts == {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+    rows = sink.conn.execute('SELECT id, v FROM "dbo__t" ORDER BY id').fetchall()
+    assert rows == [("1", "a"), ("2", "B"), ("4", "d")]
+    sink.close()
+
+
+def test_sqlite_merge_refuses_duplicate_keys(tmp_path):
+    sink = csv_sinks.SQLiteSink(str(tmp_path / "m.db"))
+    sink.create_table("t", ["id", "v"], "dbo")
+    load_rows(sink, "t", [("1", "a")])
+
+    staging = sink.create_staging_table("t", ["id", "v"], "dbo")
+    load_rows(sink, staging, [("1", "x"), ("1", "y")])
+
+    assert sink.merge_staging_table(staging, "t", ["id", "v"], ["id"], "dbo") is None
+    assert sink.conn.execute('SELECT id, v FROM "dbo__t"').fetchall() == [("1", "a")]
+    sink.close()
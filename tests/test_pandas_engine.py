@@ -0,0 +1,59 @@
+import pytest
+
+import csv_sinks
+import csv_ship
+
+pytest.importorskip("pandas")
+
+
+def load(tmp_path, name, text, engine):
+    path = tmp_path / f"{name}.csv"
+    path.write_text(text, encoding="utf-8")
+    sink = csv_sinks.SQLiteSink(str(tmp_path / f"{name}_{engine}.db"))
+    result = csv_ship.process_csv_file(
+        sink,
+        str(path),
+        truncate_existing=True,
+        load_options={"checkpoint_dir": None, "reject_dir": None, "batch_rows": 3, "engine": engine},
+    )
+    rows = sink.conn.execute(f'SELECT * FROM "dbo__{name}"').fetchall()
+    sink.close()
+    return result, rows
+
+
+def records(count):
+    return "".join(f"{i}, v{i} ,NA\n" for i in range(count))
+
+
+def test_pandas_rows_match_the_stream_engine(tmp_path):
+    text = "id,a,b\n" + records(5) + '5,"q\nr",NULL\n6,,\n7,x\n8,y,z,extra\n'
+
+    result, rows = load(tmp_path, "feed", text, "pandas")
+    _, stream_rows = load(tmp_path, "feed", text, "stream")
+
+    assert result["status"] == "success"
+    assert rows == stream_rows
+    assert rows[0] == ("0", "v0", "NA")
+    assert rows[5:] == [("5", "q\nr", "NULL"), ("6", None, None), ("7", "x", None), ("8", "y", "z")]
+    # A linha com campos a menos não é distinguível de campos vazios: só a cortada conta.
+    assert result["metrics"]["rows_adjusted"] == 1
+
+
+def test_extra_fields_in_the_first_batch_fall_back_to_the_stream_engine(tmp_path, caplog):
+    text = "id,a,b\n1,x,y,z,w\n" + records(6)
+
+    result, rows = load(tmp_path, "feed", text, "pandas")
+
+    assert result["status"] == "success"
+    assert rows[0] == ("1", "x", "y")
+    assert len(rows) == 7
+    assert "com o motor 'stream'" in caplog.text
+
+
+def test_a_line_skipped_by_the_parser_after_the_first_batch_fails_the_file(tmp_path):
+    # Depois de uma linha com um campo a mais, o parser pula as que têm ainda mais campos.
+    text = "id,a,b\n" + records(6) + "6,x,y,z\n7,x,y,z,w\n"
+
+    result, _ = load(tmp_path, "feed", text, "pandas")
+
+    assert result["status"] == "failed"
@@ -0,0 +1,74 @@
+import csv
+import io
+
+import csv_ship
+
+
+def write_csv(path, text):
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def read_range(file_path, start, end, quotechar='"'):
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode("utf-8")
+    return list(csv.reader(io.StringIO(data, newline=""), quotechar=quotechar))
+
+
+def records_text(count, quotechar='"'):
+    # Um a cada três registros tem uma quebra de linha dentro de um campo entre aspas.
+    lines = []
+    for i in range(count):
+        note = f"{quotechar}linha\n{i}{quotechar}" if i % 3 == 0 else f"nota{i}"
+        lines.append(f"{i},{note},{'x' * (i % 17)}\n")
+    return "id,nota,extra\n" + "".join(lines)
+
+
+def test_partitions_cover_the_data_and_split_on_record_boundaries(tmp_path):
+    file_path = write_csv(tmp_path / "a.csv", records_text(2000))
+    probe = csv_ship.probe_csv_file(file_path)
+
+    ranges = csv_ship.compute_csv_partitions(
+        file_path, 4, probe.data_start, probe.quotechar, block_size=1024
+    )
+
+    assert len(ranges) == 4
+    assert ranges[0][0] == probe.data_start
+    assert ranges[-1][1] == (tmp_path / "a.csv").stat().st_size
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    rows = [row for start, end in ranges for row in read_range(file_path, start, end)]
+    assert [row[0] for row in rows] == [str(i) for i in range(2000)]
+    assert rows[3] == ["3", "linha\n3", "xxx"]
+
+
+def test_partitions_follow_the_probed_quotechar(tmp_path):
+    file_path = write_csv(tmp_path / "q.csv", records_text(900, quotechar="'"))
+    probe = csv_ship.probe_csv_file(file_path)
+    assert probe.quotechar == "'"
+
+    ranges = csv_ship.compute_csv_partitions(
+        file_path, 3, probe.data_start, probe.quotechar, block_size=512
+    )
+
+    rows = [row for start, end in ranges for row in read_range(file_path, start, end, "'")]
+    assert [row[0] for row in rows] == [str(i) for i in range(900)]
+
+
+def test_single_partition_or_empty_data_is_one_range(tmp_path):
+    file_path = write_csv(tmp_path / "a.csv", records_text(50))
+    size = (tmp_path / "a.csv").stat().st_size
+
+    assert csv_ship.compute_csv_partitions(file_path, 1, 14) == [(14, size)]
+    assert csv_ship.compute_csv_partitions(file_path, 4, size) == [(size, size)]
+
+
+def test_more_partitions_than_records_drops_empty_ranges(tmp_path):
+    file_path = write_csv(tmp_path / "a.csv", "id,v\n1,a\n2,b\n")
+    probe = csv_ship.probe_csv_file(file_path)
+
+    ranges = csv_ship.compute_csv_partitions(file_path, 8, probe.data_start, block_size=4)
+
+    assert all(start < end for start, end in ranges)
+    rows = [row for start, end in ranges for row in read_range(file_path, start, end)]
+    assert rows == [["1", "a"], ["2", "b"]]
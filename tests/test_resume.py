@@ -0,0 +1,75 @@
+import pytest
+
+import csv_sinks
+import csv_ship
+
+
+def write_feed(tmp_path, rows):
+    path = tmp_path / "feed.csv"
+    path.write_text("id,v\n" + "".join(f"{i},v{i}\n" for i in range(rows)), encoding="utf-8")
+    return str(path)
+
+
+def crash_on_batch(monkeypatch, number):
+    original = csv_sinks.SQLiteSink.write_batch
+    calls = []
+
+    def write_batch(self, batch, last_line=None):
+        calls.append(len(batch))
+        if len(calls) == number:
+            raise RuntimeError("queda simulada")
+        return original(self, batch, last_line)
+
+    monkeypatch.setattr(csv_sinks.SQLiteSink, "write_batch", write_batch)
+
+
+def load(sink, file_path, tmp_path, **options):
+    return csv_ship.process_csv_file(
+        sink,
+        file_path,
+        truncate_existing=True,
+        load_options={
+            "checkpoint_dir": str(tmp_path / "ck"),
+            "reject_dir": None,
+            "batch_rows": 20,
+            **options,
+        },
+    )
+
+
+def table_ids(sink):
+    return [row[0] for row in sink.conn.execute('SELECT id FROM "dbo__feed"').fetchall()]
+
+
+@pytest.mark.parametrize("engine", ["stream", "arrow"])
+def test_resume_after_a_crash_loads_every_row_once(tmp_path, monkeypatch, engine):
+    if engine == "arrow":
+        pytest.importorskip("pyarrow")
+    file_path = write_feed(tmp_path, 100)
+    sink = csv_sinks.SQLiteSink(str(tmp_path / "t.db"))
+
+    with monkeypatch.context() as patch:
+        crash_on_batch(patch, 3)
+        assert load(sink, file_path, tmp_path, engine=engine)["status"] == "failed"
+    assert len(table_ids(sink)) == 40
+
+    assert load(sink, file_path, tmp_path, engine=engine, resume=True)["status"] == "success"
+
+    ids = table_ids(sink)
+    assert len(ids) == 100
+    assert len(set(ids)) == 100
+    sink.close()
+
+
+def test_resume_without_a_confirmed_batch_reloads_from_the_start(tmp_path):
+    file_path = write_feed(tmp_path, 30)
+    sink = csv_sinks.SQLiteSink(str(tmp_path / "t.db"))
+    assert load(sink, file_path, tmp_path)["status"] == "success"
+    # Diário de uma carga que caiu antes do primeiro lote confirmado, sobre linhas de uma
+    # carga anterior que ainda estão na tabela.
+    csv_ship.CheckpointJournal(file_path, "feed", "dbo", checkpoint_dir=str(tmp_path / "ck")).start()
+
+    assert load(sink, file_path, tmp_path, resume=True)["status"] == "success"
+
+    assert sorted(table_ids(sink), key=int) == [str(i) for i in range(30)]
+    sink.close()
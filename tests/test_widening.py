@@ -0,0 +1,79 @@
+import csv_sinks
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._result = []
+
+    def execute(self, sql, *params):
+        self.conn.statements.append(sql)
+        if "INFORMATION_SCHEMA.COLUMNS" in sql:
+            self._result = list(self.conn.columns)
+        elif "sp_getapplock" in sql:
+            self._result = [(0,)]
+        else:
+            self._result = []
+        return self
+
+    def fetchone(self):
+        return self._result.pop(0) if self._result else None
+
+    def fetchall(self):
+        result, self._result = self._result, []
+        return result
+
+
+class Connection:
+    """Conexão mínima: responde ao INFORMATION_SCHEMA com `columns` e registra os comandos."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.statements = []
+
+    def cursor(self):
+        return Cursor(self)
+
+
+def sink_with_type_checks(conn):
+    sink = csv_sinks.SqlServerSink(conn, infer_types=True)
+    sink._load_target = ("dbo", "t")
+    sink._prepare_type_checks("t", "dbo", ["n"])
+    return sink
+
+
+def alter_statements(conn):
+    return [sql for sql in conn.statements if sql.startswith("ALTER TABLE")]
+
+
+def test_widening_locks_the_table_and_alters_the_column():
+    conn = Connection([("n", "int", None, 10, 0)])
+    sink = sink_with_type_checks(conn)
+
+    sink._widen_columns_for_batch([("12345678901",)])
+
+    assert any("sp_getapplock" in sql for sql in conn.statements)
+    assert alter_statements(conn) == ["ALTER TABLE [dbo].[t] ALTER COLUMN [n] BIGINT NULL"]
+    assert sink._type_checks[0][2] == "BIGINT"
+
+
+def test_widening_merges_with_the_type_another_load_already_set():
+    conn = Connection([("n", "int", None, 10, 0)])
+    sink = sink_with_type_checks(conn)
+    # Outra carga alargou a coluna depois que este destino leu os tipos.
+    conn.columns = [("n", "decimal", None, 12, 2)]
+
+    sink._widen_columns_for_batch([("12345678901",)])
+
+    assert alter_statements(conn) == ["ALTER TABLE [dbo].[t] ALTER COLUMN [n] DECIMAL(20,2) NULL"]
+
+
+def test_widening_never_narrows_a_column_already_wide_enough():
+    conn = Connection([("n", "int", None, 10, 0)])
+    sink = sink_with_type_checks(conn)
+    conn.columns = [("n", "nvarchar", -1, None, None)]
+
+    sink._widen_columns_for_batch([("12345678901",)])
+
+    assert alter_statements(conn) == []
+    assert sink._type_checks == []